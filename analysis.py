@@ -2,27 +2,269 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-import language_tool_python
-from phonemizer import phonemize
+import bisect
+import collections
+import re
+import string
+import threading
+
+import numpy as np
+
+from metrics import metrics
+
+def split_sentences(text):
+    """Découpe le texte en phrases ; renvoie [(position, phrase)]"""
+    sentences = []
+    for m in re.finditer(r'[^.!?]+(?:[.!?]+|$)', text):
+        sentence = m.group().strip()
+        if sentence:
+            sentences.append((m.start() + m.group().index(sentence[0]), sentence))
+    return sentences
+
+def apply_replacements(text, matches):
+    """Construit le texte corrigé à partir de la première suggestion de chaque erreur"""
+    corrected = text
+    last_start = len(text) + 1
+    for offset, length, _, replacements in sorted(matches, reverse=True):
+        # On ignore les erreurs qui chevauchent une correction déjà appliquée
+        if not replacements or offset + length > last_start:
+            continue
+        corrected = corrected[:offset] + replacements[0] + corrected[offset + length:]
+        last_start = offset
+    return corrected
 
 class GrammarAnalyzer:
-    def __init__(self):
-        self.lt_tool = language_tool_python.LanguageTool('en-US')
+    """Analyse grammaticale en un seul passage LanguageTool.
+
+    Les résultats sont mis en cache par phrase : quand un segment est révisé,
+    seules les phrases modifiées sont renvoyées à LanguageTool, en un seul appel.
+    Avec server_url, les appels vont à un serveur partagé (LanguageToolClient)
+    au lieu d'une JVM propre à l'instance.
+    """
+    def __init__(self, cache_size=2000, server_url=None, **client_options):
+        if server_url:
+            from languagetool_client import LanguageToolClient
+            self.lt_tool = LanguageToolClient(server_url, **client_options)
+        else:
+            # Import différé : la JVM et le paquet ne sont chargés qu'à la création
+            import language_tool_python
+            self.lt_tool = language_tool_python.LanguageTool('en-US')
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_sentences(self, sentences):
+        """Un appel LanguageTool pour toutes les phrases, résultats répartis par phrase"""
+        separator = "\n\n"
+        starts = []
+        pos = 0
+        for sentence in sentences:
+            starts.append(pos)
+            pos += len(sentence) + len(separator)
+        results = [[] for _ in sentences]
+        with metrics.timer("languagetool.check"):
+            found = self.lt_tool.check(separator.join(sentences))
+        for m in found:
+            i = bisect.bisect_right(starts, m.offset) - 1
+            results[i].append((m.offset - starts[i], m.errorLength, m.message, list(m.replacements),
+                               getattr(m, "ruleId", None)))
+        return results
+
+    def analyze(self, text):
+        """Renvoie (erreurs [(position, longueur, message, règle)], texte corrigé)"""
+        sentences = split_sentences(text)
+        found = {}
+        with self.lock:
+            for _, sentence in sentences:
+                # Clé exacte : les positions en cache sont relatives à cette chaîne précise
+                if sentence in self.cache:
+                    self.cache.move_to_end(sentence)
+                    found[sentence] = self.cache[sentence]
+                    self.hits += 1
+        missing = list(dict.fromkeys(s for _, s in sentences if s not in found))
+        metrics.incr("grammar.cache_hits", len(sentences) - len(missing))
+        if missing:
+            self.misses += len(missing)
+            metrics.incr("grammar.cache_misses", len(missing))
+            results = self._check_sentences(missing)
+            with self.lock:
+                for sentence, result in zip(missing, results):
+                    found[sentence] = result
+                    self.cache[sentence] = result
+                    while len(self.cache) > self.cache_size:
+                        self.cache.popitem(last=False)
+        matches = []
+        errors = []
+        for start, sentence in sentences:
+            for offset, length, message, replacements, rule in found[sentence]:
+                matches.append((start + offset, length, message, replacements))
+                errors.append((start + offset, length, message, rule))
+        return errors, apply_replacements(text, matches)
+
     def check(self, text):
-        matches = self.lt_tool.check(text)
-        return [(m.offset, m.errorLength, m.message) for m in matches]
+        return self.analyze(text)[0]
+
     def correct(self, text):
-        return self.lt_tool.correct(text)
+        return self.analyze(text)[1]
+
+def normalize_word(word):
+    """Clé de cache : minuscules, sans ponctuation autour du mot"""
+    return word.strip(string.punctuation + "“”‘’«»").lower()
 
 class PronunciationAnalyzer:
-    def check(self, text):
+    """Score de prononciation par mot et vérification phonétique.
+
+    score() part des probabilités et horodatages de mots fournis par l'ASR ;
+    seuls les mots peu sûrs passent par la phonémisation. Les mots inconnus
+    d'un segment sont phonémisés en un seul appel espeak ;
+    les résultats vont dans un cache LRU borné et, si lexicon_path est donné,
+    dans un lexique persistant rechargé au démarrage.
+    """
+    def __init__(self, cache_size=5000, lexicon_path=None, language='en-us'):
+        self.cache_size = cache_size
+        self.lexicon_path = lexicon_path
+        self.language = language
+        self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+        self.backend_calls = 0
+        self.persisted = set()   # Mots déjà écrits dans le lexique, même sortis du cache
+        if lexicon_path:
+            self.load_lexicon()
+
+    def load_lexicon(self):
+        entries = collections.OrderedDict()
+        lines = 0
+        try:
+            with open(self.lexicon_path, encoding="utf-8") as f:
+                for line in f:
+                    word, _, ph = line.rstrip("\n").partition("\t")
+                    if word:
+                        entries[word] = ph
+                        lines += 1
+        except FileNotFoundError:
+            return
+        for word, ph in entries.items():
+            self._remember(word, ph)
+        self.persisted = set(entries)
+        if lines > len(entries):
+            # Doublons laissés par une version précédente : le fichier est réécrit
+            self._rewrite_lexicon(entries)
+
+    def _rewrite_lexicon(self, entries):
+        tmp = self.lexicon_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(f"{k}\t{ph}\n" for k, ph in entries.items())
+            os.replace(tmp, self.lexicon_path)
+        except OSError as e:
+            print(f"Erreur écriture lexique: {e}")
+
+    def _remember(self, key, ph):
+        self.cache[key] = ph
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def load_backend(self):
+        """Initialise espeak une fois ; les appels suivants réutilisent le backend"""
+        if self.backend is None:
+            try:
+                from phonemizer.backend import EspeakBackend
+                self.backend = EspeakBackend(self.language)
+            except Exception:
+                self.backend = False
+
+    def _phonemize(self, words):
+        """Un seul appel au backend pour toute la liste"""
+        self.backend_calls += 1
+        self.load_backend()
+        with metrics.timer("espeak.phonemize"):
+            if self.backend:
+                result = self.backend.phonemize(words, strip=True)
+            else:
+                from phonemizer import phonemize
+                result = phonemize(words, language=self.language, backend='espeak', strip=True)
+        if len(result) != len(words):
+            raise RuntimeError("Résultat de phonémisation incomplet")
+        return result
+
+    def phonemes(self, words):
+        """Renvoie {mot normalisé: phonèmes} en ne phonémisant que les mots absents du cache"""
+        keys = [k for k in (normalize_word(w) for w in words) if k]
+        known = {}
+        with self.lock:
+            for k in keys:
+                if k in self.cache:
+                    self.cache.move_to_end(k)
+                    known[k] = self.cache[k]
+                    self.hits += 1
+        missing = list(dict.fromkeys(k for k in keys if k not in known))
+        metrics.incr("pronunciation.cache_hits", len(keys) - len(missing))
+        if missing:
+            self.misses += len(missing)
+            metrics.incr("pronunciation.cache_misses", len(missing))
+            results = self._phonemize(missing)
+            with self.lock:
+                for k, ph in zip(missing, results):
+                    self._remember(k, ph.strip())
+                    known[k] = ph.strip()
+                # Un mot sorti du cache puis phonémisé à nouveau est déjà dans le lexique
+                new = [k for k in missing if k not in self.persisted]
+                self.persisted.update(new)
+            if self.lexicon_path and new:
+                try:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.lexicon_path)), exist_ok=True)
+                    with open(self.lexicon_path, "a", encoding="utf-8") as f:
+                        f.writelines(f"{k}\t{known[k]}\n" for k in new)
+                except OSError as e:
+                    print(f"Erreur écriture lexique: {e}")
+        return known
+
+    def score(self, words, threshold=0.6, seconds_per_letter=0.03):
+        """words : [(mot, début, fin, probabilité)] -> ([(mot, score)], indices des mots en erreur)
+
+        Le score est la probabilité du mot, réduite (jusqu'à moitié) quand le mot
+        est prononcé bien plus vite que seconds_per_letter par lettre, signe
+        fréquent d'un mot avalé ou mal reconnu. Les mots sous le seuil sont
+        vérifiés par phonémisation : sans transcription phonétique, le score tombe à 0.
+        """
+        if not words:
+            return [], []
+        tokens = [w[0].strip() for w in words]
+        timing = np.array([w[1:4] for w in words], dtype=np.float64).reshape(-1, 3)
+        letters = np.array([len(normalize_word(t)) for t in tokens])
+        duration = timing[:, 1] - timing[:, 0]
+        expected = np.maximum(letters, 1) * seconds_per_letter
+        scores = timing[:, 2] * np.clip(duration / expected, 0.5, 1.0)
+        low = np.flatnonzero((scores < threshold) & (letters > 0))
+        metrics.incr("pronunciation.words_scored", len(tokens))
+        metrics.incr("pronunciation.phoneme_checks", len(low))
+        if len(low):
+            try:
+                known = self.phonemes([tokens[i] for i in low])
+            except Exception:
+                known = {}
+            for i in low:
+                if not known.get(normalize_word(tokens[i])):
+                    scores[i] = 0.0
+        return [(t, round(float(s), 3)) for t, s in zip(tokens, scores)], [int(i) for i in low]
+
+    def check(self, text, max_words=None):
+        """Sans probabilités de mots (mode continu) : vérification phonétique seule"""
         words = text.split()
+        if max_words:
+            words = words[:max_words]
+        try:
+            known = self.phonemes(words)
+        except Exception:
+            return list(words)
         errors = []
         for w in words:
-            try:
-                ph = phonemize(w, language='en-us', backend='espeak')
-                if not ph.strip():
-                    errors.append(w)
-            except Exception:
+            if not known.get(normalize_word(w)):
                 errors.append(w)
         return errors
@@ -0,0 +1,150 @@
+import threading
+import numpy as np
+
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+
+class RingBuffer:
+    """Tampon circulaire float32 de capacité fixe partagé entre la capture et la transcription.
+
+    Un seul producteur (callback audio) et un seul consommateur (thread de transcription).
+    Les données sont copiées hors du verrou ; le verrou ne protège que les positions.
+    """
+
+    def __init__(self, capacity, overflow=DROP_OLDEST, block_timeout=0.1):
+        if capacity <= 0:
+            raise ValueError("La capacité doit être positive")
+        if overflow not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Politique de débordement inconnue : {overflow}")
+        self.capacity = int(capacity)
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self._data = np.zeros(self.capacity, dtype=np.float32)
+        # Positions absolues (nombre total d'échantillons écrits / lus)
+        self._write_pos = 0
+        self._read_pos = 0
+        self._lock = threading.Lock()
+        self._space_available = threading.Condition(self._lock)
+        self._data_available = threading.Condition(self._lock)
+        # Compteurs
+        self.overruns = 0          # Nombre d'écritures ayant débordé
+        self.dropped_samples = 0   # Échantillons perdus (écrasés ou refusés)
+        self.peak_fill = 0
+
+    def __len__(self):
+        return self._write_pos - self._read_pos
+
+    @property
+    def fill_level(self):
+        """Taux de remplissage entre 0 et 1"""
+        return len(self) / self.capacity
+
+    def stats(self):
+        """Renvoie les compteurs du tampon"""
+        return {
+            "capacity": self.capacity,
+            "available": len(self),
+            "fill_level": self.fill_level,
+            "peak_fill": self.peak_fill,
+            "overruns": self.overruns,
+            "dropped_samples": self.dropped_samples,
+        }
+
+    def write(self, samples):
+        """Écrit des échantillons ; renvoie le nombre d'échantillons effectivement écrits"""
+        n = len(samples)
+        if n == 0:
+            return 0
+        if n > self.capacity:
+            # Seule la fin du bloc peut tenir dans le tampon
+            dropped = n - self.capacity
+            samples = samples[dropped:]
+            n = self.capacity
+            with self._lock:
+                self.overruns += 1
+                self.dropped_samples += dropped
+
+        with self._lock:
+            free = self.capacity - (self._write_pos - self._read_pos)
+            if n > free:
+                if self.overflow == BLOCK:
+                    self._space_available.wait_for(
+                        lambda: self.capacity - (self._write_pos - self._read_pos) >= n,
+                        timeout=self.block_timeout)
+                    free = self.capacity - (self._write_pos - self._read_pos)
+                    if n > free:
+                        # Délai dépassé : on garde ce qui rentre
+                        self.overruns += 1
+                        self.dropped_samples += n - free
+                        samples = samples[:free]
+                        n = free
+                else:
+                    # On écrase les échantillons les plus anciens
+                    self.overruns += 1
+                    self.dropped_samples += n - free
+                    self._read_pos += n - free
+            start = self._write_pos % self.capacity
+
+        if n == 0:
+            return 0
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        if first < n:
+            self._data[:n - first] = samples[first:]
+
+        with self._lock:
+            self._write_pos += n
+            fill = self._write_pos - self._read_pos
+            if fill > self.peak_fill:
+                self.peak_fill = fill
+            self._data_available.notify()
+        return n
+
+    def views(self, count=None):
+        """Vues sans copie sur les données disponibles (un ou deux segments)
+
+        Les vues restent valides jusqu'au prochain consume() ; en mode drop_oldest,
+        un débordement peut les écraser entre-temps.
+        """
+        with self._lock:
+            available = self._write_pos - self._read_pos
+            start = self._read_pos % self.capacity
+        n = available if count is None else min(count, available)
+        first = min(n, self.capacity - start)
+        if first == n:
+            return (self._data[start:start + n],)
+        return (self._data[start:], self._data[:n - first])
+
+    def consume(self, count):
+        """Libère les count premiers échantillons disponibles"""
+        with self._lock:
+            count = min(count, self._write_pos - self._read_pos)
+            self._read_pos += count
+            self._space_available.notify()
+        return count
+
+    def read(self, count=None, out=None):
+        """Copie puis consomme jusqu'à count échantillons"""
+        parts = self.views(count)
+        n = sum(len(p) for p in parts)
+        if out is None:
+            out = np.empty(n, dtype=np.float32)
+        pos = 0
+        for p in parts:
+            out[pos:pos + len(p)] = p
+            pos += len(p)
+        self.consume(n)
+        return out[:n]
+
+    def wait(self, count, timeout=None):
+        """Attend qu'au moins count échantillons soient disponibles"""
+        with self._lock:
+            return self._data_available.wait_for(
+                lambda: self._write_pos - self._read_pos >= count, timeout=timeout)
+
+    def clear(self):
+        """Vide le tampon sans réinitialiser les compteurs"""
+        with self._lock:
+            self._read_pos = self._write_pos
+            self._space_available.notify()
@@ -0,0 +1,425 @@
+"""Transcription hors ligne de longs enregistrements (même journal que l'interface)
+
+Exemples :
+    python batch.py lecon.wav -o lecon.txt
+    python batch.py lecon.wav -o lecon.jsonl --format jsonl --workers 4
+    python batch.py lecon.wav -o lecon.txt --no-pronunciation
+    python batch.py lecon.wav -o lecon.txt --backend stub   # essais sans modèle
+    python batch.py lecon.wav -o lecon.txt --restart    # ignore le point de reprise
+
+L'audio est lu par morceaux (np.memmap pour les WAV), découpé par le VAD et
+réparti entre des processus qui font ASR et prononciation. La grammaire tourne
+dans le processus principal, avec une seule instance LanguageTool (le serveur
+partagé AppConfig.languagetool_url s'il est défini). Les résultats sont écrits
+dans l'ordre et un point de reprise est enregistré régulièrement à côté du
+fichier de sortie.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import concurrent.futures
+import copy
+import datetime
+import json
+import multiprocessing as mp
+import struct
+import time
+
+import numpy as np
+
+from capture import PolyphaseResampler
+from config import AppConfig
+from pipeline import OrderedSink, Segment
+from transcript_log import format_jsonl, format_text, segment_record
+from vad import VadSegmenter
+
+# Formats WAV lisibles directement par np.memmap
+_WAV_DTYPES = {(1, 16): "<i2", (1, 32): "<i4", (3, 32): "<f4"}
+_WAV_SCALE = {"<i2": 1 / 32768.0, "<i4": 1 / 2147483648.0, "<f4": 1.0}
+# Chaque processus charge son propre modèle : au-delà, la mémoire manque avant les cœurs
+MAX_DEFAULT_WORKERS = 4
+
+
+class AudioSource:
+    """Accès aléatoire à un fichier audio, converti à la volée en float32 mono au taux demandé"""
+
+    def __init__(self, path, rate, frames, sample_rate=16000, taps=32):
+        self.path = path
+        self.rate = rate
+        self.frames = frames
+        self.sample_rate = sample_rate
+        self.resampler = PolyphaseResampler(rate, sample_rate, taps=taps) if rate != sample_rate else None
+        self._position = None   # Prochaine position de sortie si la lecture est séquentielle
+        self._input = 0         # Trame d'entrée du prochain bloc du filtre
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    def __len__(self):
+        return int(self.frames * self.sample_rate / self.rate)
+
+    @property
+    def duration(self):
+        return self.frames / self.rate
+
+    def _frames(self, start, stop):
+        """Trames [start, stop) du fichier, float32 de forme (n, canaux)"""
+        raise NotImplementedError
+
+    def read(self, start, count):
+        """count échantillons à partir de start (positions au taux de sortie)"""
+        count = max(0, min(count, len(self) - start))
+        if self.resampler is None:
+            return self._frames(start, start + count).mean(axis=1, dtype=np.float32)
+        # Filtre polyphase (comme la capture) : l'état est conservé entre lectures successives
+        if start != self._position:
+            self._seek(start)
+        audio = np.empty(count, dtype=np.float32)
+        filled = 0
+        while filled < count:
+            if not len(self._pending):
+                self._pending = self._next_block()
+            n = min(count - filled, len(self._pending))
+            audio[filled:filled + n] = self._pending[:n]
+            self._pending = self._pending[n:]
+            filled += n
+        self._position = start + count
+        return audio
+
+    def _next_block(self):
+        resampler = self.resampler
+        block = resampler.block
+        mono = self._frames(self._input, min(self.frames, self._input + resampler.block_in)).mean(axis=1)
+        block[:len(mono)] = mono
+        block[len(mono):] = 0.0
+        self._input += resampler.block_in
+        return resampler.process()
+
+    def _seek(self, start):
+        """Reprend le filtrage au bloc qui contient start (début ou point de reprise)"""
+        resampler = self.resampler
+        index, skip = divmod(start, resampler.block_out)
+        self._input = index * resampler.block_in
+        # Historique du filtre : trames qui précèdent le bloc
+        history = resampler.input[:resampler.taps - 1]
+        history[:] = 0.0
+        first = max(0, self._input - len(history))
+        if self._input > first:
+            history[len(history) - (self._input - first):] = self._frames(first, self._input).mean(axis=1)
+        self._pending = self._next_block()[skip:]
+
+    def close(self):
+        pass
+
+
+class WavSource(AudioSource):
+    """WAV PCM 16/32 bits ou flottant : projeté en mémoire, seules les pages lues sont chargées"""
+
+    def __init__(self, path, sample_rate=16000, taps=32):
+        fmt, offset, size = self._parse(path)
+        audio_format, channels, rate, bits = fmt
+        dtype = _WAV_DTYPES.get((audio_format, bits))
+        if dtype is None:
+            raise ValueError(f"Format WAV non pris en charge par memmap ({audio_format}, {bits} bits)")
+        # Les WAV de plus de 4 Gio annoncent souvent une taille de bloc fausse
+        frame_bytes = channels * bits // 8
+        frames = min(size, os.path.getsize(path) - offset) // frame_bytes
+        super().__init__(path, rate, frames, sample_rate, taps)
+        self.scale = _WAV_SCALE[dtype]
+        self.data = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(frames, channels))
+
+    @staticmethod
+    def _parse(path):
+        """(format, canaux, taux, bits), position et taille du bloc data"""
+        fmt = None
+        with open(path, "rb") as f:
+            riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+            if riff != b"RIFF" or wave != b"WAVE":
+                raise ValueError(f"{path} n'est pas un fichier WAV")
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError(f"{path} : bloc data introuvable")
+                chunk, size = struct.unpack("<4sI", header)
+                if chunk == b"fmt ":
+                    body = f.read(size + (size & 1))
+                    audio_format, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                    if audio_format == 0xFFFE and len(body) >= 26:
+                        # WAVE_FORMAT_EXTENSIBLE : le vrai format est dans le sous-format
+                        audio_format = struct.unpack("<H", body[24:26])[0]
+                    fmt = (audio_format, channels, rate, bits)
+                elif chunk == b"data":
+                    if fmt is None:
+                        raise ValueError(f"{path} : bloc fmt manquant")
+                    return fmt, f.tell(), size
+                else:
+                    f.seek(size + (size & 1), 1)
+
+    def _frames(self, start, stop):
+        return self.data[start:stop].astype(np.float32) * self.scale
+
+    def close(self):
+        self.data = None
+
+
+class SoundFileSource(AudioSource):
+    """Autres formats (FLAC, WAV 24 bits...) décodés par blocs avec soundfile"""
+
+    def __init__(self, path, sample_rate=16000, taps=32):
+        import soundfile
+        self.file = soundfile.SoundFile(path)
+        super().__init__(path, self.file.samplerate, self.file.frames, sample_rate, taps)
+
+    def _frames(self, start, stop):
+        self.file.seek(start)
+        return self.file.read(stop - start, dtype="float32", always_2d=True)
+
+    def close(self):
+        self.file.close()
+
+
+def open_audio(path, sample_rate=16000, taps=32):
+    try:
+        return WavSource(path, sample_rate, taps)
+    except ValueError as e:
+        try:
+            return SoundFileSource(path, sample_rate, taps)
+        except ImportError:
+            raise ValueError(f"{e} (installer soundfile pour les autres formats)")
+
+
+# Moteur de chaque processus de travail (chargé une fois par processus)
+_engine = None
+
+
+def _init_worker(config, pronunciation):
+    global _engine
+    from engine import TranscriptionEngine, load_asr, load_pronunciation
+    from startup import StartupTimer
+    timer = StartupTimer()
+    _engine = TranscriptionEngine(config, None, None)
+    _engine.model = load_asr(config, timer)
+    if pronunciation:
+        _engine.pronunciation = load_pronunciation(config, timer)
+
+
+def _process(segment):
+    """Étapes du pipeline appliquées à un segment dans un processus de travail"""
+    for name, stage in (("asr", _engine.asr_stage), ("pronunciation", _engine.pronunciation_stage)):
+        start = time.perf_counter()
+        stage(segment)
+        segment.timings[name] = time.perf_counter() - start
+    return segment
+
+
+def _analyze_grammar(engine, segment):
+    """Grammaire dans le processus principal (une seule instance LanguageTool)"""
+    start = time.perf_counter()
+    engine.grammar_stage(segment)
+    segment.timings["grammar"] = time.perf_counter() - start
+    return segment
+
+
+class Checkpoint:
+    """Point de reprise : position audio et taille du journal au dernier segment écrit"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self, source, fmt):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        stat = os.stat(source)
+        if (state.get("source"), state.get("size"), state.get("format")) != (os.path.abspath(source), stat.st_size, fmt):
+            print(f"Point de reprise {self.path} ignoré (fichier source ou format différent)")
+            return None
+        return state
+
+    def save(self, source, fmt, position, next_index, output_bytes):
+        state = {"source": os.path.abspath(source), "size": os.stat(source).st_size, "format": fmt,
+                 "position": position, "next_index": next_index, "output_bytes": output_bytes}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class BatchTranscriber:
+    """Transcrit un fichier audio complet avec un pool de processus
+
+    La mémoire reste bornée quelle que soit la durée : l'audio est lu par
+    morceaux et au plus max_in_flight segments sont en cours de traitement.
+    """
+
+    def __init__(self, config, workers=None, grammar=True, pronunciation=True,
+                 chunk_seconds=30.0, checkpoint_every=20):
+        self.config = copy.copy(config)
+        # Pas de contrainte temps réel : pleine qualité, modèle dans chaque processus
+        self.config.quality_control = False
+        self.config.inference_mode = "thread"
+        self.config.transcript_log = None
+        self.config.history = None
+        self.workers = workers or min(os.cpu_count() or 1, MAX_DEFAULT_WORKERS)
+        if not self.config.asr_threads:
+            # Répartir les cœurs entre les processus plutôt que de les sursouscrire
+            self.config.asr_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self.grammar = grammar
+        self.pronunciation = pronunciation
+        self.chunk = int(chunk_seconds * config.sample_rate)
+        self.checkpoint_every = checkpoint_every
+        self.max_in_flight = self.workers * 2
+
+    def run(self, source_path, output_path, fmt="text", resume=True, start_time=None):
+        """Transcrit source_path dans output_path ; renvoie un résumé"""
+        sample_rate = self.config.sample_rate
+        source = open_audio(source_path, sample_rate, self.config.resample_taps)
+        checkpoint = Checkpoint(output_path + ".checkpoint")
+        state = checkpoint.load(source_path, fmt) if resume and os.path.exists(output_path) else None
+        position, next_index = (state["position"], state["next_index"]) if state else (0, 0)
+        if start_time is None:
+            # Un enregistrement se termine à la dernière modification du fichier
+            start_time = (datetime.datetime.fromtimestamp(os.path.getmtime(source_path))
+                          - datetime.timedelta(seconds=source.duration))
+        if state:
+            print(f"Reprise à {position / sample_rate:.1f}s (segment {next_index})")
+
+        # Mode binaire : tell()/truncate() en octets pour le point de reprise
+        out = open(output_path, "r+b" if state else "wb")
+        if state:
+            # Lignes écrites après le dernier point de reprise : retranscrites
+            out.truncate(state["output_bytes"])
+            out.seek(state["output_bytes"])
+        formatter = format_jsonl if fmt == "jsonl" else format_text
+        summary = {"segments": 0, "errors": 0, "audio_seconds": round(source.duration, 2)}
+        wall_start = time.monotonic()
+        written = {"position": position, "count": 0}
+
+        def write(segment):
+            if segment.text:
+                out.write(formatter(segment_record(segment)).encode("utf-8"))
+                summary["segments"] += 1
+            written["position"] = int(round(segment.end * sample_rate))
+            written["count"] += 1
+            if written["count"] % self.checkpoint_every == 0:
+                out.flush()
+                checkpoint.save(source_path, fmt, written["position"], segment.id + 1, out.tell())
+                elapsed = time.monotonic() - wall_start
+                done = (written["position"] - position) / sample_rate
+                print(f"{written['position'] / sample_rate:.0f}/{source.duration:.0f}s "
+                      f"({done / elapsed:.1f}x temps réel)")
+
+        sink = OrderedSink(write)
+        sink.next_id = next_index
+        ids = iter(range(next_index, sys.maxsize))
+        segmenter = VadSegmenter.from_config(self.config)
+        offset = position / sample_rate
+        in_flight = set()
+        grammar = self._load_grammar()
+        analysis = concurrent.futures.ThreadPoolExecutor(self.config.languagetool_concurrency,
+                                                         thread_name_prefix="grammar")
+
+        def submit(pool, start, audio):
+            segment = Segment(audio=audio, start=offset + start,
+                              end=offset + start + len(audio) / sample_rate)
+            segment.id = next(ids)
+            segment.wall_time = start_time + datetime.timedelta(seconds=segment.start)
+            future = pool.submit(_process, segment)
+            future.segment = segment
+            future.transcribed = False
+            in_flight.add(future)
+
+        def collect(done):
+            for future in done:
+                in_flight.discard(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Erreur segment {future.segment.id}: {e}")
+                    summary["errors"] += 1
+                    result = future.segment
+                    result.audio = None
+                if grammar is not None and not future.transcribed:
+                    # Segment transcrit : la grammaire suit dans un thread du processus principal
+                    future = analysis.submit(_analyze_grammar, grammar, result)
+                    future.segment = result
+                    future.transcribed = True
+                    in_flight.add(future)
+                    continue
+                sink.put(result)
+
+        ctx = mp.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(self.workers, mp_context=ctx, initializer=_init_worker,
+                                                    initargs=(self.config, self.pronunciation)) as pool:
+            for chunk_start in range(position, len(source), self.chunk):
+                # read() renvoie un nouveau tableau : le segmenteur peut en garder les trames
+                for start, audio in segmenter.feed(source.read(chunk_start, self.chunk)):
+                    submit(pool, start, audio)
+                while len(in_flight) >= self.max_in_flight:
+                    done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                    collect(done)
+            for start, audio in segmenter.flush():
+                submit(pool, start, audio)
+            while in_flight:
+                collect(concurrent.futures.wait(in_flight)[0])
+
+        analysis.shutdown()
+        out.close()
+        source.close()
+        checkpoint.remove()
+        summary["wall_seconds"] = round(time.monotonic() - wall_start, 2)
+        return summary
+
+    def _load_grammar(self):
+        """Moteur du processus principal pour la grammaire ; None si désactivée ou indisponible"""
+        if not self.grammar:
+            return None
+        from engine import TranscriptionEngine, load_grammar
+        from startup import StartupTimer
+        engine = TranscriptionEngine(self.config, None, None)
+        try:
+            engine.grammar = load_grammar(self.config, StartupTimer())
+        except Exception as e:
+            print(f"LanguageTool indisponible ({e}), transcription sans grammaire")
+            return None
+        return engine
+
+
+def main(argv=None):
+    from transcriber import BACKENDS
+
+    parser = argparse.ArgumentParser(description="Transcription hors ligne d'un enregistrement")
+    parser.add_argument("input", help="Fichier audio (WAV ; autres formats avec soundfile)")
+    parser.add_argument("-o", "--output", help="Journal de sortie (par défaut : <entrée>.txt ou .jsonl)")
+    parser.add_argument("--format", choices=("text", "jsonl"), default="text")
+    parser.add_argument("--workers", type=int,
+                        help=f"Processus de travail (par défaut : nombre de cœurs, au plus {MAX_DEFAULT_WORKERS})")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="Moteur ASR (AppConfig par défaut)")
+    parser.add_argument("--model", help="Taille du modèle (tiny, base, small...)")
+    parser.add_argument("--no-grammar", action="store_true")
+    parser.add_argument("--no-pronunciation", action="store_true")
+    parser.add_argument("--restart", action="store_true", help="Ignore le point de reprise existant")
+    parser.add_argument("--start-time", help="Heure de début de l'enregistrement (ISO 8601)")
+    args = parser.parse_args(argv)
+
+    config = AppConfig()
+    config.asr_backend = args.backend or config.asr_backend
+    config.whisper_model = args.model or config.whisper_model
+    output = args.output or os.path.splitext(args.input)[0] + (".jsonl" if args.format == "jsonl" else ".txt")
+    start_time = datetime.datetime.fromisoformat(args.start_time) if args.start_time else None
+    batch = BatchTranscriber(config, workers=args.workers, grammar=not args.no_grammar,
+                             pronunciation=not args.no_pronunciation)
+    summary = batch.run(args.input, output, fmt=args.format, resume=not args.restart, start_time=start_time)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
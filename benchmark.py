@@ -0,0 +1,264 @@
+"""Banc d'essai sans interface : latence et débit du pipeline de transcription
+
+Exemples :
+    python benchmark.py --synthetic 60 --speed 0 --output bench.json
+    python benchmark.py --wav lecon.wav --backend real --speed 1
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import bisect
+import datetime
+import json
+import subprocess
+import threading
+import time
+import wave
+
+import numpy as np
+
+from audio_buffer import RingBuffer
+from config import AppConfig
+from engine import TranscriptionEngine, load_asr, load_grammar, load_pronunciation
+from startup import StartupTimer
+from transcriber import BACKENDS, StubBackend
+
+
+class StubGrammar:
+    def __init__(self, latency=0.05):
+        self.latency = latency
+
+    def analyze(self, text):
+        time.sleep(self.latency)
+        return [], text
+
+
+class StubPronunciation:
+    def __init__(self, latency=0.01):
+        self.latency = latency
+
+    def check(self, text, max_words=None):
+        time.sleep(self.latency)
+        return []
+
+    def score(self, words, threshold=0.6, seconds_per_letter=0.03):
+        # Même contrat que PronunciationAnalyzer.score : le score est la probabilité du mot
+        time.sleep(self.latency)
+        scores = [(w[0].strip(), round(float(w[3]), 3)) for w in words]
+        return scores, [i for i, (_, score) in enumerate(scores) if score < threshold]
+
+
+def load_wav(path, sample_rate=16000):
+    """Lit un WAV PCM 16 bits et le convertit en float32 mono au taux demandé"""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError("Seuls les WAV PCM 16 bits sont pris en charge")
+        channels = f.getnchannels()
+        rate = f.getframerate()
+        data = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+    audio = data.reshape(-1, channels).mean(axis=1).astype(np.float32) / 32768.0
+    if rate != sample_rate:
+        positions = np.arange(0, len(audio), rate / sample_rate)
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+    return audio
+
+
+def synthetic_audio(seconds, sample_rate=16000, seed=0):
+    """Alternance d'énoncés (sons harmoniques modulés) et de silences bruités"""
+    rng = np.random.default_rng(seed)
+    audio = rng.normal(0, 0.002, int(seconds * sample_rate)).astype(np.float32)
+    pos = int(0.5 * sample_rate)
+    while pos < len(audio):
+        length = int(rng.uniform(1.0, 6.0) * sample_rate)
+        t = np.arange(min(length, len(audio) - pos)) / sample_rate
+        pitch = rng.uniform(100, 220)
+        envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+        voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 5))
+        audio[pos:pos + len(t)] += (0.1 * envelope * voice).astype(np.float32)
+        pos += length + int(rng.uniform(0.6, 2.0) * sample_rate)
+    return audio
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    values = np.asarray(values)
+    result = {f"p{p}": round(float(np.percentile(values, p)), 4) for p in (50, 90, 95, 99)}
+    result["max"] = round(float(values.max()), 4)
+    result["mean"] = round(float(values.mean()), 4)
+    return result
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kio sous Linux, octets sous macOS
+        return round(usage / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        return None
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Benchmark:
+    """Alimente le tampon de capture comme le ferait le callback audio et mesure le pipeline"""
+
+    def __init__(self, config, audio, speed=1.0, blocksize=1024):
+        self.config = config
+        self.audio = audio
+        self.speed = speed
+        self.blocksize = blocksize
+        self.sample_rate = config.sample_rate
+        self.buffer = RingBuffer(int(config.buffer_seconds * self.sample_rate), overflow=config.buffer_overflow)
+        self.engine = TranscriptionEngine(config, self.buffer, self.on_segment, on_live=self.on_live)
+        self.fed_samples = []    # Échantillons écrits après chaque bloc
+        self.fed_times = []      # Instant monotone de chaque écriture
+        self.latencies = []
+        self.first_word = []
+        self.segments = []
+        self.lock = threading.Lock()
+
+    def fed_at(self, seconds):
+        """Instant où l'échantillon à la position donnée a été écrit dans le tampon"""
+        i = bisect.bisect_left(self.fed_samples, seconds * self.sample_rate)
+        if i < len(self.fed_times):
+            return self.fed_times[i]
+        return self.fed_times[-1] if self.fed_times else time.monotonic()
+
+    def on_segment(self, segment):
+        now = time.monotonic()
+        with self.lock:
+            self.segments.append(segment)
+            # Fin d'énoncé : le prochain son fort ouvre une nouvelle mesure du premier mot
+            self._armed = True
+            if segment.text and segment.end is not None:
+                self.latencies.append(now - self.fed_at(segment.end))
+
+    def on_live(self, committed, partial):
+        # Temps entre le début d'un énoncé et son premier mot affiché
+        if (committed or partial) and self._utterance_start is not None:
+            self.first_word.append(time.monotonic() - self._utterance_start)
+            self._utterance_start = None
+
+    def feed(self):
+        start = time.monotonic()
+        for pos in range(0, len(self.audio), self.blocksize):
+            block = self.audio[pos:pos + self.blocksize]
+            if self.speed:
+                # Cadence temps réel (ou accélérée) comme un vrai périphérique
+                due = start + (pos + len(block)) / self.sample_rate / self.speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            self.buffer.write(block)
+            self.fed_samples.append(pos + len(block))
+            self.fed_times.append(time.monotonic())
+            if self._armed and np.abs(block).max() > self.config.vad_threshold * 4:
+                self._utterance_start = time.monotonic()
+                self._armed = False
+
+    def run(self):
+        self._utterance_start = None
+        self._armed = True
+        cpu_start = time.process_time()
+        wall_start = time.monotonic()
+        self.engine.start()
+        self.feed()
+        self.engine.stop()
+        self.engine.join()
+        wall = time.monotonic() - wall_start
+        duration = len(self.audio) / self.sample_rate
+        stages = self.engine.pipeline.stats()
+        asr_time = sum(s.timings.get("asr", 0.0) for s in self.segments)
+        return {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "audio_seconds": round(duration, 2),
+            "speed": self.speed,
+            "wall_seconds": round(wall, 3),
+            "real_time_factor": round(asr_time / duration, 4) if duration else None,
+            "throughput_x_realtime": round(duration / wall, 2) if wall else None,
+            "segments": len(self.segments),
+            "latency": percentiles(self.latencies),
+            "first_word_latency": percentiles(self.first_word),
+            "stage_cpu_seconds": {name: round(s["cpu_time"], 4) for name, s in stages.items()},
+            "stages": stages,
+            "process_cpu_seconds": round(time.process_time() - cpu_start, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "buffer": self.buffer.stats(),
+            "dropped_segments": sum(1 for s in self.segments if s.dropped),
+            "skipped_analyses": sum(len(s.skipped) for s in self.segments),
+            "stage_errors": {name: s["errors"] for name, s in stages.items()},
+            "quality_events": self.engine.quality.events if self.engine.quality else [],
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai du pipeline de transcription")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--wav", help="Fichier WAV PCM 16 bits")
+    source.add_argument("--synthetic", type=float, default=30.0, help="Durée d'audio synthétique (secondes)")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = temps réel, 0 = aussi vite que possible")
+    parser.add_argument("--backend", choices=("stub", "real"), default="stub")
+    parser.add_argument("--asr", choices=sorted(BACKENDS), help="Moteur ASR du backend réel (AppConfig par défaut)")
+    parser.add_argument("--model", help="Taille du modèle (tiny, base, small...)")
+    parser.add_argument("--compute-type", help="Quantification faster-whisper (int8, float32...)")
+    parser.add_argument("--threads", type=int, help="Threads de calcul de l'ASR")
+    parser.add_argument("--asr-rtf", type=float, default=0.1, help="Facteur temps réel de l'ASR factice")
+    parser.add_argument("--streaming", action="store_true", help="Mode continu (fenêtre glissante)")
+    parser.add_argument("--blocksize", type=int, default=1024)
+    parser.add_argument("--overflow", choices=("drop_oldest", "block"), default="drop_oldest",
+                        help="Politique du tampon de capture (block : aucune perte en accéléré)")
+    parser.add_argument("--no-quality", action="store_true", help="Désactive le contrôleur de qualité adaptatif")
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    args = parser.parse_args(argv)
+
+    config = AppConfig()
+    config.streaming_mode = args.streaming
+    config.buffer_overflow = args.overflow
+    config.pronunciation_lexicon = None
+    config.quality_control = not args.no_quality
+    config.asr_backend = args.asr or config.asr_backend
+    config.whisper_model = args.model or config.whisper_model
+    config.asr_compute_type = args.compute_type or config.asr_compute_type
+    if args.threads is not None:
+        config.asr_threads = args.threads
+    audio = load_wav(args.wav, config.sample_rate) if args.wav else synthetic_audio(args.synthetic, config.sample_rate)
+
+    bench = Benchmark(config, audio, speed=args.speed, blocksize=args.blocksize)
+    if args.backend == "real":
+        timer = StartupTimer()
+        bench.engine.model = load_asr(config, timer)
+        bench.engine.grammar = load_grammar(config, timer)
+        bench.engine.pronunciation = load_pronunciation(config, timer)
+        print(timer.report())
+    else:
+        bench.engine.model = StubBackend(sample_rate=config.sample_rate, rtf=args.asr_rtf).load()
+        bench.engine.grammar = StubGrammar()
+        bench.engine.pronunciation = StubPronunciation()
+
+    results = bench.run()
+    results["backend"] = args.backend
+    if args.backend == "real":
+        results["asr"] = {"backend": config.asr_backend, "model": config.whisper_model,
+                          "compute_type": config.asr_compute_type, "threads": config.asr_threads}
+    results["source"] = args.wav or f"synthetic:{args.synthetic}"
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if hasattr(bench.engine.model, "close"):
+        bench.engine.model.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import math
+import threading
+
+import numpy as np
+
+from audio_buffer import RingBuffer
+from metrics import metrics
+
+
+class PolyphaseResampler:
+    """Rééchantillonnage rationnel up/down par filtre polyphase, par blocs fixes
+
+    Chaque appel traite exactement block_in échantillons mono et produit
+    block_out échantillons ; l'historique du filtre est conservé entre blocs.
+    Tous les tableaux de travail sont alloués une fois à la construction.
+    """
+
+    def __init__(self, in_rate, out_rate, block_seconds=0.02, taps=16, beta=6.0):
+        g = math.gcd(int(in_rate), int(out_rate))
+        self.up = int(out_rate) // g
+        self.down = int(in_rate) // g
+        self.taps = taps
+        periods = max(1, round(block_seconds * in_rate / self.down))
+        self.block_in = periods * self.down
+        self.block_out = periods * self.up
+        # Passe-bas prototype (sinc fenêtré de Kaiser) au taux suréchantillonné
+        length = taps * self.up
+        cutoff = 0.5 / max(self.up, self.down)
+        n = np.arange(length) - (length - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta)
+        h *= self.up / h.sum()
+        # Pour la sortie j du bloc : phase et dernier échantillon d'entrée utilisé
+        j = np.arange(self.block_out) * self.down
+        phase, base = j % self.up, j // self.up
+        k = np.arange(taps)
+        self._index = (taps - 1) + base[:, None] - k[None, :]
+        self._coeffs = h[phase[:, None] + k[None, :] * self.up].astype(np.float32)
+        # Entrée précédée des taps-1 derniers échantillons du bloc précédent
+        self.input = np.zeros(taps - 1 + self.block_in, dtype=np.float32)
+        self._gather = np.empty((self.block_out, taps), dtype=np.float32)
+        self.output = np.empty(self.block_out, dtype=np.float32)
+
+    @property
+    def block(self):
+        """Zone où écrire le prochain bloc d'entrée"""
+        return self.input[self.taps - 1:]
+
+    def process(self):
+        """Filtre le bloc écrit dans block ; renvoie une vue sur la sortie (réutilisée)"""
+        np.take(self.input, self._index, out=self._gather, mode="clip")
+        np.multiply(self._gather, self._coeffs, out=self._gather)
+        np.sum(self._gather, axis=1, out=self.output)
+        if self.taps > 1:
+            self.input[:self.taps - 1] = self.input[-(self.taps - 1):]
+        return self.output
+
+
+class AudioCapture:
+    """Capture au taux et au nombre de voies natifs du périphérique
+
+    Le callback PortAudio ne fait que copier les trames entrelacées dans un
+    tampon circulaire préalloué et compter les débordements. Un thread de
+    conversion fait le mixage mono et le rééchantillonnage vers
+    config.sample_rate dans des tableaux préalloués, puis passe chaque bloc à
+    sink(audio) ; audio est une vue réutilisée, à copier si elle est conservée.
+    """
+
+    def __init__(self, config, sink):
+        self.config = config
+        self.sink = sink
+        self.stream = None
+        self.thread = None
+        self.running = False
+        self.device_rate = None
+        self.channels = None
+        self.overflows = 0      # input_overflow signalés par PortAudio
+        self.underflows = 0     # input_underflow signalés par PortAudio
+        self.raw = None
+
+    def start(self):
+        import sounddevice as sd
+        cfg = self.config
+        info = sd.query_devices(cfg.device_index, "input")
+        self.device_rate = int(info["default_samplerate"])
+        self.channels = cfg.capture_channels or int(info["max_input_channels"])
+        self.resampler = None
+        block = max(1, round(cfg.capture_block_ms / 1000 * self.device_rate))
+        if self.device_rate != cfg.sample_rate:
+            self.resampler = PolyphaseResampler(self.device_rate, cfg.sample_rate,
+                                                block_seconds=cfg.capture_block_ms / 1000,
+                                                taps=cfg.resample_taps)
+            block = self.resampler.block_in
+            self._mono = self.resampler.block
+        else:
+            self._mono = np.empty(block, dtype=np.float32)
+        self._frames = np.empty(block * self.channels, dtype=np.float32)
+        # Capacité multiple du nombre de voies : les trames restent alignées même en débordement
+        self.raw = RingBuffer(int(cfg.capture_raw_seconds * self.device_rate) * self.channels)
+        self.overflows = self.underflows = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._convert, name="audio-convert", daemon=True)
+        self.thread.start()
+        metrics.gauge("capture.overflows", lambda: self.overflows)
+        metrics.gauge("capture.underflows", lambda: self.underflows)
+        metrics.gauge("capture.raw_fill", lambda: self.raw.fill_level)
+        self.stream = sd.InputStream(samplerate=self.device_rate, channels=self.channels, dtype="float32",
+                                     blocksize=cfg.capture_blocksize, device=cfg.device_index,
+                                     callback=self._callback)
+        self.stream.start()
+        print(f"Capture : {info['name']} à {self.device_rate} Hz, {self.channels} voie(s), "
+              f"blocs de {cfg.capture_blocksize or 'taille variable'}")
+
+    def _callback(self, indata, frames, time, status):
+        # Thread audio : ni print ni tableau alloué, seulement une copie dans le tampon
+        if status:
+            if status.input_overflow:
+                self.overflows += 1
+            if status.input_underflow:
+                self.underflows += 1
+        self.raw.write(indata.reshape(-1))
+
+    def _convert(self):
+        needed = len(self._frames)
+        reported = (0, 0, 0)
+        while self.running:
+            if not self.raw.wait(needed, timeout=0.2):
+                continue
+            self.raw.read(needed, out=self._frames)
+            with metrics.timer("capture.convert"):
+                # Mixage mono vectorisé directement dans l'entrée du rééchantillonneur
+                np.mean(self._frames.reshape(-1, self.channels), axis=1, out=self._mono)
+                audio = self.resampler.process() if self.resampler else self._mono
+            self.sink(audio)
+            counts = (self.overflows, self.underflows, self.raw.overruns)
+            if counts != reported:
+                reported = counts
+                print(f"Capture : {counts[0]} débordement(s), {counts[1]} sous-alimentation(s), "
+                      f"{counts[2]} perte(s) avant conversion")
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        self.running = False
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def stats(self):
+        return {
+            "device_rate": self.device_rate,
+            "channels": self.channels,
+            "blocksize": self.config.capture_blocksize,
+            "overflows": self.overflows,
+            "underflows": self.underflows,
+            "raw": self.raw.stats() if self.raw else None,
+        }
@@ -2,41 +2,181 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-import sounddevice as sd
 import tkinter as tk
 import datetime
 
+
+def app_data_dir():
+    """Dossier des données conservées d'une session à l'autre, indépendant du dossier courant"""
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "whisper-subtitles")
+
+
 class AppConfig:
     def __init__(self):
+        # Les périphériques ne sont listés qu'à l'ouverture des paramètres
+        self.mic_devices = None
+        self.input_devices = []
+        self.device_names = []
+        self.selected_device = ""
+        self.device_index = None  # Périphérique d'entrée par défaut
+        self.show_percentages = True  # Paramètre pour afficher les pourcentages
+        self.show_colors = True       # Paramètre pour afficher les couleurs
+        # Capture au taux natif du périphérique, convertie vers sample_rate (voir capture.py)
+        self.capture_blocksize = 1024     # Trames par callback PortAudio (0 = choix de l'hôte)
+        self.capture_channels = None      # None = toutes les voies du périphérique, mixées en mono
+        self.capture_block_ms = 20        # Granularité du mixage/rééchantillonnage
+        self.capture_raw_seconds = 2.0    # Tampon entre le callback et la conversion
+        self.resample_taps = 32           # Coefficients par phase du filtre polyphase
+        # Tampon circulaire de capture
+        self.sample_rate = 16000
+        self.buffer_seconds = 30.0          # Capacité du tampon audio
+        self.buffer_overflow = "drop_oldest"  # "drop_oldest" ou "block"
+        # Segmentation par détection d'activité vocale
+        self.vad_backend = "energy"    # "energy" ou "webrtc"
+        self.vad_frame_ms = 30
+        self.vad_threshold = 0.01      # Énergie RMS minimale d'une trame de parole
+        self.vad_min_segment = 0.5     # Durée minimale de parole (secondes)
+        self.vad_max_segment = 15.0    # Coupure forcée au-delà (secondes)
+        self.vad_padding = 0.2         # Silence conservé avant/après la parole (secondes)
+        self.vad_hangover = 0.5        # Silence qui termine un énoncé (secondes)
+        # Transcription en continu (fenêtre glissante, sous-titres partiels)
+        self.streaming_mode = False
+        self.stream_step = 0.5         # Intervalle entre deux décodages (secondes)
+        self.stream_window = 10.0      # Taille de fenêtre avant retrait de l'audio validé (secondes)
+        # Moteur de reconnaissance (voir transcriber.BACKENDS)
+        self.asr_backend = "faster-whisper"  # "faster-whisper" (CTranslate2), "whisper" ou "stub"
+        self.whisper_model = "base"     # tiny, base, small, medium...
+        self.asr_compute_type = "int8"  # Quantification faster-whisper (int8, int8_float32, float32)
+        self.asr_threads = 0            # Threads de calcul (0 = automatique)
+        self.inference_mode = "thread"  # "thread" (dans l'application) ou "process" (processus dédiés)
+        self.inference_workers = 1
+        self.inference_load_timeout = 300.0  # Chargement du moteur dans les processus (secondes)
+        # Pipeline d'analyse
+        self.pipeline_queue_size = 8   # Taille des files entre étapes
+        self.asr_workers = 1
+        self.analysis_backlog = 2      # Analyses sautées au-delà de ce retard de l'ASR (segments)
+        # Contrôle de qualité adaptatif (voir quality.py)
+        self.quality_control = True
+        self.latency_budget = 3.0          # Retard maximal visé entre la parole et l'affichage (secondes)
+        self.quality_rtf_high = 0.9        # Facteur temps réel qui déclenche une dégradation
+        self.quality_rtf_low = 0.5         # ... en dessous duquel la qualité peut remonter
+        self.quality_degrade_after = 2     # Mesures consécutives hors budget avant de dégrader
+        self.quality_recover_after = 6     # Mesures consécutives avec marge avant de remonter
+        self.quality_cooldown = 10.0       # Délai minimal entre deux changements (secondes)
+        self.quality_model_switch = False  # Changer de taille de modèle en dernier recours
+        self.quality_min_model = "tiny"
+        self.quality_max_model = "small"
+        # Serveur LanguageTool partagé (None = JVM locale propre à l'application)
+        self.languagetool_url = None          # ex. "http://localhost:8081"
+        self.languagetool_concurrency = 4     # Requêtes simultanées (connexions persistantes)
+        self.languagetool_timeout = 5.0       # Au-delà, l'analyse grammaticale du segment est sautée
+        self.languagetool_retry_after = 30.0  # Pause après un échec avant de réessayer le serveur
+        self.languagetool_fallback = "skip"   # Serveur injoignable au chargement : "skip" ou "local" (JVM)
+        # Serveur de transcription partagé (voir server.py ; None = modèles chargés dans l'application)
+        self.server_url = None             # ex. "localhost:8765"
+        self.server_timeout = 5.0          # Connexion au serveur (secondes)
+        self.server_batch_size = 8         # Segments par lot, tous clients confondus (décodés ensemble avec whisper)
+        self.server_batch_window = 0.05    # Attente maximale pour compléter un lot (secondes)
+        self.server_max_pending = 4        # Segments en cours par client avant d'arrêter de lire son flux
+        self.server_analysis_workers = 4   # Threads grammaire/prononciation côté serveur
+        # Caches d'analyse
+        self.grammar_cache_size = 2000  # Phrases déjà analysées par LanguageTool
+        self.pronunciation_cache_size = 5000
+        # Lexique persistant (None pour désactiver), créé au premier mot phonémisé
+        self.pronunciation_lexicon = os.path.join(app_data_dir(), "lexicon.tsv")
+        self.pronunciation_threshold = 0.6  # Score par mot sous lequel la phonémisation est vérifiée
+        # Instrumentation
+        self.metrics_enabled = True
+        self.metrics_export_path = None     # ex. "metrics.json" ou "metrics.txt"
+        self.metrics_export_interval = 5.0  # Secondes entre deux exports
+        # Affichage des sous-titres
+        self.scrollback_lines = 1000   # Lignes conservées dans la zone de texte (0 = illimité)
+        self.render_interval_ms = 33   # Regroupement des mises à jour (une par image)
+        # Journal de transcription (ouvert par open_log une fois la fenêtre affichée)
+        self.log_format = "text"       # "text" ([HH:MM:SS] texte) ou "jsonl" (un objet par segment)
+        self.log_flush_interval = 1.0  # Secondes entre deux flush
+        self.log_fsync_interval = 10.0 # Secondes entre deux fsync (None pour désactiver)
+        self.log_rotate_bytes = 0      # Rotation par taille (0 = désactivée)
+        self.log_rotate_seconds = 0    # Rotation par durée (0 = désactivée)
+        self.log_backups = 5
+        self.log_filename = None
+        self.transcript_log = None
+        # Historique indexé de toutes les sessions (voir history.py ; None pour désactiver)
+        self.history_path = "history.db"
+        self.history_flush_interval = 1.0  # Segments regroupés par transaction pendant cet intervalle
+        self.history = None
+    def load_devices(self):
+        if self.mic_devices is not None:
+            return
+        import sounddevice as sd
         self.mic_devices = sd.query_devices()
         self.input_devices = [d for d in self.mic_devices if d['max_input_channels'] > 0]
         self.device_names = [d['name'] for d in self.input_devices]
-        self.selected_device = self.device_names[0] if self.device_names else ""
-        self.device_index = self.input_devices[0]['index'] if self.input_devices else None
-        self.transcription_delay = 0.5
-        self.show_percentages = True  # Paramètre pour afficher les pourcentages
-        self.show_colors = True       # Paramètre pour afficher les couleurs
-        self.log_filename = self.ask_log_filename()
-        self.log_file = open(self.log_filename, "a", encoding="utf-8")
-    def ask_log_filename(self):
+        if not self.selected_device:
+            default = sd.default.device[0]
+            for d in self.input_devices:
+                if d['index'] == default:
+                    self.selected_device = d['name']
+            if not self.selected_device and self.device_names:
+                self.selected_device = self.device_names[0]
+    def ask_log_filename(self, parent=None):
         import tkinter.simpledialog
-        default_name = datetime.datetime.now().strftime("transcript_%Y%m%d_%H%M%S.txt")
-        name = tkinter.simpledialog.askstring("Nom du document", f"Nom du document de transcription :", initialvalue=default_name)
+        extension = "jsonl" if self.log_format == "jsonl" else "txt"
+        default_name = datetime.datetime.now().strftime(f"transcript_%Y%m%d_%H%M%S.{extension}")
+        name = tkinter.simpledialog.askstring("Nom du document", f"Nom du document de transcription :", initialvalue=default_name, parent=parent)
         return name if name else default_name
+    def open_log(self, parent=None):
+        from transcript_log import TranscriptLogWriter
+        self.log_filename = self.ask_log_filename(parent)
+        self.transcript_log = TranscriptLogWriter(self.log_filename, self.log_format,
+                                                  flush_interval=self.log_flush_interval,
+                                                  fsync_interval=self.log_fsync_interval,
+                                                  rotate_bytes=self.log_rotate_bytes,
+                                                  rotate_seconds=self.log_rotate_seconds,
+                                                  backups=self.log_backups)
+        if self.history_path:
+            from history import TranscriptHistory
+            self.history = TranscriptHistory(self.history_path, self.history_flush_interval)
+            # Même clé que history.import_transcripts : le journal ne sera pas réimporté
+            self.history.start_session(os.path.abspath(self.log_filename))
+    def write_record(self, record):
+        """Journal de la session et historique ; les écritures se font dans leurs propres threads"""
+        if self.transcript_log:
+            self.transcript_log.write(record)
+        if self.history:
+            self.history.write(record)
+    def close_log(self):
+        if self.transcript_log:
+            self.transcript_log.close()
+            self.transcript_log = None
+        if self.history:
+            self.history.close()
+            self.history = None
     def open_settings(self, parent):
+        self.load_devices()
         settings_win = tk.Toplevel(parent)
         settings_win.title("Paramètres")
         settings_win.geometry("400x350")
         
         tk.Label(settings_win, text="Choisir le micro :", font=("Arial", 12)).pack(pady=10)
         device_var = tk.StringVar(value=self.selected_device)
-        device_menu = tk.OptionMenu(settings_win, device_var, *self.device_names)
+        device_menu = tk.OptionMenu(settings_win, device_var, *(self.device_names or [""]))
         device_menu.pack(pady=10)
         
-        tk.Label(settings_win, text="Délai transcription (secondes) :", font=("Arial", 12)).pack(pady=10)
-        delay_var = tk.DoubleVar(value=self.transcription_delay)
-        delay_entry = tk.Entry(settings_win, textvariable=delay_var)
-        delay_entry.pack(pady=5)
+        # Moteur et modèle : pris en compte au prochain chargement
+        tk.Label(settings_win, text="Moteur de transcription :", font=("Arial", 12)).pack(pady=10)
+        asr_frame = tk.Frame(settings_win)
+        asr_frame.pack(pady=5)
+        backend_var = tk.StringVar(value=self.asr_backend)
+        tk.OptionMenu(asr_frame, backend_var, "faster-whisper", "whisper", "stub").pack(side="left", padx=5)
+        model_var = tk.StringVar(value=self.whisper_model)
+        tk.OptionMenu(asr_frame, model_var, "tiny", "base", "small", "medium").pack(side="left", padx=5)
         
         # Nouveaux paramètres d'affichage
         display_frame = tk.Frame(settings_win)
@@ -58,12 +198,8 @@ class AppConfig:
                 if d['name'] == self.selected_device:
                     self.device_index = d['index']
                     break
-            try:
-                val = float(delay_var.get())
-                if val > 0:
-                    self.transcription_delay = val
-            except Exception:
-                pass
+            self.asr_backend = backend_var.get()
+            self.whisper_model = model_var.get()
             
             # Appliquer les nouveaux paramètres
             self.show_percentages = percentage_var.get()
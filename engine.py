@@ -0,0 +1,305 @@
+import math
+import threading
+import time
+
+from vad import VadSegmenter
+from streaming import StreamingTranscriber
+from pipeline import Pipeline, Segment, Stage
+from transcript_log import segment_record
+from transcriber import backend_spec, load_backend
+from metrics import metrics
+from quality import QualityController
+
+
+def load_asr(config, timer):
+    """Charge le moteur ASR choisi (dans le processus ou dans des processus dédiés)"""
+    spec = backend_spec(config)
+    if config.inference_mode == "process":
+        from inference_worker import InferenceWorkerPool
+        # Le modèle vit dans des processus séparés : pas de concurrence pour le GIL avec Tk
+        with timer.phase(config.asr_backend, "processus d'inférence"):
+            pool = InferenceWorkerPool(spec, config.inference_workers)
+            # Lève l'erreur de chargement : le BackgroundLoader affiche alors "erreur"
+            pool.wait_ready(config.inference_load_timeout)
+        return pool
+    return load_backend(spec, timer)
+
+
+def load_grammar(config, timer):
+    if config.languagetool_url:
+        from analysis import GrammarAnalyzer
+        with timer.phase("languagetool", "connexion serveur"):
+            analyzer = GrammarAnalyzer(config.grammar_cache_size, server_url=config.languagetool_url,
+                                       max_concurrency=config.languagetool_concurrency,
+                                       timeout=config.languagetool_timeout,
+                                       retry_after=config.languagetool_retry_after)
+            try:
+                analyzer.lt_tool.ping()
+                return analyzer
+            except OSError as e:
+                analyzer.lt_tool.close()
+                if config.languagetool_fallback != "local":
+                    raise
+                print(f"Serveur LanguageTool injoignable ({e}), démarrage d'une JVM locale")
+    with timer.phase("languagetool", "import"):
+        import language_tool_python
+    from analysis import GrammarAnalyzer
+    with timer.phase("languagetool", "démarrage JVM"):
+        return GrammarAnalyzer(config.grammar_cache_size)
+
+
+def load_pronunciation(config, timer):
+    from analysis import PronunciationAnalyzer
+    with timer.phase("phonemizer", "initialisation espeak"):
+        analyzer = PronunciationAnalyzer(config.pronunciation_cache_size, config.pronunciation_lexicon)
+        analyzer.load_backend()
+    return analyzer
+
+
+class TranscriptionEngine:
+    """Segmentation, transcription et analyses, sans interface
+
+    Lit le tampon circulaire alimenté par la capture et fait passer les segments
+    dans le pipeline ASR -> grammaire -> prononciation. on_segment(segment) est
+    appelé dans l'ordre depuis un thread de travail ; on_live(validé, partiel)
+    reçoit les hypothèses du mode continu.
+    """
+
+    def __init__(self, config, audio_buffer, on_segment, on_live=None):
+        self.config = config
+        self.audio_buffer = audio_buffer
+        self.sample_rate = config.sample_rate
+        self.on_segment = on_segment
+        self.on_live = on_live
+        # Composants activés dès qu'ils sont chargés (None = étape sautée)
+        self.model = None
+        self.grammar = None
+        self.pronunciation = None
+        self.pronunciation_enabled = True
+        # Réglages ajustés par le contrôleur de qualité selon la charge
+        self.asr_options = {}
+        self.max_segment = config.vad_max_segment
+        self.run_grammar = True
+        self.run_pronunciation = True
+        self.quality = QualityController(config, self) if config.quality_control else None
+        self.running = False
+        self.thread = None
+        self.pipeline = None
+
+    def start(self):
+        # Un arrêt demandé juste avant : attendre que l'ancien thread ait vidé le pipeline
+        if self.is_alive():
+            self.join()
+        self.running = True
+        # Démarrer le pipeline puis le thread de segmentation/transcription
+        self.pipeline = self.build_pipeline()
+        self.pipeline.start()
+        # Jauges lues par le panneau de statistiques et l'export
+        metrics.gauge("audio_buffer.fill", lambda: self.audio_buffer.fill_level)
+        metrics.gauge("audio_buffer.overruns", lambda: self.audio_buffer.overruns)
+        for stage in self.pipeline.stages:
+            metrics.gauge(f"{stage.name}.backlog", stage.backlog)
+        loop = self.stream_loop if self.config.streaming_mode else self.transcribe_loop
+        self.thread = threading.Thread(target=loop, args=(self.pipeline,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Demande l'arrêt ; le thread vide le tampon et le pipeline avant de se terminer"""
+        self.running = False
+
+    def is_alive(self):
+        return bool(self.thread and self.thread.is_alive())
+
+    def join(self, timeout=None):
+        if self.thread:
+            self.thread.join(timeout)
+
+    def transcribe_loop(self, pipeline):
+        print("Thread de transcription démarré")
+        reported_overruns = self.audio_buffer.overruns
+        segmenter = VadSegmenter.from_config(self.config)
+
+        while self.running:
+            try:
+                # Attendre au moins une trame d'analyse
+                if segmenter.max_segment != self.max_segment:
+                    segmenter.set_max_segment(self.max_segment)
+                if not self.audio_buffer.wait(segmenter.frame_length, timeout=0.2):
+                    continue
+                with metrics.timer("vad.feed"):
+                    segments = segmenter.feed(self.audio_buffer.read())
+                if self.audio_buffer.overruns != reported_overruns:
+                    reported_overruns = self.audio_buffer.overruns
+                    print(f"Débordement du tampon audio : {self.audio_buffer.stats()}")
+
+                # Seuls les segments de parole arrivent jusqu'à Whisper
+                for start, audio_to_process in segments:
+                    pipeline.submit(self.make_segment(start, audio_to_process))
+
+            except Exception as e:
+                print(f"Erreur transcription: {e}")
+                time.sleep(1)
+
+        # Terminer l'énoncé en cours à l'arrêt
+        remaining = segmenter.feed(self.audio_buffer.read()) + segmenter.flush()
+        for start, audio_to_process in remaining:
+            pipeline.submit(self.make_segment(start, audio_to_process))
+        pipeline.stop()
+        print("Thread de transcription terminé")
+
+    def stream_loop(self, pipeline):
+        print("Thread de transcription en continu démarré")
+        segmenter = VadSegmenter.from_config(self.config)
+        streamer = StreamingTranscriber(self.model, self.sample_rate,
+                                        window_seconds=self.config.stream_window)
+        step = int(self.config.stream_step * self.sample_rate)
+        utterance = [None]   # Début de l'énoncé en cours dans la fenêtre (None = aucun)
+
+        def end_segment(start, audio):
+            # Chaque segment du VAD est un énoncé : plusieurs peuvent arriver d'un coup
+            # quand le décodage a pris du retard sur le tampon
+            if start == utterance[0]:
+                # Fenêtre ramenée à l'audio du segment : rien de ce qui suit la fin d'énoncé
+                streamer.set_audio(start, audio)
+            else:
+                if utterance[0] is not None:
+                    streamer.discard()
+                streamer.begin(start, audio)
+            self.finish_utterance(pipeline, streamer.finish(), streamer.decode_time)
+            utterance[0] = None
+
+        while self.running:
+            try:
+                if segmenter.max_segment != self.max_segment:
+                    segmenter.set_max_segment(self.max_segment)
+                # Modèle et options de décodage réglés par le contrôleur de qualité
+                streamer.model = self.model
+                streamer.options = self.asr_options
+                if not self.audio_buffer.wait(step, timeout=0.2):
+                    continue
+                chunk = self.audio_buffer.read()
+                # Le VAD sert de détecteur de fin d'énoncé ; le silence n'est jamais décodé
+                for start, audio in segmenter.feed(chunk):
+                    end_segment(start, audio)
+                start = segmenter.segment_start
+                if start is None:
+                    if utterance[0] is not None:
+                        # Parole plus courte que vad_min_segment : rejetée sans fin d'énoncé
+                        streamer.discard()
+                        utterance[0] = None
+                    continue
+                if start != utterance[0]:
+                    # Début de parole : la fenêtre part du début du segment (marge comprise)
+                    if utterance[0] is not None:
+                        streamer.discard()
+                    streamer.begin(*segmenter.current())
+                    utterance[0] = start
+                else:
+                    streamer.insert_audio(chunk)
+                with metrics.timer("asr.stream_decode"):
+                    committed, partial = streamer.process_iter()
+                if self.on_live:
+                    self.on_live(committed, partial)
+            except Exception as e:
+                print(f"Erreur transcription: {e}")
+                time.sleep(1)
+
+        try:
+            for start, audio in segmenter.feed(self.audio_buffer.read()) + segmenter.flush():
+                end_segment(start, audio)
+        except Exception as e:
+            print(f"Erreur transcription: {e}")
+        pipeline.stop()
+        print("Thread de transcription terminé")
+
+    def make_segment(self, start, audio):
+        return Segment(audio=audio, start=start, end=start + len(audio) / self.sample_rate)
+
+    def finish_utterance(self, pipeline, utterance, decode_time):
+        # Le texte déjà transcrit entre directement dans les étapes d'analyse
+        text, start, end = utterance
+        segment = Segment(text=text, start=start, end=end)
+        # Somme des décodages de la fenêtre : facteur temps réel du contrôleur de qualité
+        segment.timings["asr"] = decode_time
+        pipeline.submit(segment, stage="grammar")
+
+    def build_pipeline(self):
+        """segmentation -> ASR -> grammaire -> prononciation -> interface"""
+        cfg = self.config
+        workers = cfg.asr_workers
+        if cfg.inference_mode == "process":
+            # Un thread par processus pour les occuper tous
+            workers = max(workers, cfg.inference_workers)
+        asr = Stage("asr", self.asr_stage, workers=workers, maxsize=cfg.pipeline_queue_size)
+        # Quand l'ASR prend du retard, les analyses sont sautées plutôt que de le freiner
+        behind = lambda: asr.backlog() > cfg.analysis_backlog
+        grammar = Stage("grammar", self.grammar_stage, maxsize=cfg.pipeline_queue_size,
+                        on_full="skip", skip_if=behind)
+        pronunciation = Stage("pronunciation", self.pronunciation_stage, maxsize=cfg.pipeline_queue_size,
+                              on_full="skip", skip_if=behind)
+        return Pipeline([asr, grammar, pronunciation], self.deliver)
+
+    def asr_stage(self, segment):
+        result = self.model.transcribe(segment.audio, language="en", word_timestamps=True,
+                                     **self.asr_options)
+        self.apply_asr_result(segment, result)
+
+    def asr_batch(self, segments):
+        """Plusieurs segments (éventuellement de clients différents) en un passage du modèle"""
+        batch = getattr(self.model, "transcribe_batch", None)
+        if batch is None:
+            for segment in segments:
+                self.asr_stage(segment)
+            return
+        results = batch([s.audio for s in segments], language="en", word_timestamps=True, **self.asr_options)
+        for segment, result in zip(segments, results):
+            self.apply_asr_result(segment, result)
+
+    def apply_asr_result(self, segment, result):
+        segment.text = result.get("text", "").strip()
+        segment.corrected = segment.text
+        segment.audio = None
+        # Probabilités et horodatages calculés au décodage : base du score par mot
+        segment.words = [(w["word"], w["start"], w["end"], w.get("probability", 1.0))
+                         for s in result.get("segments", []) for w in s.get("words", [])]
+        logprobs = [s["avg_logprob"] for s in result.get("segments", []) if "avg_logprob" in s]
+        if logprobs:
+            segment.confidence = round(math.exp(sum(logprobs) / len(logprobs)), 4)
+        if segment.text:
+            print(f"Transcrit: '{segment.text}'")
+
+    def grammar_stage(self, segment):
+        if not segment.text or self.grammar is None or not self.run_grammar:
+            return
+        try:
+            segment.grammar_errors, segment.corrected = self.grammar.analyze(segment.text)
+        except Exception:
+            # Serveur lent ou injoignable : le segment est livré sans analyse
+            segment.grammar_errors = []
+            segment.corrected = segment.text
+            segment.skipped.append("grammar")
+
+    def pronunciation_stage(self, segment):
+        if (not segment.text or self.pronunciation is None or not self.pronunciation_enabled
+                or not self.run_pronunciation):
+            return
+        if segment.words:
+            segment.word_scores, low = self.pronunciation.score(segment.words, self.config.pronunciation_threshold)
+            segment.pronunciation_errors = [segment.word_scores[i][0] for i in low]
+        else:
+            segment.pronunciation_errors = self.pronunciation.check(segment.text, max_words=10)
+
+    def deliver(self, segment):
+        """Fin du pipeline (thread de travail) : journal puis affichage, dans l'ordre"""
+        if self.quality:
+            self.quality.observe(segment)
+        if segment.dropped:
+            print(f"Segment {segment.id} abandonné (pipeline saturé)")
+            return
+        metrics.observe("segment.latency", time.monotonic() - segment.created)
+        if segment.skipped:
+            print(f"Segment {segment.id} : analyses sautées {segment.skipped}")
+        if segment.text and (self.config.transcript_log or self.config.history):
+            # Journal et historique écrits hors du thread Tk
+            self.config.write_record(segment_record(segment))
+        self.on_segment(segment)
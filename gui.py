@@ -4,8 +4,15 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 import tkinter as tk
 from transcriber import Transcriber
-from analysis import GrammarAnalyzer, PronunciationAnalyzer
+from capture import AudioCapture
+from engine import load_grammar, load_pronunciation
 from config import AppConfig
+from startup import BackgroundLoader
+from subtitle_view import SubtitleRenderer, build_runs
+from pipeline import Segment
+from transcript_log import segment_record
+from metrics import metrics, MetricsExporter
+from stats_panel import StatsPanel
 
 class WhisperTkApp(tk.Tk):
     def __init__(self):
@@ -15,8 +22,9 @@ class WhisperTkApp(tk.Tk):
         self.configure(bg="#222")
         self.config = AppConfig()
         self.transcriber = Transcriber(self.config)
-        self.grammar = GrammarAnalyzer()
-        self.pronunciation = PronunciationAnalyzer()
+        # Analyseurs chargés en arrière-plan, activés chacun dès qu'ils sont prêts
+        self.grammar = None
+        self.pronunciation = None
         
         # Frame pour la zone de texte avec scrollbar
         text_frame = tk.Frame(self, bg="#222")
@@ -33,6 +41,9 @@ class WhisperTkApp(tk.Tk):
         
         self.subtitle_text.tag_configure("bad_pron", foreground="red")
         self.subtitle_text.tag_configure("timestamp", foreground="gray", font=("Arial", 10))
+        self.renderer = SubtitleRenderer(self, self.subtitle_text,
+                                         scrollback_lines=self.config.scrollback_lines,
+                                         interval_ms=self.config.render_interval_ms)
         
         self.correction_label = tk.Label(self, text="Correction ici...", font=("Arial", 14), fg="lightgreen", bg="#222")
         self.correction_label.pack(pady=10)
@@ -42,7 +53,10 @@ class WhisperTkApp(tk.Tk):
         button_frame.pack(pady=10)
         
         self.listen_active = False
-        self.toggle_button = tk.Button(button_frame, text="Démarrer", command=self.toggle_listen)
+        # Blocs déjà mixés et rééchantillonnés ; copiés car la vue est réutilisée
+        self.capture = AudioCapture(self.config, lambda audio: self.transcriber.feed(audio.copy()))
+        # Actif une fois le moteur ASR chargé
+        self.toggle_button = tk.Button(button_frame, text="Démarrer", command=self.toggle_listen, state="disabled")
         self.toggle_button.pack(side="left", padx=5)
         
         # Bouton pour effacer l'historique
@@ -52,28 +66,70 @@ class WhisperTkApp(tk.Tk):
         self.settings_button = tk.Button(button_frame, text="Paramètres", command=self.open_settings)
         self.settings_button.pack(side="left", padx=5)
         
+        metrics.enabled = self.config.metrics_enabled
+        self.stats_panel = StatsPanel(self, metrics)
+        self.stats_button = tk.Button(button_frame, text="Statistiques", command=self.stats_panel.toggle)
+        self.stats_button.pack(side="left", padx=5)
+        self.metrics_exporter = None
+        if self.config.metrics_enabled and self.config.metrics_export_path:
+            self.metrics_exporter = MetricsExporter(metrics, self.config.metrics_export_path,
+                                                    self.config.metrics_export_interval)
+        
+        self.status_label = tk.Label(self, text="", font=("Arial", 10), fg="gray", bg="#222")
+        self.status_label.pack(pady=2)
+        
+        self.loader = BackgroundLoader(self, on_ready=self.on_component_ready,
+                                       on_error=lambda name, error: self.update_status())
+        self.loader.timer.mark("interface", "fenêtre construite")
+        self.loader.load({"asr": lambda timer: self.transcriber.load(timer),
+                          "grammar": lambda timer: load_grammar(self.config, timer),
+                          "pronunciation": lambda timer: load_pronunciation(self.config, timer)})
+        self.update_status()
+        self.after(0, lambda: self.config.open_log(self))
+        
         self.transcriber.start(self.update_subtitle)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+    def on_close(self):
+        # Pas de join ici : le thread du transcripteur peut attendre le thread Tk
+        self.capture.stop()
+        self.transcriber.pause()
+        self.config.close_log()
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+        self.destroy()
+        
+    def on_component_ready(self, name, obj):
+        if name == "asr":
+            self.toggle_button.config(state="normal")
+        else:
+            setattr(self, name, obj)
+        self.update_status()
+    
+    def update_status(self):
+        labels = {"asr": f"ASR {self.config.asr_backend}", "grammar": "LanguageTool", "pronunciation": "Prononciation"}
+        states = {"loading": "chargement...", "ready": "prêt", "error": "erreur"}
+        self.status_label.config(text="   ".join(
+            f"{labels[name]} : {states[state]}" for name, state in self.loader.status.items()))
         
     def clear_history(self):
         """Efface l'historique du texte transcrit"""
-        self.subtitle_text.config(state="normal")
-        self.subtitle_text.delete("1.0", tk.END)
-        self.subtitle_text.config(state="disabled")
+        self.renderer.clear()
         
     def toggle_listen(self):
         if not self.listen_active:
             self.listen_active = True
             self.toggle_button.config(text="Arrêter")
             self.transcriber.resume()
+            self.capture.start()
         else:
             self.listen_active = False
             self.toggle_button.config(text="Démarrer")
+            self.capture.stop()
             self.transcriber.pause()
     def open_settings(self):
         self.config.open_settings(self)
     def update_subtitle(self, text):
-        import datetime
-        
         # Avec le nouveau système de segments, chaque texte est unique
         # Plus besoin de détecter les répétitions
         
@@ -81,40 +137,25 @@ class WhisperTkApp(tk.Tk):
         if not text.strip():
             return
             
-        grammar_errors = self.grammar.check(text)
-        corrected = self.grammar.correct(text)
-        pronunciation_errors = self.pronunciation.check(text)
-        
-        # Ajouter le texte complet à l'affichage
-        self.subtitle_text.config(state="normal")
-        
-        # Ajouter horodatage visible
-        time_str = datetime.datetime.now().strftime("%H:%M:%S")
-        self.subtitle_text.insert(tk.END, f"\n[{time_str}] ")
-        self.subtitle_text.tag_add("timestamp", f"end-{len(time_str)+4}c", f"end-1c")
-        
-        # Ajouter le texte transcrit avec mise en forme
-        words = text.split()
-        for word in words:
-            start_idx = self.subtitle_text.index(tk.INSERT)
-            self.subtitle_text.insert(tk.END, word + " ")
-            end_idx = self.subtitle_text.index(tk.INSERT)
-            
-            # Afficher les pourcentages seulement si activé
-            if self.config.show_percentages:
-                percent = 100 if not (pronunciation_errors and word in pronunciation_errors) else 0
-                self.subtitle_text.insert(tk.END, f"({percent}%) ")
-            
-            # Appliquer les couleurs seulement si activé
-            if self.config.show_colors and pronunciation_errors and word in pronunciation_errors:
-                self.subtitle_text.tag_add("bad_pron", start_idx, f"{end_idx}-1c")
-        
-        # Auto-scroll vers le bas pour voir le nouveau contenu
-        self.subtitle_text.see(tk.END)
-        
-        # Auto-scroll vers le bas pour voir le nouveau contenu
-        self.subtitle_text.see(tk.END)        
-        self.subtitle_text.config(state="disabled")
+        grammar_errors, corrected = [], None
+        if self.grammar:
+            try:
+                grammar_errors, corrected = self.grammar.analyze(text)
+            except Exception as e:
+                # LanguageTool indisponible : le texte est affiché sans correction
+                print(f"Erreur analyse grammaticale: {e}")
+        pronunciation_errors = self.pronunciation.check(text) if self.pronunciation else []
+        
+        if self.config.transcript_log or self.config.history:
+            segment = Segment(text=text)
+            segment.grammar_errors = grammar_errors
+            segment.corrected = corrected or text
+            segment.pronunciation_errors = pronunciation_errors
+            self.config.write_record(segment_record(segment))
+        
+        # Segment construit en mémoire puis inséré en un seul appel
+        self.renderer.append_segment(build_runs(text, pronunciation_errors,
+                                                self.config.show_percentages, self.config.show_colors))
         
         # Correction affichée en dessous
         if corrected:
@@ -0,0 +1,418 @@
+"""Historique indexé des transcriptions (SQLite + FTS5)
+
+Exemples :
+    python history.py import transcript_*.txt transcript_*.jsonl
+    python history.py search "present perfect"
+    python history.py stats
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import collections
+import datetime
+import glob
+import json
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+from analysis import normalize_word
+from metrics import metrics
+
+_STOP = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    started TEXT
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    wall_time TEXT,
+    start_time REAL,
+    end_time REAL,
+    text TEXT NOT NULL,
+    corrected TEXT,
+    confidence REAL
+);
+CREATE INDEX IF NOT EXISTS segments_session ON segments(session_id);
+CREATE INDEX IF NOT EXISTS segments_wall_time ON segments(wall_time);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text, content='segments', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS segments_fts_insert AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS segments_fts_delete AFTER DELETE ON segments BEGIN
+    INSERT INTO segments_fts(segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TABLE IF NOT EXISTS grammar_matches (
+    segment_id INTEGER NOT NULL REFERENCES segments(id),
+    position INTEGER,
+    length INTEGER,
+    message TEXT NOT NULL,
+    rule TEXT NOT NULL              -- ruleId LanguageTool, ou message pour les journaux qui n'en ont pas
+);
+CREATE INDEX IF NOT EXISTS grammar_matches_segment ON grammar_matches(segment_id);
+CREATE INDEX IF NOT EXISTS grammar_matches_rule ON grammar_matches(rule);
+CREATE TABLE IF NOT EXISTS pronunciation_flags (
+    segment_id INTEGER NOT NULL REFERENCES segments(id),
+    word TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pronunciation_flags_segment ON pronunciation_flags(segment_id);
+CREATE INDEX IF NOT EXISTS pronunciation_flags_word ON pronunciation_flags(word);
+-- Agrégats tenus à jour à l'écriture : les statistiques ne parcourent pas l'historique
+-- Regroupement par règle : le message varie avec le mot en cause, pas la règle
+CREATE TABLE IF NOT EXISTS grammar_stats (
+    rule TEXT PRIMARY KEY,
+    message TEXT NOT NULL,          -- Dernier message relevé, pour l'affichage
+    count INTEGER NOT NULL,
+    last_seen TEXT
+);
+CREATE TABLE IF NOT EXISTS pronunciation_stats (
+    word TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    last_seen TEXT
+);
+CREATE TABLE IF NOT EXISTS daily_stats (
+    day TEXT PRIMARY KEY,
+    segments INTEGER NOT NULL,
+    words INTEGER NOT NULL,
+    grammar_errors INTEGER NOT NULL,
+    pronunciation_errors INTEGER NOT NULL
+);
+"""
+
+
+def open_database(path, check_same_thread=True):
+    conn = sqlite3.connect(path, timeout=10.0, check_same_thread=check_same_thread)
+    # WAL : les recherches de l'interface ne sont pas bloquées par les écritures
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def session_id(conn, name, started=None):
+    conn.execute("INSERT OR IGNORE INTO sessions (name, started) VALUES (?, ?)", (name, started))
+    return conn.execute("SELECT id FROM sessions WHERE name = ?", (name,)).fetchone()[0]
+
+
+def _rule(match):
+    return match.get("rule") or match["message"]
+
+
+def store_records(conn, session, records):
+    """Insère des enregistrements segment_record et met à jour les agrégats (sans commit)"""
+    grammar = collections.Counter()
+    messages = {}
+    words = collections.Counter()
+    last_seen = {}
+    days = collections.defaultdict(lambda: [0, 0, 0, 0])
+    for record in records:
+        if not record.get("text"):
+            continue
+        wall = record.get("wall_time")
+        cursor = conn.execute(
+            "INSERT INTO segments (session_id, wall_time, start_time, end_time, text, corrected, confidence)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session, wall, record.get("start"), record.get("end"), record["text"],
+             record.get("corrected"), record.get("confidence")))
+        segment = cursor.lastrowid
+        matches = record.get("grammar") or []
+        flagged = [w for w in (normalize_word(w.strip()) for w in record.get("pronunciation") or []) if w]
+        conn.executemany("INSERT INTO grammar_matches (segment_id, position, length, message, rule)"
+                         " VALUES (?, ?, ?, ?, ?)",
+                         [(segment, m.get("offset"), m.get("length"), m["message"], _rule(m)) for m in matches])
+        conn.executemany("INSERT INTO pronunciation_flags (segment_id, word) VALUES (?, ?)",
+                         [(segment, w) for w in flagged])
+        grammar.update(_rule(m) for m in matches)
+        messages.update((_rule(m), m["message"]) for m in matches)
+        words.update(flagged)
+        for key in [_rule(m) for m in matches] + flagged:
+            last_seen[key] = wall
+        day = days[(wall or "")[:10]]
+        day[0] += 1
+        day[1] += len(record["text"].split())
+        day[2] += len(matches)
+        day[3] += len(flagged)
+    conn.executemany(
+        "INSERT INTO grammar_stats (rule, message, count, last_seen) VALUES (?, ?, ?, ?)"
+        " ON CONFLICT(rule) DO UPDATE SET count = count + excluded.count, message = excluded.message,"
+        " last_seen = max(coalesce(last_seen, ''), coalesce(excluded.last_seen, ''))",
+        [(r, messages[r], n, last_seen[r]) for r, n in grammar.items()])
+    conn.executemany(
+        "INSERT INTO pronunciation_stats (word, count, last_seen) VALUES (?, ?, ?)"
+        " ON CONFLICT(word) DO UPDATE SET count = count + excluded.count,"
+        " last_seen = max(coalesce(last_seen, ''), coalesce(excluded.last_seen, ''))",
+        [(w, n, last_seen[w]) for w, n in words.items()])
+    conn.executemany(
+        "INSERT INTO daily_stats (day, segments, words, grammar_errors, pronunciation_errors)"
+        " VALUES (?, ?, ?, ?, ?) ON CONFLICT(day) DO UPDATE SET"
+        " segments = segments + excluded.segments, words = words + excluded.words,"
+        " grammar_errors = grammar_errors + excluded.grammar_errors,"
+        " pronunciation_errors = pronunciation_errors + excluded.pronunciation_errors",
+        [(day, *counts) for day, counts in days.items()])
+    return sum(counts[0] for counts in days.values())
+
+
+class TranscriptHistory:
+    """Enregistrement des segments dans l'historique, dans un thread dédié
+
+    Même fonctionnement que TranscriptLogWriter : write() met l'enregistrement
+    en file sans bloquer, le thread insère par lots, une transaction par lot.
+    start_session() rattache les enregistrements suivants à une nouvelle session.
+    """
+
+    def __init__(self, path, flush_interval=1.0, max_queue=10000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(max_queue)
+        self.dropped = 0
+        self.written = 0
+        self._thread = threading.Thread(target=self._run, name="transcript-history", daemon=True)
+        self._thread.start()
+
+    def start_session(self, name, started=None):
+        started = started or datetime.datetime.now().isoformat(timespec="seconds")
+        self.queue.put(("session", name, started))
+
+    def write(self, record):
+        """Non bloquant : l'enregistrement est perdu si la file est pleine"""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        try:
+            conn = open_database(self.path)
+        except sqlite3.Error as e:
+            print(f"Historique indisponible ({self.path}): {e}")
+            return
+        # Session en cours (nom, début) ; son identifiant est relu dans chaque transaction
+        current = (datetime.datetime.now().strftime("session_%Y%m%d_%H%M%S"), None)
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            # Une transaction par intervalle plutôt qu'une par segment
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not _STOP:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            records = []
+            try:
+                with conn, metrics.timer("history.write"):
+                    for item in batch:
+                        if item is _STOP:
+                            stopping = True
+                        elif isinstance(item, tuple):
+                            # Changement de session : les enregistrements précédents restent à l'ancienne
+                            self._store(conn, current, records)
+                            records = []
+                            current = item[1:]
+                        else:
+                            records.append(item)
+                    self._store(conn, current, records)
+            except sqlite3.Error as e:
+                print(f"Erreur écriture historique: {e}")
+        conn.close()
+
+    def _store(self, conn, current, records):
+        # Après une annulation, la session est recréée dans la transaction suivante
+        if records:
+            self.written += store_records(conn, session_id(conn, *current), records)
+
+
+def _fts_query(text):
+    """Texte saisi -> requête FTS5 : chaque terme entre guillemets, * final conservé (préfixe)"""
+    terms = []
+    for term in text.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*").replace('"', '""')
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+class HistoryIndex:
+    """Recherche et statistiques sur l'historique (connexion de lecture)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = open_database(path, check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def _query(self, name, sql, params=()):
+        with self.lock, metrics.timer(f"history.{name}"):
+            return self.conn.execute(sql, params).fetchall()
+
+    def search(self, text, limit=50):
+        """[(heure, session, extrait, texte corrigé)], derniers enregistrés d'abord
+
+        Parcours de l'index dans l'ordre des rowid, arrêté à limit : pas de
+        tri de toutes les occurrences d'un mot courant.
+        """
+        query = _fts_query(text)
+        if not query:
+            return []
+        return self._query("search", """
+            SELECT s.wall_time, sessions.name, snippet(segments_fts, 0, '[', ']', '…', 16), s.corrected
+            FROM segments_fts
+            JOIN segments s ON s.id = segments_fts.rowid
+            JOIN sessions ON sessions.id = s.session_id
+            WHERE segments_fts MATCH ?
+            ORDER BY segments_fts.rowid DESC LIMIT ?""", (query, limit))
+
+    def examples(self, rule, limit=10):
+        """Segments où une règle de grammaire a été relevée, les plus récents d'abord"""
+        return self._query("examples", """
+            SELECT s.wall_time, s.text, s.corrected
+            FROM grammar_matches g JOIN segments s ON s.id = g.segment_id
+            WHERE g.rule = ? ORDER BY s.id DESC LIMIT ?""", (rule, limit))
+
+    def totals(self):
+        sessions = self._query("totals", "SELECT count(*) FROM sessions")[0][0]
+        row = self._query("totals", """
+            SELECT coalesce(sum(segments), 0), coalesce(sum(words), 0),
+                   coalesce(sum(grammar_errors), 0), coalesce(sum(pronunciation_errors), 0)
+            FROM daily_stats""")[0]
+        return {"sessions": sessions, "segments": row[0], "words": row[1],
+                "grammar_errors": row[2], "pronunciation_errors": row[3]}
+
+    def top_grammar(self, limit=20):
+        """[(règle, dernier message, nombre, dernière occurrence)]"""
+        return self._query("stats", "SELECT rule, message, count, last_seen FROM grammar_stats"
+                                    " ORDER BY count DESC LIMIT ?", (limit,))
+
+    def top_pronunciation(self, limit=20):
+        return self._query("stats", "SELECT word, count, last_seen FROM pronunciation_stats"
+                                    " ORDER BY count DESC LIMIT ?", (limit,))
+
+    def daily(self, days=30):
+        return self._query("stats", "SELECT day, segments, words, grammar_errors, pronunciation_errors"
+                                    " FROM daily_stats ORDER BY day DESC LIMIT ?", (days,))
+
+    def close(self):
+        self.conn.close()
+
+
+_LINE = re.compile(r"^\[(\d{2}):(\d{2}):(\d{2})\] (.*)$")
+_STAMP = re.compile(r"(\d{8}_\d{6})")
+
+
+def read_transcript(path):
+    """Enregistrements d'un journal existant (format text ou jsonl)"""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        lines = [line.rstrip("\n") for line in f if line.strip()]
+    if lines and lines[0].startswith("{"):
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records
+    # Format text : seule l'heure est écrite, la date vient du nom du fichier
+    stamp = _STAMP.search(os.path.basename(path))
+    if stamp:
+        current = datetime.datetime.strptime(stamp.group(1), "%Y%m%d_%H%M%S")
+    else:
+        current = datetime.datetime.fromtimestamp(os.path.getmtime(path))
+    day = current.date()
+    previous = None
+    for line in lines:
+        m = _LINE.match(line)
+        if not m:
+            continue
+        t = datetime.time(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        if previous and t < previous:
+            day += datetime.timedelta(days=1)   # Session passée minuit
+        previous = t
+        records.append({"wall_time": datetime.datetime.combine(day, t).isoformat(timespec="milliseconds"),
+                        "text": m.group(4).strip()})
+    return records
+
+
+def import_transcripts(path, files):
+    """Importe des journaux ; un fichier déjà importé (même chemin absolu) est ignoré
+
+    Le chemin sert de nom de session, comme pour les sessions enregistrées en
+    direct (AppConfig.open_log) : un journal déjà présent n'est pas dupliqué.
+    """
+    conn = open_database(path)
+    imported = 0
+    try:
+        for name in files:
+            session = os.path.abspath(name)
+            if conn.execute("SELECT 1 FROM sessions WHERE name = ?", (session,)).fetchone():
+                print(f"Déjà importé : {session}")
+                continue
+            try:
+                records = read_transcript(name)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Lecture impossible de {name}: {e}")
+                continue
+            started = records[0].get("wall_time") if records else None
+            with conn:
+                count = store_records(conn, session_id(conn, session, started), records)
+            imported += count
+            print(f"{session} : {count} segment(s)")
+    finally:
+        conn.close()
+    return imported
+
+
+def main(argv=None):
+    from config import AppConfig
+
+    parser = argparse.ArgumentParser(description="Historique des transcriptions")
+    parser.add_argument("--db", default=AppConfig().history_path or "history.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    imp = commands.add_parser("import", help="Importer des journaux transcript_*.txt / .jsonl")
+    imp.add_argument("files", nargs="+")
+    find = commands.add_parser("search", help="Recherche plein texte")
+    find.add_argument("text")
+    find.add_argument("--limit", type=int, default=20)
+    commands.add_parser("stats", help="Erreurs les plus fréquentes")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        # Motifs développés aussi sous Windows, où le shell ne le fait pas
+        files = [f for pattern in args.files for f in sorted(glob.glob(pattern)) or [pattern]]
+        start = time.perf_counter()
+        count = import_transcripts(args.db, files)
+        print(f"{count} segment(s) importé(s) en {time.perf_counter() - start:.1f} s")
+        return
+    index = HistoryIndex(args.db)
+    start = time.perf_counter()
+    if args.command == "search":
+        for wall, session, snippet, _ in index.search(args.text, args.limit):
+            print(f"{(wall or '')[:19]}  {snippet}  ({os.path.basename(session)})")
+    else:
+        print(json.dumps(index.totals(), ensure_ascii=False))
+        print("Grammaire :")
+        for _, message, count, _ in index.top_grammar(10):
+            print(f"  {count:6d}  {message}")
+        print("Prononciation :")
+        for word, count, _ in index.top_pronunciation(10):
+            print(f"  {count:6d}  {word}")
+    print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+import tkinter as tk
+
+
+class HistoryPanel:
+    """Recherche dans l'historique et erreurs les plus fréquentes (ouverte/fermée par un bouton)"""
+
+    def __init__(self, parent, config):
+        self.parent = parent
+        self.config = config
+        self.index = None
+        self.window = None
+        self.text = None
+        self.entry = None
+        self.status = None
+
+    def toggle(self):
+        if self.window is not None:
+            self.close()
+        else:
+            self.open()
+
+    def open(self):
+        if not self.config.history_path:
+            print("Historique désactivé (AppConfig.history_path)")
+            return
+        from history import HistoryIndex
+        if self.index is None:
+            self.index = HistoryIndex(self.config.history_path)
+        self.window = tk.Toplevel(self.parent)
+        self.window.title("Historique")
+        self.window.geometry("640x480")
+        self.window.configure(bg="#333")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        bar = tk.Frame(self.window, bg="#333")
+        bar.pack(fill="x", padx=10, pady=(10, 0))
+        self.entry = tk.Entry(bar, font=("Arial", 12))
+        self.entry.pack(side="left", fill="x", expand=True)
+        self.entry.bind("<Return>", lambda event: self.search())
+        for label, command in (("Rechercher", self.search), ("Erreurs fréquentes", self.show_stats),
+                               ("Importer...", self.import_files)):
+            tk.Button(bar, text=label, bg="#555", fg="white", command=command).pack(side="left", padx=(5, 0))
+        self.text = tk.Text(self.window, font=("Courier", 10), fg="white", bg="#333", wrap="word",
+                            borderwidth=0, highlightthickness=0)
+        self.text.pack(fill="both", expand=True, padx=10, pady=10)
+        self.status = tk.Label(self.window, text="", font=("Arial", 9), fg="gray", bg="#333")
+        self.status.pack(pady=(0, 5))
+        self.entry.focus_set()
+        self.show_stats()
+
+    def close(self):
+        if self.window is not None:
+            self.window.destroy()
+        self.window = None
+        self.text = None
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+    def search(self):
+        query = self.entry.get().strip()
+        if not query:
+            self.show_stats()
+            return
+        start = time.perf_counter()
+        rows = self.index.search(query)
+        elapsed = time.perf_counter() - start
+        lines = [f"{(wall or '')[:16].replace('T', ' ')}  {snippet}\n{'':18}{os.path.basename(session)}"
+                 for wall, session, snippet, _ in rows]
+        self._show("\n".join(lines) or "Aucun résultat", f"{len(rows)} résultat(s) en {elapsed * 1000:.1f} ms")
+
+    def show_stats(self):
+        start = time.perf_counter()
+        totals = self.index.totals()
+        grammar = self.index.top_grammar(15)
+        words = self.index.top_pronunciation(15)
+        days = self.index.daily(14)
+        elapsed = time.perf_counter() - start
+        lines = [f"{totals['sessions']} session(s), {totals['segments']} segment(s), {totals['words']} mot(s)",
+                 f"{totals['grammar_errors']} erreur(s) de grammaire, "
+                 f"{totals['pronunciation_errors']} mot(s) mal prononcé(s)", "",
+                 "Erreurs de grammaire les plus fréquentes :"]
+        lines += [f"  {count:5d}  {message}" for _, message, count, _ in grammar]
+        lines += ["", "Mots le plus souvent mal prononcés :"]
+        lines += [f"  {count:5d}  {word}" for word, count, _ in words]
+        lines += ["", "Par jour (segments, mots, grammaire, prononciation) :"]
+        lines += [f"  {day}  {seg:5d} {n:6d} {g:5d} {p:5d}" for day, seg, n, g, p in days]
+        self._show("\n".join(lines), f"Statistiques en {elapsed * 1000:.1f} ms")
+
+    def import_files(self):
+        import tkinter.filedialog
+        from history import import_transcripts
+        files = tkinter.filedialog.askopenfilenames(
+            parent=self.window, title="Journaux à importer",
+            filetypes=[("Journaux de transcription", "*.txt *.jsonl"), ("Tous les fichiers", "*")])
+        if not files:
+            return
+        self.status.config(text=f"Import de {len(files)} fichier(s)...")
+
+        def run():
+            try:
+                count = import_transcripts(self.config.history_path, files)
+                message = f"{count} segment(s) importé(s)"
+            except Exception as e:
+                message = f"Erreur d'import : {e}"
+            self.parent.after(0, lambda: self._imported(message))
+
+        # Import hors du thread Tk : l'interface reste utilisable pendant l'écriture
+        threading.Thread(target=run, name="history-import", daemon=True).start()
+
+    def _imported(self, message):
+        if self.window is None:
+            return
+        self.show_stats()
+        self.status.config(text=message)
+
+    def _show(self, content, status=""):
+        self.text.config(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", content)
+        self.text.config(state="disabled")
+        self.status.config(text=status)
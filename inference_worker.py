@@ -0,0 +1,283 @@
+import collections
+import concurrent.futures
+import itertools
+import multiprocessing as mp
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+
+def _attach(name):
+    """Ouvre un segment créé par le processus principal, sans l'inscrire au resource_tracker
+
+    Le processus principal le libère (unlink) ; inscrit ici, il serait signalé
+    comme fuite à la sortie du processus, voire supprimé par un suivi propre au
+    processus. Le désinscrire après coup retirerait aussi l'inscription du
+    processus principal quand le suivi est partagé : il n'est donc jamais inscrit.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+    except TypeError:
+        pass
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _worker_main(worker_id, spec, conn):
+    """Processus d'inférence : charge le moteur une fois puis traite les segments reçus sur conn"""
+    from transcriber import load_backend
+    try:
+        model = load_backend(spec)
+    except Exception as e:
+        # Paquet absent, modèle inconnu... : relancer le processus n'y changerait rien
+        conn.send(("failed", worker_id, repr(e)))
+        return
+    conn.send(("ready", worker_id, None))
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        task_id, shm_name, n_samples, options = task
+        shm = _attach(shm_name)
+        audio = None
+        try:
+            # Vue directe sur la mémoire partagée : l'audio n'est jamais sérialisé
+            audio = np.ndarray((n_samples,), dtype=np.float32, buffer=shm.buf)
+            reply = ("done", task_id, model.transcribe(audio, **options))
+        except Exception as e:
+            reply = ("error", task_id, repr(e))
+        finally:
+            audio = None
+            shm.close()
+        conn.send(reply)
+
+
+class InferenceWorkerPool:
+    """Moteur ASR dans un ou plusieurs processus dédiés, hors du processus Tk
+
+    S'utilise comme le modèle : transcribe(audio, **options) renvoie le même dictionnaire.
+    Chaque processus a son propre canal (Pipe), recréé à chaque relance, et le
+    processus principal n'envoie une tâche qu'à un processus libre : un processus
+    tué ne peut bloquer ni les autres ni son remplaçant. Un processus qui plante
+    est relancé ; le segment qu'il traitait échoue. Un processus qui n'arrive
+    pas à charger le moteur n'est pas relancé.
+    """
+
+    MAX_LOAD_RESTARTS = 3   # Plantages tolérés avant le premier chargement réussi
+
+    def __init__(self, spec, workers=1, timeout=120.0):
+        # spec : paramètres de transcriber.make_backend (nom, taille, quantification...)
+        self.spec = spec
+        self.timeout = timeout
+        self.ctx = mp.get_context("spawn")
+        self.ready = threading.Event()
+        self.closed = False
+        self.restarts = 0
+        self.load_error = None
+        self._failed = set()    # Processus dont le chargement a échoué
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._pending = {}      # task_id -> (Future, SharedMemory)
+        self._queue = collections.deque()   # Tâches en attente d'un processus libre
+        self._idle = []         # Processus chargés sans tâche
+        self._running_on = {}   # worker_id -> task_id
+        self._processes = {}
+        self._conns = {}        # worker_id -> extrémité du Pipe côté processus principal
+        for worker_id in range(workers):
+            self._spawn(worker_id)
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def _spawn(self, worker_id):
+        conn, child = self.ctx.Pipe()
+        p = self.ctx.Process(target=_worker_main, name=f"asr-worker-{worker_id}",
+                             args=(worker_id, self.spec, child), daemon=True)
+        p.start()
+        child.close()
+        self._processes[worker_id] = p
+        self._conns[worker_id] = conn
+
+    def wait_ready(self, timeout=None):
+        """Attend qu'un processus ait chargé le moteur ; lève l'erreur de chargement sinon"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.ready.wait(0.1):
+            if self.load_error is not None and len(self._failed) == len(self._processes):
+                self.close()
+                raise RuntimeError(f"Chargement du moteur impossible : {self.load_error}")
+            if deadline is not None and time.monotonic() > deadline:
+                self.close()
+                raise TimeoutError(f"Moteur non chargé après {timeout:.0f} s")
+
+    def submit(self, audio, **options):
+        """Place le segment en mémoire partagée et renvoie un Future"""
+        audio = np.asarray(audio, dtype=np.float32)
+        shm = shared_memory.SharedMemory(create=True, size=max(audio.nbytes, 1))
+        np.ndarray(audio.shape, dtype=np.float32, buffer=shm.buf)[:] = audio
+        future = Future()
+        future.task_id = next(self._ids)
+        with self._lock:
+            if self.closed:
+                shm.close()
+                shm.unlink()
+                raise RuntimeError("Pool d'inférence fermé")
+            self._pending[future.task_id] = (future, shm)
+            self._queue.append((future.task_id, shm.name, len(audio), options))
+            self._dispatch()
+        return future
+
+    def transcribe(self, audio, **options):
+        future = self.submit(audio, **options)
+        try:
+            return future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            # Abandon : la tâche n'est plus envoyée et son résultat tardif est ignoré
+            self._resolve(future.task_id, error="délai dépassé")
+            raise
+
+    def transcribe_many(self, segments, **options):
+        """Traitement hors ligne : répartit tous les segments puis rend les résultats dans l'ordre"""
+        futures = [self.submit(audio, **options) for audio in segments]
+        return [f.result(timeout=self.timeout) for f in futures]
+
+    def _dispatch(self):
+        """Envoie les tâches en attente aux processus libres (verrou tenu)"""
+        while self._idle and self._queue:
+            task = self._queue.popleft()
+            if task[0] not in self._pending:
+                continue   # Abandonnée entre-temps
+            worker_id = self._idle.pop()
+            try:
+                self._conns[worker_id].send(task)
+            except OSError:
+                # Processus mort : la tâche attend le suivant, _check_workers le relance
+                self._queue.appendleft(task)
+                continue
+            self._running_on[worker_id] = task[0]
+
+    def _resolve(self, task_id, result=None, error=None):
+        with self._lock:
+            entry = self._pending.pop(task_id, None)
+        if entry is None:
+            return
+        future, shm = entry
+        shm.close()
+        shm.unlink()
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(RuntimeError(error))
+        else:
+            future.set_result(result)
+
+    def _collect(self):
+        while not self.closed:
+            with self._lock:
+                conns = {conn: worker_id for worker_id, conn in self._conns.items()}
+                sentinels = [p.sentinel for worker_id, p in self._processes.items()
+                             if worker_id in self._conns]
+            try:
+                ready = wait(list(conns) + sentinels, timeout=0.5)
+            except (OSError, ValueError):
+                # Canal fermé pendant l'attente (relance ou fermeture)
+                continue
+            for conn in ready:
+                if conn not in conns:
+                    continue
+                try:
+                    kind, key, value = conn.recv()
+                except (EOFError, OSError):
+                    # Processus arrêté : laissé à _check_workers
+                    self._processes[conns[conn]].join(1.0)
+                    continue
+                self._handle(conns[conn], kind, key, value)
+            self._check_workers()
+
+    def _handle(self, worker_id, kind, key, value):
+        if kind == "ready":
+            self.ready.set()
+            with self._lock:
+                self._idle.append(worker_id)
+                self._dispatch()
+        elif kind == "failed":
+            print(f"Processus d'inférence {key} : échec du chargement ({value})")
+            self.load_error = value
+            self._give_up(worker_id)
+        elif kind in ("done", "error"):
+            with self._lock:
+                if self._running_on.get(worker_id) == key:
+                    del self._running_on[worker_id]
+                self._idle.append(worker_id)
+                self._dispatch()
+            if kind == "done":
+                self._resolve(key, result=value)
+            else:
+                self._resolve(key, error=value)
+
+    def _give_up(self, worker_id):
+        """Processus abandonné ; si plus aucun ne reste, les tâches en attente échouent"""
+        with self._lock:
+            self._failed.add(worker_id)
+            conn = self._conns.pop(worker_id, None)
+            stranded = []
+            if len(self._failed) == len(self._processes):
+                stranded = [task[0] for task in self._queue]
+                self._queue.clear()
+        if conn is not None:
+            conn.close()
+        for task_id in stranded:
+            self._resolve(task_id, error=f"Chargement du moteur impossible : {self.load_error}")
+
+    def _check_workers(self):
+        for worker_id, p in list(self._processes.items()):
+            if p.is_alive() or self.closed or worker_id in self._failed:
+                continue
+            if not self.ready.is_set() and self.restarts >= self.MAX_LOAD_RESTARTS:
+                # Plantage répété pendant le chargement : abandon plutôt que relance sans fin
+                self.load_error = f"processus arrêté pendant le chargement (code {p.exitcode})"
+                self._give_up(worker_id)
+                continue
+            print(f"Processus d'inférence {worker_id} arrêté (code {p.exitcode}), redémarrage")
+            with self._lock:
+                task_id = self._running_on.pop(worker_id, None)
+                if worker_id in self._idle:
+                    self._idle.remove(worker_id)
+                self._conns.pop(worker_id).close()
+                self.restarts += 1
+                self._spawn(worker_id)
+            if task_id is not None:
+                self._resolve(task_id, error=f"Processus d'inférence {worker_id} arrêté")
+
+    def close(self):
+        """Arrête les processus et libère la mémoire partagée restante"""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            conns = list(self._conns.values())
+            self._queue.clear()
+        for conn in conns:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for p in self._processes.values():
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        self._collector.join(timeout=1)
+        for conn in conns:
+            conn.close()
+        for task_id in list(self._pending):
+            self._resolve(task_id, error="Pool d'inférence fermé")
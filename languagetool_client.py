@@ -0,0 +1,182 @@
+import bisect
+import concurrent.futures
+import http.client
+import json
+import queue
+import threading
+import time
+import urllib.parse
+
+from metrics import metrics
+
+
+class LanguageToolUnavailable(Exception):
+    """Serveur injoignable, trop lent ou en erreur : l'analyse grammaticale est sautée"""
+
+
+class Match:
+    """Erreur renvoyée par le serveur (mêmes attributs que language_tool_python.Match)"""
+
+    def __init__(self, offset, length, message, replacements, rule_id=None):
+        self.offset = offset
+        self.errorLength = length
+        self.message = message
+        self.replacements = replacements
+        self.ruleId = rule_id
+
+
+class LanguageToolClient:
+    """Client d'un serveur LanguageTool partagé (API HTTP /v2/check)
+
+    Remplace language_tool_python.LanguageTool : check(text) renvoie des Match.
+    Les connexions HTTP/1.1 sont gardées ouvertes et réutilisées ; au plus
+    max_concurrency requêtes sont en cours. Quand toutes les connexions sont
+    occupées, les textes qui arrivent entre-temps partent ensemble dans la
+    requête suivante. Après un échec ou un dépassement de timeout, le serveur
+    est ignoré pendant retry_after secondes.
+
+    Serveur réel : java -cp languagetool-server.jar org.languagetool.server.HTTPServer --port 8081
+    Serveur de substitution pour les tests : python languagetool_stub.py --port 8081
+    """
+
+    SEPARATOR = "\n\n"
+
+    def __init__(self, url="http://localhost:8081", language="en-US", max_concurrency=4,
+                 timeout=5.0, max_batch_chars=20000, retry_after=30.0):
+        parsed = urllib.parse.urlsplit(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 8081
+        self.path = parsed.path.rstrip("/")
+        self.language = language
+        self.timeout = timeout
+        self.max_batch_chars = max_batch_chars
+        self.retry_after = retry_after
+        self.requests = 0
+        self.batched = 0
+        self._down_until = 0.0
+        self._connections = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._pending = queue.Queue()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_concurrency, thread_name_prefix="languagetool")
+        self._closed = False
+        self._batcher = threading.Thread(target=self._batch_loop, name="languagetool-batch", daemon=True)
+        self._batcher.start()
+
+    def ping(self):
+        """Vérifie que le serveur répond (lève OSError sinon)"""
+        self._request("GET", "/v2/languages")
+
+    def check(self, text):
+        if time.monotonic() < self._down_until:
+            raise LanguageToolUnavailable("serveur LanguageTool suspendu")
+        future = concurrent.futures.Future()
+        self._pending.put((text, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            self._mark_down("délai dépassé")
+            raise LanguageToolUnavailable("délai dépassé")
+
+    def _batch_loop(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                break
+            # Attendre une connexion libre ; les textes arrivés pendant l'attente sont regroupés
+            self._slots.acquire()
+            batch = [item]
+            size = len(item[0])
+            while size < self.max_batch_chars:
+                try:
+                    item = self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._pending.put(None)
+                    break
+                batch.append(item)
+                size += len(item[0]) + len(self.SEPARATOR)
+            self._executor.submit(self._send, batch)
+
+    def _send(self, batch):
+        try:
+            starts = []
+            pos = 0
+            for text, _ in batch:
+                starts.append(pos)
+                pos += len(text) + len(self.SEPARATOR)
+            body = urllib.parse.urlencode({"language": self.language,
+                                           "text": self.SEPARATOR.join(text for text, _ in batch)})
+            self.requests += 1
+            self.batched += len(batch)
+            metrics.incr("languagetool.requests")
+            metrics.incr("languagetool.batched_texts", len(batch))
+            try:
+                with metrics.timer("languagetool.http"):
+                    result = self._request("POST", "/v2/check", body)
+                matches = [[] for _ in batch]
+                for m in result.get("matches", []):
+                    # Erreurs réparties entre les textes regroupés
+                    i = bisect.bisect_right(starts, m["offset"]) - 1
+                    matches[i].append(Match(m["offset"] - starts[i], m["length"], m.get("message", ""),
+                                            [r["value"] for r in m.get("replacements", [])],
+                                            m.get("rule", {}).get("id")))
+            except (OSError, http.client.HTTPException, ValueError, KeyError) as e:
+                self._mark_down(e)
+                for _, future in batch:
+                    future.set_exception(LanguageToolUnavailable(str(e)))
+                return
+            for (_, future), found in zip(batch, matches):
+                future.set_result(found)
+        finally:
+            self._slots.release()
+
+    def _request(self, method, path, body=None):
+        """Requête sur une connexion du pool ; une connexion fermée par le serveur est rouverte une fois"""
+        headers = {"Connection": "keep-alive", "Accept": "application/json"}
+        if body is not None:
+            body = body.encode("utf-8")
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        for attempt in (0, 1):
+            try:
+                conn = self._connections.get_nowait()
+                reused = True
+            except queue.Empty:
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                reused = False
+            try:
+                conn.request(method, self.path + path, body, headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._connections.put(conn)
+            if response.status != 200:
+                raise http.client.HTTPException(f"HTTP {response.status} : {data[:200]!r}")
+            return json.loads(data)
+
+    def _mark_down(self, reason):
+        if time.monotonic() >= self._down_until:
+            print(f"LanguageTool indisponible ({reason}), analyses grammaticales suspendues "
+                  f"{self.retry_after:.0f} s")
+            metrics.incr("languagetool.unavailable")
+        self._down_until = time.monotonic() + self.retry_after
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._pending.put(None)
+        self._batcher.join()
+        self._executor.shutdown()
+        while True:
+            try:
+                self._connections.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,117 @@
+"""Serveur de substitution de LanguageTool (même API HTTP /v2/check, quelques règles)
+
+Sert aux tests et au développement sans JVM :
+    python languagetool_stub.py --port 8081 [--delay 0.5]
+puis AppConfig.languagetool_url = "http://localhost:8081".
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import http.server
+import json
+import re
+import threading
+import time
+import urllib.parse
+
+# (identifiant LanguageTool, motif, message, remplacement à partir du match)
+RULES = (
+    ("ENGLISH_WORD_REPEAT_RULE", re.compile(r"\b(\w+)\s+\1\b", re.IGNORECASE),
+     "Possible typo: you repeated a word", lambda m: m.group(1)),
+    ("I_LOWERCASE", re.compile(r"(?<![\w'])i(?![\w'])"),
+     "The personal pronoun “I” should be uppercase.", lambda m: "I"),
+    ("EN_A_VS_AN", re.compile(r"\ba(?= [aeiou])", re.IGNORECASE),
+     "Use “an” instead of “a” before a vowel sound.", lambda m: "an" if m.group() == "a" else "An"),
+)
+
+
+def check(text):
+    matches = []
+    for rule, pattern, message, replacement in RULES:
+        for m in pattern.finditer(text):
+            matches.append({"offset": m.start(), "length": m.end() - m.start(), "message": message,
+                            "replacements": [{"value": replacement(m)}], "rule": {"id": rule}})
+    matches.sort(key=lambda m: m["offset"])
+    return {"software": {"name": "LanguageTool (substitut)"}, "matches": matches}
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1 : connexions persistantes comme le vrai serveur
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/v2/languages"):
+            self._reply(200, [{"name": "English (US)", "code": "en", "longCode": "en-US"}])
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = urllib.parse.parse_qs(self.rfile.read(length).decode("utf-8"))
+        if not self.path.rstrip("/").endswith("/v2/check") or "text" not in form:
+            self._reply(400, {"error": "text manquant"})
+            return
+        self.server.requests += 1
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self._reply(200, check(form["text"][0]))
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+class StubLanguageToolServer:
+    """Serveur lancé dans un thread ; port=0 choisit un port libre"""
+
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0):
+        self.httpd = http.server.ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.delay = delay
+        self.httpd.requests = 0
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="languagetool-stub", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serveur LanguageTool de substitution")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--delay", type=float, default=0.0, help="Latence simulée par requête (secondes)")
+    args = parser.parse_args(argv)
+    server = StubLanguageToolServer(args.host, args.port, args.delay)
+    print(f"Serveur LanguageTool de substitution sur {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,21 @@
 import tkinter as tk
-import threading
-import sounddevice as sd
-import whisper
-import numpy as np
-import language_tool_python
 import datetime
-import time
-from difflib import SequenceMatcher
-from phonemizer import phonemize
+from audio_buffer import RingBuffer
+from capture import AudioCapture
+from inference_worker import InferenceWorkerPool
+from engine import TranscriptionEngine, load_asr, load_grammar, load_pronunciation
+from remote import RemoteEngine, probe
+from config import AppConfig
+from startup import BackgroundLoader
+from subtitle_view import SubtitleRenderer, build_runs
+from metrics import metrics, MetricsExporter
+from stats_panel import StatsPanel
+from history_panel import HistoryPanel
 
 class WhisperTkApp(tk.Tk):
-    def ask_log_filename(self):
-        import tkinter.simpledialog
-        default_name = datetime.datetime.now().strftime("transcript_%Y%m%d_%H%M%S.txt")
-        name = tkinter.simpledialog.askstring("Nom du document", f"Nom du document de transcription :", initialvalue=default_name)
-        return name if name else default_name
-        
     def __init__(self):
-        # Création du fichier de log
-        self.log_filename = self.ask_log_filename()
-        self.log_file = open(self.log_filename, "a", encoding="utf-8")
+        # Configuration partagée (le fichier de log est demandé une fois la fenêtre affichée)
+        self.app_config = AppConfig()
         super().__init__()
         self.title("Whisper Real-Time Subtitle App")
         self.geometry("800x600")
@@ -29,6 +25,12 @@ class WhisperTkApp(tk.Tk):
         self.subtitle_text = tk.Text(self, font=("Arial", 14), fg="white", bg="#222", 
                                    wrap="word", borderwidth=0, highlightthickness=0, height=15)
         self.subtitle_text.pack(pady=20, fill="both", expand=True)
+        self.subtitle_text.tag_config("bad_pron", foreground="red")
+        self.subtitle_text.tag_config("partial", foreground="gray", font=("Arial", 14, "italic"))
+        # Rendu par lots, une mise à jour par image, historique borné
+        self.renderer = SubtitleRenderer(self, self.subtitle_text,
+                                         scrollback_lines=self.app_config.scrollback_lines,
+                                         interval_ms=self.app_config.render_interval_ms)
         
         # Zone pour la correction
         self.correction_label = tk.Label(self, text="", font=("Arial", 12), fg="yellow", bg="#222", wraplength=700, justify="left")
@@ -36,57 +38,140 @@ class WhisperTkApp(tk.Tk):
         
         # Bouton
         self.toggle_button = tk.Button(self, text="Démarrer", font=("Arial", 16), 
-                                     bg="#007acc", fg="white", command=self.toggle_listening)
+                                     bg="#007acc", fg="white", command=self.toggle_listening,
+                                     state="disabled")
         self.toggle_button.pack(pady=10)
         
+        # État de chargement des modèles
+        self.status_label = tk.Label(self, text="", font=("Arial", 10), fg="gray", bg="#222")
+        self.status_label.pack(pady=2)
+        
         # Bouton paramètres
         self.settings_button = tk.Button(self, text="Paramètres", font=("Arial", 12),
                                        bg="#555", fg="white", command=self.open_settings)
         self.settings_button.pack(pady=5)
         
+        # Bouton statistiques (temps par étape, files, tampon audio)
+        metrics.enabled = self.app_config.metrics_enabled
+        self.stats_panel = StatsPanel(self, metrics)
+        self.stats_button = tk.Button(self, text="Statistiques", font=("Arial", 12),
+                                    bg="#555", fg="white", command=self.stats_panel.toggle)
+        self.stats_button.pack(pady=5)
+        # Bouton historique (recherche dans toutes les sessions, erreurs récurrentes)
+        self.history_panel = HistoryPanel(self, self.app_config)
+        self.history_button = tk.Button(self, text="Historique", font=("Arial", 12),
+                                      bg="#555", fg="white", command=self.history_panel.toggle)
+        self.history_button.pack(pady=5)
+        self.metrics_exporter = None
+        if self.app_config.metrics_enabled and self.app_config.metrics_export_path:
+            self.metrics_exporter = MetricsExporter(metrics, self.app_config.metrics_export_path,
+                                                    self.app_config.metrics_export_interval)
+        
         # Variables d'état
         self.listen_active = False
-        self.running = False
-        self.device_index = None
         
-        # Buffer audio simple
-        self.audio_buffer = np.array([], dtype=np.float32)
-        self.buffer_lock = threading.Lock()
+        # Tampon audio circulaire de capacité fixe
+        self.sample_rate = self.app_config.sample_rate
+        self.audio_buffer = RingBuffer(int(self.app_config.buffer_seconds * self.sample_rate),
+                                       overflow=self.app_config.buffer_overflow)
+        self.capture = AudioCapture(self.app_config, self.audio_buffer.write)
         
         # Paramètres par défaut
         self.show_percentages = True
         self.show_colors = True
         
-        # Charger le modèle Whisper
-        print("Chargement du modèle Whisper...")
-        self.model = whisper.load_model("base")
-        print("Modèle Whisper chargé")
+        # Segmentation, transcription et analyses hors du thread Tk,
+        # ou sur un serveur partagé (server.py) si server_url est défini
+        engine_class = RemoteEngine if self.app_config.server_url else TranscriptionEngine
+        self.engine = engine_class(self.app_config, self.audio_buffer, self.show_segment,
+                                   on_live=lambda c, p: self.after(0, lambda: self.update_live(c, p)))
+        
+        # Modèles chargés en parallèle en arrière-plan ; chaque composant
+        # est activé dès que son propre chargement est terminé
+        self.loader = BackgroundLoader(self, on_ready=self.on_component_ready,
+                                       on_error=self.on_component_error)
+        self.loader.timer.mark("interface", "fenêtre construite")
+        cfg = self.app_config
+        if cfg.server_url:
+            self.loader.load({"server": lambda timer: probe(cfg, timer)})
+        else:
+            self.loader.load({"asr": lambda timer: load_asr(cfg, timer),
+                              "grammar": lambda timer: load_grammar(cfg, timer),
+                              "pronunciation": lambda timer: load_pronunciation(cfg, timer)})
+        self.update_status()
+        self.after(0, lambda: self.app_config.open_log(self))
         
-        # Charger LanguageTool
-        print("Chargement de LanguageTool...")
-        self.lt_tool = language_tool_python.LanguageTool('en-US')
-        print("LanguageTool chargé")
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_component_ready(self, name, obj):
+        if name == "server":
+            self.toggle_button.config(state="normal")
+        elif name == "asr":
+            self.engine.model = obj
+            self.toggle_button.config(state="normal")
+        elif name == "grammar":
+            self.engine.grammar = obj
+        elif name == "pronunciation":
+            self.engine.pronunciation = obj
+        self.update_status()
+
+    def on_component_error(self, name, error):
+        self.update_status()
+
+    def update_status(self):
+        labels = {"asr": f"ASR {self.app_config.asr_backend}", "grammar": "LanguageTool", "pronunciation": "Prononciation",
+                  "server": f"Serveur {self.app_config.server_url}"}
+        states = {"loading": "chargement...", "ready": "prêt", "error": "erreur"}
+        self.status_label.config(text="   ".join(
+            f"{labels[name]} : {states[state]}" for name, state in self.loader.status.items()))
+
+    def on_close(self):
+        if self.listen_active:
+            self.toggle_listening()
+        # Attendre que le pipeline soit vidé avant de fermer le journal
+        if self.engine.is_alive():
+            self.after(100, self.on_close)
+            return
+        if isinstance(self.engine.model, InferenceWorkerPool):
+            self.engine.model.close()
+        self.app_config.close_log()
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+        self.destroy()
 
     def toggle_listening(self):
         if not self.listen_active:
+            self.audio_buffer.clear()
+            try:
+                self.engine.start()
+            except (OSError, ValueError, ConnectionError) as e:
+                # Serveur injoignable ou incompatible (RemoteEngine)
+                print(f"Démarrage de la transcription impossible: {e}")
+                return
+            
+            # Démarrer la capture une fois le moteur lancé (taux natif, conversion hors du thread audio)
+            try:
+                self.capture.start()
+            except Exception as e:
+                print(f"Capture audio impossible: {e}")
+                self.capture.stop()
+                self.engine.stop()
+                return
             self.listen_active = True
-            self.running = True
             self.toggle_button.config(text="Arrêter")
-            
-            # Démarrer l'audio stream
-            self.stream = sd.InputStream(samplerate=16000, channels=1, dtype='float32', 
-                                       callback=self.audio_callback, device=self.device_index)
-            self.stream.start()
-            
-            # Démarrer le thread de transcription
-            self.transcription_thread = threading.Thread(target=self.transcribe_loop, daemon=True)
-            self.transcription_thread.start()
         else:
             self.listen_active = False
-            self.running = False
-            self.toggle_button.config(text="Démarrer")
-            if hasattr(self, 'stream'):
-                self.stream.stop()
+            self.engine.stop()
+            # Bouton inactif tant que le thread de transcription n'est pas terminé
+            self.toggle_button.config(text="Démarrer", state="disabled")
+            self.capture.stop()
+            self.after(100, self.wait_engine_stopped)
+
+    def wait_engine_stopped(self):
+        if self.engine.is_alive():
+            self.after(100, self.wait_engine_stopped)
+            return
+        self.toggle_button.config(state="normal")
                 
     def open_settings(self):
         settings_win = tk.Toplevel(self)
@@ -97,6 +182,7 @@ class WhisperTkApp(tk.Tk):
         # Variables pour les paramètres
         percentage_var = tk.BooleanVar(value=self.show_percentages)
         color_var = tk.BooleanVar(value=self.show_colors)
+        streaming_var = tk.BooleanVar(value=self.app_config.streaming_mode)
         
         # Checkboxes
         tk.Label(settings_win, text="Paramètres d'affichage", font=("Arial", 14), fg="white", bg="#333").pack(pady=10)
@@ -109,118 +195,48 @@ class WhisperTkApp(tk.Tk):
                                 variable=color_var, fg="white", bg="#333", selectcolor="#555")
         color_cb.pack(pady=5, anchor="w", padx=20)
         
+        streaming_cb = tk.Checkbutton(settings_win, text="Sous-titres en continu (au prochain démarrage)", 
+                                    variable=streaming_var, fg="white", bg="#333", selectcolor="#555")
+        streaming_cb.pack(pady=5, anchor="w", padx=20)
+        
         def save_settings():
             self.show_percentages = percentage_var.get()
             self.show_colors = color_var.get()
+            self.engine.pronunciation_enabled = self.show_colors or self.show_percentages
+            self.app_config.streaming_mode = streaming_var.get()
             settings_win.destroy()
         
         save_btn = tk.Button(settings_win, text="Sauvegarder", command=save_settings,
                            bg="#007acc", fg="white", font=("Arial", 12))
         save_btn.pack(pady=20)
 
-    def audio_callback(self, indata, frames, time, status):
-        if status:
-            print(status)
-        
-        with self.buffer_lock:
-            # Convertir l'audio en mono et ajouter au buffer
-            audio_data = indata[:, 0]
-            self.audio_buffer = np.concatenate([self.audio_buffer, audio_data])
+    def show_segment(self, segment):
+        """Fin du pipeline (thread de travail) : affichage dans le thread Tk"""
+        self.after(0, lambda: self.update_subtitle(segment.text, segment.grammar_errors,
+                                                   segment.pronunciation_errors, segment.corrected,
+                                                   segment.word_scores))
 
-    def transcribe_loop(self):
-        print("Thread de transcription démarré")
-        
-        while self.running:
-            try:
-                # Attendre un peu d'audio
-                time.sleep(3)
-                
-                # Copier le buffer
-                with self.buffer_lock:
-                    if len(self.audio_buffer) > 16000:  # Au moins 1 seconde d'audio
-                        audio_to_process = self.audio_buffer.copy()
-                        self.audio_buffer = np.array([], dtype=np.float32)
-                    else:
-                        continue
-                
-                # Transcription
-                result = self.model.transcribe(audio_to_process, language="en", fp16=False)
-                text = result.get("text", "").strip()
-                
-                if text:
-                    print(f"Transcrit: '{text}'")
-                    
-                    # Analyse grammaire
-                    try:
-                        matches = self.lt_tool.check(text)
-                        grammar_errors = [(m.offset, m.errorLength, m.message) for m in matches]
-                        corrected = self.lt_tool.correct(text)
-                    except:
-                        grammar_errors = []
-                        corrected = text
-                    
-                    # Analyse prononciation
-                    pronunciation_errors = []
-                    if self.show_colors or self.show_percentages:
-                        words = text.split()[:10]
-                        for w in words:
-                            try:
-                                ph = phonemize(w, language='en-us', backend='espeak')
-                                if not ph.strip():
-                                    pronunciation_errors.append(w)
-                            except:
-                                pronunciation_errors.append(w)
-                    
-                    # Afficher dans l'interface
-                    self.after(0, lambda: self.update_subtitle(text, grammar_errors, pronunciation_errors, corrected))
-                    
-            except Exception as e:
-                print(f"Erreur transcription: {e}")
-                time.sleep(1)
-        
-        print("Thread de transcription terminé")
+    def update_live(self, committed, partial):
+        """Remplace sur place la ligne en cours : texte validé puis hypothèse partielle"""
+        runs = []
+        if committed or partial:
+            time_str = datetime.datetime.now().strftime("%H:%M:%S")
+            runs = [(f"\n[{time_str}]", ("timestamp",)), (f" {committed} ", ()), (partial, ("partial",))]
+        self.renderer.set_live(runs)
 
-    def update_subtitle(self, text, grammar_errors=None, pronunciation_errors=None, corrected=None):
+    def update_subtitle(self, text, grammar_errors=None, pronunciation_errors=None, corrected=None,
+                        word_scores=None):
         try:
             if not text.strip():
+                # La ligne provisoire est simplement effacée
+                self.renderer.set_live([])
                 return
             
-            # Log vers fichier
-            try:
-                time_str = datetime.datetime.now().strftime("%H:%M:%S")
-                self.log_file.write(f"[{time_str}] {text}\n")
-                self.log_file.flush()
-            except:
-                pass
-            
-            # Afficher dans l'interface
-            self.subtitle_text.config(state="normal")
-            
-            # Ajouter horodatage
-            time_str = datetime.datetime.now().strftime("%H:%M:%S")
-            self.subtitle_text.insert(tk.END, f"\n[{time_str}] ")
-            
-            # Ajouter le texte
-            words = text.split()
-            for i, word in enumerate(words):
-                start_idx = self.subtitle_text.index(tk.INSERT)
-                self.subtitle_text.insert(tk.END, word + " ")
-                end_idx = self.subtitle_text.index(tk.INSERT)
-                
-                # Afficher pourcentages
-                if self.show_percentages:
-                    is_error = pronunciation_errors and word in pronunciation_errors
-                    percent = 0 if is_error else 100
-                    self.subtitle_text.insert(tk.END, f"({percent}%) ")
-                
-                # Appliquer couleurs
-                if self.show_colors and pronunciation_errors and word in pronunciation_errors:
-                    self.subtitle_text.tag_add("bad_pron", start_idx, f"{end_idx}-1c")
-                    self.subtitle_text.tag_config("bad_pron", foreground="red")
-            
-            # Auto-scroll
-            self.subtitle_text.see(tk.END)
-            self.subtitle_text.config(state="disabled")
+            # La ligne analysée remplace la ligne provisoire, en un seul insert
+            self.renderer.append_segment(build_runs(text, pronunciation_errors,
+                                                    self.show_percentages, self.show_colors,
+                                                    word_scores=word_scores,
+                                                    threshold=self.app_config.pronunciation_threshold))
             
             # Afficher correction
             if corrected and corrected != text:
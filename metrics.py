@@ -0,0 +1,172 @@
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+class Histogram:
+    """Dernières valeurs observées (fenêtre glissante) et total cumulé"""
+
+    def __init__(self, window=500):
+        self.values = collections.deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+
+    def summary(self):
+        values = sorted(self.values)
+        if not values:
+            return {"count": self.count}
+        n = len(values)
+        return {
+            "count": self.count,
+            "mean": sum(values) / n,
+            "p50": values[n // 2],
+            "p95": values[min(n - 1, int(n * 0.95))],
+            "max": values[-1],
+            "total": self.total,
+        }
+
+
+class Metrics:
+    """Chronomètres, compteurs, histogrammes glissants et jauges
+
+    Quand enabled est faux, chaque appel se réduit à un test de booléen.
+    """
+
+    def __init__(self, enabled=True, window=500):
+        self.enabled = enabled
+        self.window = window
+        self.histograms = {}
+        self.counters = collections.Counter()
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+
+    def observe(self, name, value):
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, Histogram(self.window))
+        histogram.observe(value)
+
+    def incr(self, name, n=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] += n
+
+    def timer(self, name):
+        """with metrics.timer("languagetool.check"): ... (horloge monotone, secondes)"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return self._timer(name)
+
+    @contextlib.contextmanager
+    def _timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def gauge(self, name, func):
+        """Jauge évaluée à la lecture (profondeur de file, remplissage du tampon...)"""
+        with self.lock:
+            self.gauges[name] = func
+
+    def remove_gauge(self, name):
+        with self.lock:
+            self.gauges.pop(name, None)
+
+    def snapshot(self):
+        with self.lock:
+            histograms = dict(self.histograms)
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        values = {}
+        for name, func in gauges.items():
+            try:
+                values[name] = func()
+            except Exception:
+                values[name] = None
+        return {
+            "time": time.time(),
+            "uptime": time.monotonic() - self.started,
+            "timers": {name: h.summary() for name, h in sorted(histograms.items())},
+            "counters": dict(sorted(counters.items())),
+            "gauges": dict(sorted(values.items())),
+        }
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+def format_snapshot(snapshot):
+    """Représentation texte pour le panneau et l'export .txt"""
+    lines = [f"{'étape':<28}{'n':>7}{'moy. ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+    for name, s in snapshot["timers"].items():
+        if "mean" in s:
+            lines.append(f"{name:<28}{s['count']:>7}{s['mean'] * 1000:>10.1f}"
+                         f"{s['p95'] * 1000:>10.1f}{s['max'] * 1000:>10.1f}")
+    if snapshot["gauges"]:
+        lines.append("")
+        for name, value in snapshot["gauges"].items():
+            shown = f"{value:.3f}" if isinstance(value, float) else str(value)
+            lines.append(f"{name:<28}{shown:>17}")
+    if snapshot["counters"]:
+        lines.append("")
+        for name, value in snapshot["counters"].items():
+            lines.append(f"{name:<28}{value:>17}")
+    return "\n".join(lines)
+
+
+class MetricsExporter:
+    """Écrit périodiquement un instantané dans un fichier (JSON ou texte) pour un collecteur"""
+
+    def __init__(self, metrics, path, interval=5.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-export", daemon=True)
+        self._thread.start()
+
+    def export(self):
+        snapshot = self.metrics.snapshot()
+        if self.path.endswith(".json"):
+            data = json.dumps(snapshot, indent=2, default=str)
+        else:
+            data = format_snapshot(snapshot) + "\n"
+        # Remplacement atomique : le lecteur ne voit jamais un fichier partiel
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.export()
+            except OSError as e:
+                print(f"Erreur export métriques: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+# Instance partagée par les modules de l'application
+metrics = Metrics()
@@ -0,0 +1,185 @@
+import datetime
+import heapq
+import itertools
+import queue
+import threading
+import time
+
+from metrics import metrics
+
+_STOP = object()
+
+
+class Segment:
+    """Unité de travail qui traverse le pipeline (audio, texte et résultats d'analyse)"""
+
+    def __init__(self, audio=None, text="", start=None, end=None):
+        self.id = None
+        self.audio = audio
+        self.start = start      # Position dans le flux audio (secondes)
+        self.end = end
+        self.wall_time = datetime.datetime.now()
+        self.text = text
+        self.confidence = None
+        self.words = []         # [(mot, début, fin, probabilité)] fournis par l'ASR
+        self.word_scores = None  # [(mot, score)] calculés par l'analyse de prononciation
+        self.grammar_errors = []
+        self.corrected = text
+        self.pronunciation_errors = []
+        self.skipped = []       # Étapes sautées par manque de temps
+        self.dropped = False    # Segment abandonné (file pleine)
+        self.created = time.monotonic()
+        self.timings = {}       # Durée de traitement par étape (secondes)
+        self.queued_at = None   # Entrée dans la file de l'étape courante
+
+    def __lt__(self, other):
+        return self.id < other.id
+
+
+class Stage:
+    """Étape du pipeline : une file bornée et un ou plusieurs threads de traitement
+
+    on_full choisit la politique quand la file est pleine :
+    "block" attend, "skip" transmet le segment sans le traiter, "drop" l'abandonne.
+    skip_if permet de sauter l'étape quand une étape amont prend du retard.
+    """
+
+    def __init__(self, name, func, workers=1, maxsize=8, on_full="block", skip_if=None):
+        if on_full not in ("block", "skip", "drop"):
+            raise ValueError(f"Politique inconnue : {on_full}")
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.on_full = on_full
+        self.skip_if = skip_if
+        self.queue = queue.Queue(maxsize)
+        self.downstream = None
+        self.threads = []
+        self.processed = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.errors = 0         # Exceptions levées par func (segment transmis sans résultat)
+        self.cpu_time = 0.0     # Temps CPU cumulé des threads de l'étape
+
+    def backlog(self):
+        return self.queue.qsize()
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        """Vide la file puis arrête les threads"""
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for t in self.threads:
+            t.join()
+        self.threads = []
+
+    def put(self, segment):
+        if segment.dropped:
+            self.downstream.put(segment)
+            return
+        if self.skip_if and self.skip_if():
+            self._skip(segment)
+            return
+        segment.queued_at = time.monotonic()
+        if self.on_full == "block":
+            self.queue.put(segment)
+            return
+        try:
+            self.queue.put_nowait(segment)
+        except queue.Full:
+            if self.on_full == "skip":
+                self._skip(segment)
+            else:
+                self.dropped += 1
+                metrics.incr(f"{self.name}.dropped")
+                segment.dropped = True
+                self.downstream.put(segment)
+
+    def _skip(self, segment):
+        self.skipped += 1
+        metrics.incr(f"{self.name}.skipped")
+        segment.skipped.append(self.name)
+        self.downstream.put(segment)
+
+    def _run(self):
+        while True:
+            segment = self.queue.get()
+            if segment is _STOP:
+                break
+            start = time.monotonic()
+            metrics.observe(f"{self.name}.queue_wait", start - segment.queued_at)
+            cpu_start = time.thread_time()
+            try:
+                self.func(segment)
+                self.processed += 1
+            except Exception as e:
+                print(f"Erreur étape {self.name}: {e}")
+                self.errors += 1
+                metrics.incr(f"{self.name}.errors")
+            segment.timings[self.name] = time.monotonic() - start
+            metrics.observe(f"{self.name}.process", segment.timings[self.name])
+            self.cpu_time += time.thread_time() - cpu_start
+            self.downstream.put(segment)
+
+
+class OrderedSink:
+    """Dernière étape : rend les segments dans l'ordre de leurs identifiants"""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.next_id = 0
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def put(self, segment):
+        with self._lock:
+            heapq.heappush(self._pending, segment)
+            while self._pending and self._pending[0].id == self.next_id:
+                ready = heapq.heappop(self._pending)
+                self.next_id += 1
+                try:
+                    self.callback(ready)
+                except Exception as e:
+                    print(f"Erreur affichage segment {ready.id}: {e}")
+
+
+class Pipeline:
+    """Chaîne d'étapes reliées par des files bornées"""
+
+    def __init__(self, stages, callback):
+        self.stages = stages
+        self.sink = OrderedSink(callback)
+        for stage, downstream in zip(stages, stages[1:] + [self.sink]):
+            stage.downstream = downstream
+        self._ids = itertools.count()
+
+    def stage(self, name):
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(name)
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def submit(self, segment, stage=None):
+        """Injecte un segment (par défaut dans la première étape)"""
+        segment.id = next(self._ids)
+        target = self.stage(stage) if stage else self.stages[0]
+        target.put(segment)
+        return segment.id
+
+    def stop(self):
+        """Arrêt propre : chaque étape est vidée avant la suivante"""
+        for stage in self.stages:
+            stage.stop()
+
+    def stats(self):
+        return {s.name: {"backlog": s.backlog(), "processed": s.processed, "skipped": s.skipped,
+                         "dropped": s.dropped, "errors": s.errors, "cpu_time": s.cpu_time} for s in self.stages}
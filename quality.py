@@ -0,0 +1,175 @@
+import threading
+import time
+
+from metrics import metrics
+
+# Du plus précis au moins coûteux. Le niveau complet garde le décodage par défaut
+# du moteur (ASRBackend.decode_defaults) ; les suivants ne font que le plafonner.
+# None = pas de limite ; max_segment=None garde AppConfig.vad_max_segment
+LEVELS = (
+    {"name": "complet", "beam_size": None, "best_of": None, "temperature": None,
+     "max_segment": None, "grammar": True, "pronunciation": True},
+    {"name": "réduit", "beam_size": 2, "best_of": 2, "temperature": (0.0, 0.4, 0.8),
+     "max_segment": 10.0, "grammar": True, "pronunciation": False},
+    {"name": "glouton", "beam_size": 1, "best_of": 1, "temperature": 0.0,
+     "max_segment": 6.0, "grammar": True, "pronunciation": False},
+    {"name": "minimal", "beam_size": 1, "best_of": 1, "temperature": 0.0,
+     "max_segment": 4.0, "grammar": False, "pronunciation": False},
+)
+
+MODEL_SIZES = ("tiny", "base", "small", "medium", "large")
+
+
+def _count(temperature):
+    return len(temperature) if isinstance(temperature, (list, tuple)) else 1
+
+
+class QualityController:
+    """Ajuste la qualité de transcription pour tenir le budget de latence
+
+    Chaque segment livré fournit un facteur temps réel (temps ASR / durée audio)
+    et un retard (âge du segment + audio en attente dans le tampon), lissés par
+    moyenne exponentielle. La qualité baisse d'un cran après degrade_after
+    mesures hors budget, et remonte après recover_after mesures nettement sous
+    le budget ; deux changements sont séparés d'au moins cooldown secondes.
+    Une fois au niveau minimal, un modèle plus petit peut être chargé (et un plus
+    grand quand la machine a de la marge) si quality_model_switch est actif.
+    """
+
+    def __init__(self, config, engine, alpha=0.3):
+        self.config = config
+        self.engine = engine
+        self.alpha = alpha
+        self.level = 0
+        self.model_size = config.whisper_model
+        self.rtf = None
+        self.lag = None
+        self.events = []
+        self.loading = False
+        self._over = 0
+        self._under = 0
+        self._changed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.apply()
+        metrics.gauge("quality.level", lambda: self.level)
+        metrics.gauge("quality.rtf", lambda: self.rtf)
+        metrics.gauge("quality.lag", lambda: self.lag)
+
+    def _smooth(self, current, value):
+        return value if current is None else current + self.alpha * (value - current)
+
+    def observe(self, segment):
+        """Appelé pour chaque segment en fin de pipeline"""
+        now = time.monotonic()
+        lag = now - segment.created + len(self.engine.audio_buffer) / self.config.sample_rate
+        with self._lock:
+            self.lag = self._smooth(self.lag, lag)
+            duration = (segment.end - segment.start) if segment.end is not None and segment.start is not None else 0
+            if "asr" in segment.timings and duration > 0:
+                self.rtf = self._smooth(self.rtf, segment.timings["asr"] / duration)
+            rtf = self.rtf or 0.0
+            # Segment abandonné faute de place : surcharge quelle que soit la mesure
+            over = segment.dropped or self.lag > self.config.latency_budget or rtf > self.config.quality_rtf_high
+            under = (self.lag < self.config.latency_budget * 0.5 and rtf < self.config.quality_rtf_low)
+            self._over = self._over + 1 if over else 0
+            self._under = self._under + 1 if under else 0
+            if self.loading or now - self._changed_at < self.config.quality_cooldown:
+                return
+            if self._over >= self.config.quality_degrade_after:
+                self.degrade()
+            elif self._under >= self.config.quality_recover_after:
+                self.recover()
+
+    def degrade(self):
+        if self.level < len(LEVELS) - 1:
+            self._set_level(self.level + 1, "degrade")
+        elif not self._switch_model(-1, "degrade"):
+            return
+        self._over = self._under = 0
+
+    def recover(self):
+        # Ordre inverse de la dégradation : le modèle d'abord, puis les réglages
+        if self._index(self.model_size) < self._index(self.config.whisper_model):
+            if not self._switch_model(+1, "recover"):
+                return
+        elif self.level > 0:
+            self._set_level(self.level - 1, "recover")
+        elif not self._switch_model(+1, "recover"):
+            return
+        self._over = self._under = 0
+
+    def _index(self, size):
+        return MODEL_SIZES.index(size) if size in MODEL_SIZES else 1
+
+    def _set_level(self, level, kind):
+        self.level = level
+        self.apply()
+        self._event(kind, f"niveau {LEVELS[level]['name']}")
+
+    def apply(self):
+        """Transmet les réglages du niveau courant au moteur"""
+        settings = LEVELS[self.level]
+        max_segment = self.config.vad_max_segment
+        if settings["max_segment"] is not None:
+            max_segment = min(max_segment, settings["max_segment"])
+        self.engine.asr_options = self.decode_options(settings)
+        self.engine.max_segment = max_segment
+        self.engine.run_grammar = settings["grammar"]
+        self.engine.run_pronunciation = settings["pronunciation"]
+
+    def decode_options(self, settings):
+        """Options passées au moteur : seulement les plafonds plus bas que ses valeurs par défaut"""
+        from transcriber import ASRBackend, BACKENDS
+        defaults = (getattr(self.engine.model, "decode_defaults", None)
+                    or BACKENDS.get(self.config.asr_backend, ASRBackend).decode_defaults)
+        options = {}
+        for key in ("beam_size", "best_of"):
+            if settings[key] is not None and settings[key] < defaults[key]:
+                options[key] = settings[key]
+        # Moins de températures de repli = moins de décodages recommencés
+        temperature = settings["temperature"]
+        if temperature is not None and _count(temperature) < _count(defaults["temperature"]):
+            options["temperature"] = temperature
+        return options
+
+    def _switch_model(self, step, kind):
+        """Charge en arrière-plan le modèle voisin ; False s'il n'y en a pas"""
+        if not self.config.quality_model_switch or self.config.inference_mode != "thread":
+            return False
+        target = self._index(self.model_size) + step
+        low, high = self._index(self.config.quality_min_model), self._index(self.config.quality_max_model)
+        if not low <= target <= high:
+            return False
+        size = MODEL_SIZES[target]
+        self.loading = True
+        self._event(kind, f"chargement du modèle {size}")
+        threading.Thread(target=self._load_model, args=(size, kind), daemon=True).start()
+        return True
+
+    def _load_model(self, size, kind):
+        from transcriber import backend_spec, load_backend
+        spec = dict(backend_spec(self.config), model_size=size)
+        try:
+            model = load_backend(spec)
+        except Exception as e:
+            print(f"Échec du chargement du modèle {size}: {e}")
+        else:
+            # Les segments en cours finissent sur l'ancien modèle
+            self.engine.model = model
+            with self._lock:
+                self.model_size = size
+            print(f"Modèle {size} actif")
+        finally:
+            with self._lock:
+                self.loading = False
+                self._changed_at = time.monotonic()
+
+    def _event(self, kind, detail):
+        self._changed_at = time.monotonic()
+        rtf = f"{self.rtf:.2f}" if self.rtf is not None else "?"
+        lag = f"{self.lag:.2f}s" if self.lag is not None else "?"
+        label = "Qualité dégradée" if kind == "degrade" else "Qualité rétablie"
+        print(f"{label} : {detail} (rtf={rtf}, retard={lag}, budget={self.config.latency_budget}s)")
+        metrics.incr(f"quality.{kind}")
+        self.events.append({"time": time.time(), "event": kind, "detail": detail,
+                            "rtf": self.rtf, "lag": self.lag, "level": self.level, "model": self.model_size})
@@ -0,0 +1,161 @@
+import contextlib
+import json
+import socket
+import threading
+
+from pipeline import Segment
+from server import AUDIO, END, HELLO, MESSAGE, encode_frame, read_frame_sync
+
+
+def parse_address(url, default_port=8765):
+    """"hôte:port" (préfixe tcp:// accepté) -> (hôte, port)"""
+    address = url.split("://", 1)[-1].rstrip("/")
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, default_port
+    return host, int(port)
+
+
+def connect(config, name=None, pronunciation=True):
+    """Ouvre une session ; renvoie (socket, flux de lecture, message "ready" du serveur)"""
+    sock = socket.create_connection(parse_address(config.server_url), timeout=config.server_timeout)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    hello = {"name": name or socket.gethostname(), "format": "f32", "pronunciation": pronunciation}
+    sock.sendall(encode_frame(HELLO, json.dumps(hello).encode("utf-8")))
+    stream = sock.makefile("rb")
+    frame = read_frame_sync(stream)
+    if frame is None or frame[0] != MESSAGE:
+        sock.close()
+        raise ConnectionError("Réponse inattendue du serveur de transcription")
+    ready = json.loads(frame[1])
+    if ready.get("sample_rate") != config.sample_rate:
+        sock.close()
+        raise ValueError(f"Le serveur attend {ready.get('sample_rate')} Hz, capture à {config.sample_rate} Hz")
+    sock.settimeout(None)
+    return sock, stream, ready
+
+
+def probe(config, timer=None):
+    """Vérifie au démarrage que le serveur répond (tâche du BackgroundLoader)"""
+    with timer.phase("server", "connexion") if timer else contextlib.nullcontext():
+        sock, stream, ready = connect(config, name="probe", pronunciation=False)
+        sock.sendall(encode_frame(END))
+        stream.close()
+        sock.close()
+    return ready
+
+
+def segment_from_record(record):
+    """Inverse de transcript_log.segment_record"""
+    segment = Segment(text=record["text"], start=record["start"], end=record["end"])
+    segment.id = record["segment"]
+    segment.corrected = record["corrected"]
+    segment.confidence = record["confidence"]
+    segment.grammar_errors = [(g["offset"], g["length"], g["message"], g.get("rule")) for g in record["grammar"]]
+    segment.pronunciation_errors = record["pronunciation"]
+    segment.word_scores = [(w["word"], w["score"]) for w in record["word_scores"]] or None
+    segment.skipped = record["skipped"]
+    segment.timings = record["latency"]
+    return segment
+
+
+class RemoteEngine:
+    """Client léger de server.py, avec l'interface de engine.TranscriptionEngine
+
+    La segmentation, la transcription et les analyses sont faites par le
+    serveur. Un thread envoie le tampon audio par blocs ; un autre reçoit le
+    texte brut (affiché comme ligne en cours) puis les segments annotés,
+    dans l'ordre. Un envoi bloqué par la contre-pression du serveur laisse le
+    tampon circulaire absorber le retard.
+    """
+
+    def __init__(self, config, audio_buffer, on_segment, on_live=None):
+        self.config = config
+        self.audio_buffer = audio_buffer
+        self.on_segment = on_segment
+        self.on_live = on_live
+        # Chargés sur le serveur ; attributs conservés pour l'interface
+        self.model = None
+        self.grammar = None
+        self.pronunciation = None
+        self.pronunciation_enabled = True
+        self.running = False
+        self.sock = None
+        self.stream = None
+        self.sender = None
+        self.receiver = None
+
+    def start(self):
+        # Un arrêt demandé juste avant : attendre la fin de l'ancienne connexion
+        if self.is_alive():
+            self.join()
+        self.sock, self.stream, _ = connect(self.config, pronunciation=self.pronunciation_enabled)
+        self.running = True
+        self.sender = threading.Thread(target=self._send_loop, name="remote-send", daemon=True)
+        self.receiver = threading.Thread(target=self._receive_loop, name="remote-receive", daemon=True)
+        self.sender.start()
+        self.receiver.start()
+
+    def stop(self):
+        """Demande l'arrêt ; les derniers segments sont reçus avant la fermeture"""
+        self.running = False
+
+    def is_alive(self):
+        return bool(self.receiver and self.receiver.is_alive())
+
+    def join(self, timeout=None):
+        for t in (self.sender, self.receiver):
+            if t:
+                t.join(timeout)
+
+    def _send_audio(self):
+        views = self.audio_buffer.views()
+        n = 0
+        for view in views:
+            if len(view):
+                self.sock.sendall(encode_frame(AUDIO, view.astype("<f4", copy=False).tobytes()))
+                n += len(view)
+        self.audio_buffer.consume(n)
+
+    def _send_loop(self):
+        step = int(0.1 * self.config.sample_rate)
+        try:
+            while self.running:
+                if self.audio_buffer.wait(step, timeout=0.2):
+                    self._send_audio()
+            self._send_audio()
+            self.sock.sendall(encode_frame(END))
+        except OSError as e:
+            print(f"Envoi au serveur de transcription interrompu: {e}")
+
+    def _receive_loop(self):
+        try:
+            while True:
+                frame = read_frame_sync(self.stream)
+                if frame is None:
+                    print("Serveur de transcription déconnecté")
+                    break
+                if frame[0] != MESSAGE:
+                    continue
+                message = json.loads(frame[1])
+                kind = message.pop("type", None)
+                if kind == "asr" and self.on_live and message["text"]:
+                    self.on_live(message["text"], "")
+                elif kind == "segment":
+                    self.deliver(message)
+                elif kind == "end":
+                    break
+        except (OSError, ValueError) as e:
+            print(f"Réception du serveur de transcription interrompue: {e}")
+        finally:
+            self.running = False
+            self.stream.close()
+            self.sock.close()
+
+    def deliver(self, record):
+        segment = segment_from_record(record)
+        if segment.skipped:
+            print(f"Segment {segment.id} : analyses sautées {segment.skipped}")
+        if segment.text:
+            self.config.write_record(record)
+        self.on_segment(segment)
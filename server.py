@@ -0,0 +1,369 @@
+"""Serveur de transcription multi-clients (asyncio, TCP local)
+
+Exemples :
+    python server.py --port 8765
+    python server.py --backend stub --no-grammar     # essais sans modèle
+
+Un seul exemplaire de Whisper, LanguageTool et espeak sert tous les clients.
+Le client (remote.RemoteEngine, utilisé par main.py quand AppConfig.server_url
+est défini) envoie du PCM mono à config.sample_rate et reçoit les sous-titres.
+
+Protocole : trames [type : 1 octet][longueur : 4 octets big-endian][contenu]
+    client -> serveur : HELLO (JSON {"name", "format": "f32"|"s16", "pronunciation"}),
+                        AUDIO (PCM little-endian), END (fin du flux)
+    serveur -> client : MESSAGE (JSON) de type "ready", "asr" (texte brut dès la
+                        transcription), "segment" (texte annoté, dans l'ordre), "end"
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import itertools
+import json
+import struct
+import threading
+import time
+
+import numpy as np
+
+from metrics import metrics
+
+HELLO, AUDIO, END, MESSAGE = 1, 2, 3, 4
+MAX_FRAME = 16 * 1024 * 1024
+_HEADER = struct.Struct(">BI")
+
+
+def encode_frame(kind, payload=b""):
+    return _HEADER.pack(kind, len(payload)) + payload
+
+
+def encode_message(message):
+    return encode_frame(MESSAGE, json.dumps(message, ensure_ascii=False).encode("utf-8"))
+
+
+async def read_frame(reader):
+    kind, length = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if length > MAX_FRAME:
+        raise ValueError(f"Trame trop grande ({length} octets)")
+    return kind, await reader.readexactly(length) if length else b""
+
+
+def read_frame_sync(stream):
+    """Version bloquante pour le client (fichier obtenu par socket.makefile("rb")) ; None en fin de flux"""
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    kind, length = _HEADER.unpack(header)
+    payload = stream.read(length) if length else b""
+    if len(payload) < length:
+        return None
+    return kind, payload
+
+
+class BatchScheduler:
+    """Regroupe les segments de tous les clients pour des passages communs du modèle
+
+    Le lot n'est décodé en une fois que si le moteur le permet (ASRBackend.batched :
+    openai-whisper) ; avec faster-whisper, ses segments sont transcrits l'un
+    après l'autre, dans le même ordre équitable.
+    Chaque lot prend au plus un segment par client et par tour, en commençant
+    par les clients servis le moins récemment : un client bavard ne peut pas
+    monopoliser le modèle. Les analyses tournent ensuite dans un pool de threads.
+    """
+
+    def __init__(self, engine, batch_size=8, batch_window=0.05, analysis_workers=4):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.queues = collections.OrderedDict()   # session -> deque de segments
+        self.cond = threading.Condition()
+        self.running = True
+        self.analysis = concurrent.futures.ThreadPoolExecutor(analysis_workers, thread_name_prefix="analysis")
+        self.thread = threading.Thread(target=self._run, name="asr-batch", daemon=True)
+        self.thread.start()
+        metrics.gauge("server.queued", self.queued)
+
+    def queued(self):
+        with self.cond:
+            return sum(len(q) for q in self.queues.values())
+
+    def submit(self, session, segment):
+        with self.cond:
+            self.queues.setdefault(session, collections.deque()).append(segment)
+            self.cond.notify()
+
+    def remove(self, session):
+        """Client déconnecté : ses segments en attente sont abandonnés"""
+        with self.cond:
+            self.queues.pop(session, None)
+
+    def _next_batch(self):
+        with self.cond:
+            while self.running and not self.queued_locked():
+                self.cond.wait(0.5)
+            # Laisser le temps aux autres clients d'apporter leurs segments
+            deadline = time.monotonic() + self.batch_window
+            while self.running and self.queued_locked() < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            batch = []
+            while len(batch) < self.batch_size and self.queued_locked():
+                for session in list(self.queues):
+                    queue = self.queues[session]
+                    if queue and len(batch) < self.batch_size:
+                        batch.append((session, queue.popleft()))
+                        # Client servi : il passe en fin de tour
+                        self.queues.move_to_end(session)
+            return batch
+
+    def queued_locked(self):
+        return sum(len(q) for q in self.queues.values())
+
+    def _run(self):
+        while self.running:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            segments = [segment for _, segment in batch]
+            metrics.observe("server.batch_size", len(segments))
+            start = time.perf_counter()
+            try:
+                with metrics.timer("server.asr_batch"):
+                    self.engine.asr_batch(segments)
+            except Exception as e:
+                print(f"Erreur transcription du lot: {e}")
+                for segment in segments:
+                    segment.audio = None
+            elapsed = time.perf_counter() - start
+            for session, segment in batch:
+                segment.timings["asr"] = elapsed
+                session.transcribed(segment)
+                self.analysis.submit(self._analyze, session, segment)
+
+    def _analyze(self, session, segment):
+        try:
+            for name, stage in (("grammar", self.engine.grammar_stage),
+                                ("pronunciation", self.engine.pronunciation_stage)):
+                if name == "pronunciation" and not session.pronunciation:
+                    continue
+                start = time.perf_counter()
+                stage(segment)
+                segment.timings[name] = time.perf_counter() - start
+        except Exception as e:
+            print(f"Erreur analyse segment {segment.id} ({session.name}): {e}")
+        finally:
+            session.completed(segment)
+
+    def stop(self):
+        self.running = False
+        with self.cond:
+            self.cond.notify_all()
+        self.thread.join()
+        self.analysis.shutdown()
+
+
+class ClientSession:
+    """Un client connecté : segmentation de son flux, envoi de ses résultats dans l'ordre"""
+
+    def __init__(self, server, reader, writer, session_id):
+        from pipeline import OrderedSink
+        from vad import VadSegmenter
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.id = session_id
+        self.name = f"client-{session_id}"
+        self.pronunciation = True
+        self.dtype = np.dtype("<f4")
+        self.segmenter = VadSegmenter.from_config(server.config)
+        self.sink = OrderedSink(self._deliver)
+        # Contre-pression : au-delà de max_pending segments en cours, le socket n'est plus lu
+        self.slots = asyncio.Semaphore(server.max_pending)
+        self.ids = itertools.count()
+        self.outstanding = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.loop = asyncio.get_running_loop()
+        # drain() attend que le tampon d'écriture repasse sous cette limite
+        writer.transport.set_write_buffer_limits(high=server.write_buffer_limit)
+
+    async def run(self):
+        kind, payload = await read_frame(self.reader)
+        if kind != HELLO:
+            raise ValueError("HELLO attendu")
+        hello = json.loads(payload or b"{}")
+        self.name = hello.get("name") or self.name
+        self.pronunciation = hello.get("pronunciation", True)
+        if hello.get("format") == "s16":
+            self.dtype = np.dtype("<i2")
+        self.send({"type": "ready", "session": self.id, "sample_rate": self.server.config.sample_rate})
+        print(f"Client connecté : {self.name}")
+        while True:
+            kind, payload = await read_frame(self.reader)
+            if kind == AUDIO:
+                await self.feed(np.frombuffer(payload, dtype=self.dtype))
+            elif kind == END:
+                break
+        for start, audio in self.segmenter.flush():
+            await self.submit(start, audio)
+        await self.idle.wait()
+        self.send({"type": "end"})
+        await self.writer.drain()
+
+    async def feed(self, samples):
+        if samples.dtype != np.float32:
+            samples = samples.astype(np.float32) / 32768.0
+        for start, audio in self.segmenter.feed(samples):
+            await self.submit(start, audio)
+
+    async def submit(self, start, audio):
+        from pipeline import Segment
+        if self.slots.locked():
+            metrics.incr("server.backpressure")
+        await self.slots.acquire()
+        segment = Segment(audio=audio, start=start, end=start + len(audio) / self.server.config.sample_rate)
+        segment.id = next(self.ids)
+        self.outstanding += 1
+        self.idle.clear()
+        self.server.scheduler.submit(self, segment)
+
+    # Appelés depuis les threads du serveur
+    def transcribed(self, segment):
+        message = {"type": "asr", "segment": segment.id, "start": segment.start, "end": segment.end,
+                   "text": segment.text}
+        self._call(self._send_partial, message)
+
+    def completed(self, segment):
+        self._call(self.sink.put, segment)
+
+    def _call(self, func, arg):
+        try:
+            self.loop.call_soon_threadsafe(func, arg)
+        except RuntimeError:
+            # Boucle arrêtée (serveur en cours de fermeture)
+            pass
+
+    # Boucle asyncio
+    def _send_partial(self, message):
+        # Texte provisoire facultatif : omis si le client ne lit plus assez vite
+        if self.writer.transport.get_write_buffer_size() < self.server.write_buffer_limit:
+            self.send(message)
+
+    def _deliver(self, segment):
+        from transcript_log import segment_record
+        metrics.observe("server.segment_latency", time.monotonic() - segment.created)
+        record = segment_record(segment)
+        record["type"] = "segment"
+        self.send(record)
+        if self.writer.transport.get_write_buffer_size() < self.server.write_buffer_limit:
+            self._release()
+        else:
+            # Client qui ne lit plus : son créneau n'est rendu qu'une fois le tampon vidé,
+            # la lecture de son audio s'arrête et la mémoire du serveur reste bornée
+            self.loop.create_task(self._release_after_drain())
+
+    async def _release_after_drain(self):
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            pass
+        self._release()
+
+    def _release(self):
+        self.outstanding -= 1
+        self.slots.release()
+        if not self.outstanding:
+            self.idle.set()
+
+    def send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write(encode_message(message))
+
+
+class TranscriptionServer:
+    def __init__(self, config, engine, host="127.0.0.1", port=8765):
+        self.config = config
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.max_pending = config.server_max_pending
+        self.write_buffer_limit = 1024 * 1024
+        self.scheduler = BatchScheduler(engine, config.server_batch_size, config.server_batch_window,
+                                        config.server_analysis_workers)
+        self.sessions = set()
+        self._ids = itertools.count()
+        metrics.gauge("server.clients", lambda: len(self.sessions))
+
+    async def handle(self, reader, writer):
+        session = ClientSession(self, reader, writer, next(self._ids))
+        self.sessions.add(session)
+        try:
+            await session.run()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"Erreur client {session.name}: {e}")
+        finally:
+            self.sessions.discard(session)
+            self.scheduler.remove(session)
+            writer.close()
+            print(f"Client déconnecté : {session.name}")
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        # Port 0 : port choisi par le système
+        self.port = server.sockets[0].getsockname()[1]
+        print(f"Serveur de transcription sur {self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    from config import AppConfig
+    from engine import TranscriptionEngine, load_asr, load_grammar, load_pronunciation
+    from startup import StartupTimer
+    from transcriber import BACKENDS
+
+    parser = argparse.ArgumentParser(description="Serveur de transcription multi-clients")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="Moteur ASR (AppConfig par défaut)")
+    parser.add_argument("--model", help="Taille du modèle (tiny, base, small...)")
+    parser.add_argument("--batch-size", type=int, help="Segments par passage du modèle")
+    parser.add_argument("--no-grammar", action="store_true")
+    parser.add_argument("--no-pronunciation", action="store_true")
+    args = parser.parse_args(argv)
+
+    config = AppConfig()
+    config.asr_backend = args.backend or config.asr_backend
+    config.whisper_model = args.model or config.whisper_model
+    config.server_batch_size = args.batch_size or config.server_batch_size
+    # Le lot tourne dans un seul thread : pas de contrôleur de qualité par client
+    config.quality_control = False
+    timer = StartupTimer()
+    engine = TranscriptionEngine(config, None, None)
+    engine.model = load_asr(config, timer)
+    if not args.no_grammar:
+        engine.grammar = load_grammar(config, timer)
+    if not args.no_pronunciation:
+        engine.pronunciation = load_pronunciation(config, timer)
+    print(timer.report())
+    if not getattr(engine.model, "batched", False):
+        print(f"Moteur {config.asr_backend} : pas de décodage en lot, un appel par segment")
+    server = TranscriptionServer(config, engine, args.host, args.port)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import contextlib
+import threading
+import time
+
+PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    """Chronomètre les phases de démarrage (imports, chargement des modèles, JVM)"""
+
+    def __init__(self):
+        self.phases = []    # (composant, phase, durée en secondes)
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, component, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases.append((component, name, time.perf_counter() - start))
+
+    def mark(self, component, name):
+        """Enregistre le temps écoulé depuis le lancement du processus"""
+        with self.lock:
+            self.phases.append((component, name, time.perf_counter() - PROCESS_START))
+
+    def report(self):
+        with self.lock:
+            phases = list(self.phases)
+        lines = ["Temps de démarrage :"]
+        for component, name, duration in phases:
+            lines.append(f"  {component:<15} {name:<30} {duration * 1000:8.0f} ms")
+        lines.append(f"  {'total':<15} {'depuis le lancement':<30} {(time.perf_counter() - PROCESS_START) * 1000:8.0f} ms")
+        return "\n".join(lines)
+
+
+class BackgroundLoader:
+    """Charge les composants lourds en parallèle, hors du thread Tk
+
+    Chaque chargement tourne dans son propre thread ; on_ready(nom, objet) et
+    on_error(nom, exception) sont rappelés dans le thread Tk via root.after.
+    """
+
+    def __init__(self, root, on_ready=None, on_error=None, on_done=None):
+        self.root = root
+        self.on_ready = on_ready
+        self.on_error = on_error
+        self.on_done = on_done
+        self.timer = StartupTimer()
+        self.status = {}
+        self.results = {}
+        self.lock = threading.Lock()
+        self.reported = False
+
+    def load(self, tasks):
+        """tasks : {nom: func} ; func(timer) renvoie l'objet chargé"""
+        # Tous les états sont enregistrés avant le premier démarrage
+        with self.lock:
+            for name in tasks:
+                self.status[name] = "loading"
+        for name, func in tasks.items():
+            threading.Thread(target=self._run, args=(name, func), name=f"load-{name}", daemon=True).start()
+
+    def is_ready(self, name):
+        return self.status.get(name) == "ready"
+
+    def pending(self):
+        with self.lock:
+            return [name for name, state in self.status.items() if state == "loading"]
+
+    def _run(self, name, func):
+        try:
+            obj = func(self.timer)
+        except Exception as e:
+            print(f"Erreur chargement {name}: {e}")
+            state = "error"
+            callback = self.on_error and (lambda error=e: self.on_error(name, error))
+        else:
+            state = "ready"
+            callback = self.on_ready and (lambda: self.on_ready(name, obj))
+        with self.lock:
+            self.status[name] = state
+            if state == "ready":
+                self.results[name] = obj
+            done = not self.reported and "loading" not in self.status.values()
+            if done:
+                self.reported = True
+        if callback:
+            self.root.after(0, callback)
+        if done:
+            print(self.timer.report())
+            if self.on_done:
+                self.root.after(0, self.on_done)
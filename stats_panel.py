@@ -0,0 +1,56 @@
+import tkinter as tk
+
+from metrics import format_snapshot
+
+
+class StatsPanel:
+    """Fenêtre de statistiques rafraîchie périodiquement (ouverte/fermée par un bouton)"""
+
+    def __init__(self, parent, metrics, interval_ms=1000):
+        self.parent = parent
+        self.metrics = metrics
+        self.interval_ms = interval_ms
+        self.window = None
+        self.text = None
+        self._job = None
+
+    def toggle(self):
+        if self.window is not None:
+            self.close()
+        else:
+            self.open()
+
+    def open(self):
+        self.window = tk.Toplevel(self.parent)
+        self.window.title("Statistiques")
+        self.window.geometry("520x420")
+        self.window.configure(bg="#333")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.text = tk.Text(self.window, font=("Courier", 10), fg="white", bg="#333",
+                            borderwidth=0, highlightthickness=0)
+        self.text.pack(fill="both", expand=True, padx=10, pady=10)
+        if not self.metrics.enabled:
+            self._show("Instrumentation désactivée (AppConfig.metrics_enabled)")
+            return
+        self.refresh()
+
+    def close(self):
+        if self._job is not None:
+            self.parent.after_cancel(self._job)
+            self._job = None
+        if self.window is not None:
+            self.window.destroy()
+        self.window = None
+        self.text = None
+
+    def refresh(self):
+        if self.window is None:
+            return
+        self._show(format_snapshot(self.metrics.snapshot()))
+        self._job = self.parent.after(self.interval_ms, self.refresh)
+
+    def _show(self, content):
+        self.text.config(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", content)
+        self.text.config(state="disabled")
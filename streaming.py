@@ -0,0 +1,167 @@
+import time
+
+import numpy as np
+
+
+class HypothesisBuffer:
+    """Politique d'accord local : un mot est validé quand deux décodages successifs le confirment"""
+
+    def __init__(self):
+        self.committed = []      # Mots validés encore présents dans la fenêtre (start, end, word)
+        self.previous = []       # Hypothèse précédente non validée
+        self.current = []        # Dernière hypothèse reçue
+        self.last_committed_time = 0.0
+
+    def insert(self, words):
+        """words : liste (start, end, word) en temps absolu"""
+        # On ignore ce qui précède la fin du dernier mot validé
+        words = [w for w in words if w[0] > self.last_committed_time - 0.1]
+        if words and self.committed and abs(words[0][0] - self.last_committed_time) < 1:
+            # Retirer un recouvrement de n-grammes avec la fin du texte validé
+            committed_tail = [w[2].strip().lower() for w in self.committed[-5:]]
+            for n in range(min(len(committed_tail), len(words)), 0, -1):
+                head = [w[2].strip().lower() for w in words[:n]]
+                if committed_tail[-n:] == head:
+                    words = words[n:]
+                    break
+        self.current = words
+
+    def flush(self):
+        """Valide le plus long préfixe commun aux deux dernières hypothèses"""
+        commit = []
+        while self.current and self.previous:
+            start, end, word = self.current[0]
+            if word.strip().lower() != self.previous[0][2].strip().lower():
+                break
+            commit.append((start, end, word))
+            self.last_committed_time = end
+            self.current.pop(0)
+            self.previous.pop(0)
+        self.previous = self.current
+        self.current = []
+        self.committed.extend(commit)
+        return commit
+
+    def pop_committed(self, time):
+        """Oublie les mots validés qui se terminent avant time (audio retiré de la fenêtre)"""
+        while self.committed and self.committed[0][1] <= time:
+            self.committed.pop(0)
+
+    def partial(self):
+        return self.previous
+
+    def reset(self):
+        self.committed = []
+        self.previous = []
+        self.current = []
+
+
+def words_text(words):
+    return "".join(w[2] for w in words).strip()
+
+
+class StreamingTranscriber:
+    """Transcription sur fenêtre glissante avec hypothèses partielles et validées
+
+    La fenêtre grossit à chaque pas ; l'audio déjà validé en est retiré dès qu'elle
+    dépasse window_seconds, ce qui borne le coût de chaque décodage.
+    """
+
+    def __init__(self, model, sample_rate=16000, window_seconds=10.0, language="en", prompt_chars=200):
+        self.model = model
+        self.sample_rate = sample_rate
+        self.window_seconds = window_seconds
+        self.language = language
+        self.prompt_chars = prompt_chars
+        self.hypothesis = HypothesisBuffer()
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.offset = 0.0          # Temps absolu du premier échantillon de la fenêtre
+        self.utterance = []        # Mots validés de l'énoncé en cours
+        self.context = ""          # Texte validé sorti de la fenêtre (sert d'invite)
+        self.options = {}          # Options de décodage du contrôleur de qualité (beam_size...)
+        self.decode_time = 0.0     # Temps de décodage cumulé de l'énoncé en cours (secondes)
+
+    def begin(self, start, audio):
+        """Début d'énoncé : la fenêtre commence à start (secondes depuis le début du flux)"""
+        self.offset = start
+        self.hypothesis.last_committed_time = start
+        self.audio = np.array(audio, dtype=np.float32)
+        self.decode_time = 0.0
+
+    def set_audio(self, start, audio):
+        """Remplace la fenêtre par l'audio du segment (start, audio), moins la partie déjà retirée"""
+        skip = max(0, int(round((self.offset - start) * self.sample_rate)))
+        self.audio = np.array(audio[skip:], dtype=np.float32)
+
+    def discard(self):
+        """Abandonne l'énoncé en cours (bruit trop court pour être de la parole)"""
+        self.offset += len(self.audio) / self.sample_rate
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.utterance = []
+        self.hypothesis.reset()
+        self.hypothesis.last_committed_time = self.offset
+        self.decode_time = 0.0
+
+    def insert_audio(self, chunk):
+        self.audio = np.concatenate([self.audio, chunk])
+
+    def decode(self):
+        # Invite : texte précédant la fenêtre (énoncés passés et mots déjà retirés)
+        trimmed = words_text([w for w in self.utterance if w[1] <= self.offset])
+        prompt = (self.context + " " + trimmed).strip()[-self.prompt_chars:]
+        started = time.perf_counter()
+        result = self.model.transcribe(self.audio, language=self.language,
+                                       word_timestamps=True, condition_on_previous_text=False,
+                                       initial_prompt=prompt or None, **self.options)
+        self.decode_time += time.perf_counter() - started
+        words = []
+        for segment in result.get("segments", []):
+            for w in segment.get("words", []):
+                words.append((w["start"] + self.offset, w["end"] + self.offset, w["word"]))
+        return words
+
+    def process_iter(self):
+        """Décode la fenêtre ; renvoie (texte validé de l'énoncé, texte partiel)"""
+        if len(self.audio) == 0:
+            return words_text(self.utterance), ""
+        self.hypothesis.insert(self.decode())
+        self.utterance.extend(self.hypothesis.flush())
+
+        window = len(self.audio) / self.sample_rate
+        if window > self.window_seconds and self.hypothesis.committed:
+            self._trim(self.hypothesis.committed[-1][1])
+        elif window > 2 * self.window_seconds:
+            # Aucun accord depuis trop longtemps : on valide l'hypothèse telle quelle
+            self.utterance.extend(self.hypothesis.partial())
+            self.hypothesis.previous = []
+            self.hypothesis.last_committed_time = self.offset + window
+            self._trim(self.offset + window)
+        return words_text(self.utterance), words_text(self.hypothesis.partial())
+
+    def finish(self):
+        """Fin d'énoncé : valide le reste de l'hypothèse et vide la fenêtre
+
+        Renvoie (texte, début, fin) ; début et fin en secondes depuis le début du flux.
+        """
+        if len(self.audio):
+            self.hypothesis.insert(self.decode())
+            self.utterance.extend(self.hypothesis.flush())
+        words = self.utterance + self.hypothesis.partial()
+        text = words_text(words)
+        start = words[0][0] if words else self.offset
+        end = words[-1][1] if words else self.offset
+        self.context = (self.context + " " + text).strip()[-self.prompt_chars:]
+        self.offset += len(self.audio) / self.sample_rate
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.utterance = []
+        self.hypothesis.reset()
+        self.hypothesis.last_committed_time = self.offset
+        return text, start, end
+
+    def _trim(self, time):
+        cut = int((time - self.offset) * self.sample_rate)
+        if cut <= 0:
+            return
+        self.audio = self.audio[cut:]
+        self.offset = time
+        self.hypothesis.pop_committed(time)
@@ -0,0 +1,125 @@
+import datetime
+import threading
+
+from metrics import metrics
+
+
+def build_runs(text, pronunciation_errors=(), show_percentages=True, show_colors=True, time_str=None,
+               word_scores=None, threshold=0.6):
+    """Construit les morceaux (texte, tags) d'un segment, à passer en un seul insert
+
+    word_scores : [(mot, score entre 0 et 1)] ; chaque occurrence est colorée
+    selon son propre score. À défaut, chaque mot vaut 0 ou 100 %.
+    """
+    errors = set(pronunciation_errors or ())
+    if time_str is None:
+        time_str = datetime.datetime.now().strftime("%H:%M:%S")
+    runs = [(f"\n[{time_str}]", ("timestamp",))]
+    plain = [" "]
+    if not word_scores:
+        word_scores = [(word, 0.0 if word in errors else 1.0) for word in text.split()]
+    for word, score in word_scores:
+        if not word:
+            continue
+        is_error = score < threshold
+        if show_colors and is_error:
+            runs.append(("".join(plain), ()))
+            runs.append((word, ("bad_pron",)))
+            plain = [" "]
+        else:
+            plain.append(word)
+            plain.append(" ")
+        if show_percentages:
+            plain.append(f"({score:.0%}) ")
+    runs.append(("".join(plain), ()))
+    return runs
+
+
+def flatten(runs):
+    """[(texte, tags)] -> arguments de Text.insert (texte, tags, texte, tags, ...)"""
+    args = []
+    for chars, tags in runs:
+        if chars:
+            args.append(chars)
+            args.append(tags)
+    return args
+
+
+class SubtitleRenderer:
+    """Affichage des sous-titres par lots dans un widget Text
+
+    Les mises à jour sont mises en file et appliquées au plus une fois par
+    intervalle d'affichage ; au-delà de scrollback_lines, les lignes les plus
+    anciennes sont supprimées pour garder un coût de rendu constant.
+    """
+
+    def __init__(self, root, text_widget, scrollback_lines=1000, interval_ms=33):
+        self.root = root
+        self.text = text_widget
+        self.scrollback_lines = scrollback_lines
+        self.interval_ms = interval_ms
+        self._pending = []
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self.refreshes = 0
+        # Début de la ligne provisoire (texte remplacé sur place)
+        self.text.mark_set("live_start", "end-1c")
+        self.text.mark_gravity("live_start", "left")
+
+    def append_segment(self, runs):
+        self._push(("segment", runs))
+
+    def set_live(self, runs):
+        self._push(("live", runs))
+
+    def clear(self):
+        self._push(("clear", None))
+
+    def _push(self, op):
+        with self._lock:
+            self._pending.append(op)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.root.after(self.interval_ms, self._flush)
+
+    def _flush(self):
+        with self._lock:
+            ops = self._pending
+            self._pending = []
+            self._scheduled = False
+        if not ops:
+            return
+        with metrics.timer("ui.render"):
+            self._apply(ops)
+        metrics.incr("ui.refreshes")
+        metrics.incr("ui.merged_updates", len(ops) - 1)
+
+    def _apply(self, ops):
+        # Une ligne provisoire suivie d'une autre mise à jour est déjà périmée
+        ops = [op for i, op in enumerate(ops)
+               if op[0] != "live" or i == len(ops) - 1]
+        self.text.config(state="normal")
+        for kind, runs in ops:
+            if kind == "clear":
+                self.text.delete("1.0", "end")
+                self.text.mark_set("live_start", "end-1c")
+                continue
+            self.text.delete("live_start", "end-1c")
+            args = flatten(runs or [])
+            if args:
+                self.text.insert("end-1c", *args)
+            if kind == "segment":
+                self.text.mark_set("live_start", "end-1c")
+        self._trim()
+        self.text.see("end")
+        self.text.config(state="disabled")
+        self.refreshes += 1
+
+    def _trim(self):
+        if not self.scrollback_lines:
+            return
+        lines = int(self.text.index("end-1c").split(".")[0])
+        excess = lines - self.scrollback_lines
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# Modules à la racine du dépôt, importés par leur nom comme dans l'application
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def languagetool_server():
+    """Serveur LanguageTool de substitution sur un port libre"""
+    from languagetool_stub import StubLanguageToolServer
+    server = StubLanguageToolServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def config():
+    """Configuration sans modèle réel, journal, historique ni contrôle de qualité"""
+    from config import AppConfig
+    cfg = AppConfig()
+    cfg.asr_backend = "stub"
+    cfg.quality_control = False
+    cfg.pronunciation_lexicon = None
+    cfg.history_path = None
+    return cfg
@@ -0,0 +1,51 @@
+from analysis import GrammarAnalyzer, apply_replacements, split_sentences
+
+
+def analyzer(server):
+    return GrammarAnalyzer(100, server_url=server.url, timeout=5.0)
+
+
+def test_replacements_use_offsets_in_the_full_text(languagetool_server):
+    text = "Hello there. Well   it is is a apple."
+    errors, corrected = analyzer(languagetool_server).analyze(text)
+    assert corrected == "Hello there. Well   it is an apple."
+    spans = sorted(text[offset:offset + length] for offset, length, _, _ in errors)
+    assert spans == ["a", "is is"]
+    # Identifiant de règle LanguageTool transmis avec chaque erreur
+    assert sorted(rule for *_, rule in errors) == ["ENGLISH_WORD_REPEAT_RULE", "EN_A_VS_AN"]
+
+
+def test_cache_hit_keeps_exact_offsets(languagetool_server):
+    grammar = analyzer(languagetool_server)
+    grammar.analyze("Well   it is is a apple.")
+    requests = languagetool_server.requests
+    # Même phrase à une autre position : servie par le cache, positions recalculées
+    text = "Good morning. Well   it is is a apple."
+    errors, corrected = grammar.analyze(text)
+    assert grammar.hits == 1
+    assert languagetool_server.requests == requests + 1   # seule la nouvelle phrase est envoyée
+    assert corrected == "Good morning. Well   it is an apple."
+    assert sorted(text[o:o + n] for o, n, _, _ in errors) == ["a", "is is"]
+
+
+def test_cache_key_is_the_exact_sentence(languagetool_server):
+    grammar = analyzer(languagetool_server)
+    grammar.analyze("it is is a apple.")
+    # Espacement différent : pas de positions réutilisées à tort
+    errors, corrected = grammar.analyze("it  is is a apple.")
+    assert grammar.hits == 0
+    assert corrected == "it  is an apple."
+
+
+def test_cache_is_bounded(languagetool_server):
+    grammar = GrammarAnalyzer(2, server_url=languagetool_server.url)
+    for sentence in ("One.", "Two.", "Three."):
+        grammar.analyze(sentence)
+    assert list(grammar.cache) == ["Two.", "Three."]
+
+
+def test_split_sentences_and_overlapping_replacements():
+    assert split_sentences("Hi.  How are you?") == [(0, "Hi."), (5, "How are you?")]
+    matches = [(0, 5, "a", ["X"]), (3, 4, "b", ["Y"])]
+    # Correction chevauchante ignorée
+    assert apply_replacements("abcdefgh", matches) == "abcYh"
@@ -0,0 +1,76 @@
+import threading
+
+import numpy as np
+import pytest
+
+from audio_buffer import BLOCK, DROP_OLDEST, RingBuffer
+
+
+def samples(start, stop):
+    return np.arange(start, stop, dtype=np.float32)
+
+
+def test_wrap_around_keeps_order():
+    buffer = RingBuffer(8)
+    buffer.write(samples(0, 6))
+    assert list(buffer.read(4)) == [0, 1, 2, 3]
+    buffer.write(samples(6, 11))
+    # Données à cheval sur la fin du tableau : deux vues
+    views = buffer.views()
+    assert len(views) == 2
+    assert list(np.concatenate(views)) == list(range(4, 11))
+    out = np.empty(16, dtype=np.float32)
+    assert list(buffer.read(out=out)) == list(range(4, 11))
+    assert len(buffer) == 0
+
+
+def test_consume_and_partial_views():
+    buffer = RingBuffer(8)
+    buffer.write(samples(0, 5))
+    assert list(buffer.views(3)[0]) == [0, 1, 2]
+    assert buffer.consume(10) == 5
+    assert len(buffer) == 0
+
+
+def test_drop_oldest_overwrites_oldest_samples():
+    buffer = RingBuffer(4, overflow=DROP_OLDEST)
+    buffer.write(samples(0, 3))
+    assert buffer.write(samples(3, 6)) == 3
+    assert list(buffer.read()) == [2, 3, 4, 5]
+    assert buffer.overruns == 1
+    assert buffer.dropped_samples == 2
+
+
+def test_block_larger_than_capacity_keeps_the_end():
+    buffer = RingBuffer(4)
+    assert buffer.write(samples(0, 10)) == 4
+    assert list(buffer.read()) == [6, 7, 8, 9]
+    assert buffer.dropped_samples == 6
+
+
+def test_block_mode_refuses_after_timeout():
+    buffer = RingBuffer(4, overflow=BLOCK, block_timeout=0.01)
+    buffer.write(samples(0, 3))
+    # Une seule place libre : le reste est refusé une fois le délai passé
+    assert buffer.write(samples(3, 6)) == 1
+    assert list(buffer.read()) == [0, 1, 2, 3]
+    assert buffer.overruns == 1
+    assert buffer.dropped_samples == 2
+
+
+def test_block_mode_waits_for_reader():
+    buffer = RingBuffer(4, overflow=BLOCK, block_timeout=2.0)
+    buffer.write(samples(0, 4))
+    timer = threading.Timer(0.05, buffer.consume, args=(2,))
+    timer.start()
+    assert buffer.write(samples(4, 6)) == 2
+    timer.join()
+    assert list(buffer.read()) == [2, 3, 4, 5]
+    assert buffer.overruns == 0
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        RingBuffer(0)
+    with pytest.raises(ValueError):
+        RingBuffer(4, overflow="unknown")
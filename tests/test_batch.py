@@ -0,0 +1,90 @@
+import json
+import wave
+
+import numpy as np
+
+from batch import BatchTranscriber, Checkpoint, open_audio
+
+RATE = 16000
+
+
+def write_wav(path, audio, rate=RATE):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes((audio * 32767).astype("<i2").tobytes())
+
+
+def speech_wav(path, utterances=8, rate=RATE):
+    rng = np.random.default_rng(0)
+    parts = []
+    for _ in range(utterances):
+        t = np.arange(int(rate * 1.2)) / rate
+        parts += [np.zeros(int(rate * 0.8)), 0.3 * np.sin(2 * np.pi * rng.uniform(150, 250) * t)]
+    parts.append(np.zeros(rate))
+    write_wav(path, np.concatenate(parts).astype(np.float32), rate)
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def transcriber(config):
+    return BatchTranscriber(config, workers=2, grammar=False, pronunciation=False,
+                            chunk_seconds=3.0, checkpoint_every=2)
+
+
+def test_resume_from_checkpoint(config, tmp_path):
+    source = tmp_path / "lecon.wav"
+    output = str(tmp_path / "lecon.jsonl")
+    speech_wav(source)
+    summary = transcriber(config).run(str(source), output, fmt="jsonl")
+    full = read_jsonl(output)
+    assert summary["segments"] == len(full) == 8
+    assert summary["errors"] == 0
+
+    # Interruption simulée : point de reprise après 3 segments, ligne suivante à moitié écrite
+    with open(output, "rb") as f:
+        lines = f.readlines()
+    kept = b"".join(lines[:3])
+    with open(output, "wb") as f:
+        f.write(kept + lines[3][:10])
+    position = int(round(full[2]["end"] * RATE))
+    Checkpoint(output + ".checkpoint").save(str(source), "jsonl", position, 3, len(kept))
+
+    summary = transcriber(config).run(str(source), output, fmt="jsonl")
+    resumed = read_jsonl(output)
+    assert summary["segments"] == 5
+    assert resumed[:3] == full[:3]
+    assert [r["segment"] for r in resumed] == list(range(8))
+    assert all(abs(a["start"] - b["start"]) < 0.05 for a, b in zip(resumed, full))
+    # Point de reprise supprimé une fois le fichier terminé
+    assert not (tmp_path / "lecon.jsonl.checkpoint").exists()
+
+
+def test_checkpoint_ignored_for_other_source(tmp_path):
+    source = tmp_path / "a.wav"
+    write_wav(source, np.zeros(RATE, dtype=np.float32))
+    checkpoint = Checkpoint(str(tmp_path / "out.checkpoint"))
+    checkpoint.save(str(source), "text", 100, 1, 10)
+    assert checkpoint.load(str(source), "text")["position"] == 100
+    assert checkpoint.load(str(source), "jsonl") is None
+    write_wav(source, np.zeros(2 * RATE, dtype=np.float32))
+    assert checkpoint.load(str(source), "text") is None
+
+
+def test_resampled_reads_match_sequential_reads(tmp_path):
+    source = tmp_path / "44k.wav"
+    t = np.arange(44100 * 2) / 44100
+    write_wav(source, (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32), 44100)
+    audio = open_audio(str(source), RATE)
+    assert len(audio) == 2 * RATE
+    full = np.concatenate([audio.read(pos, 7000) for pos in range(0, len(audio), 7000)])
+    # Lecture au milieu du fichier (reprise) : même résultat que la lecture continue
+    other = open_audio(str(source), RATE)
+    assert np.array_equal(other.read(12345, 4000), full[12345:16345])
+    # Filtre polyphase : sinusoïde conservée (au retard du filtre près)
+    reference = 0.5 * np.sin(2 * np.pi * 440 * np.arange(len(full)) / RATE)
+    assert np.abs(full[500:-500] - np.roll(reference, 6)[500:-500]).max() < 0.05
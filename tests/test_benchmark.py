@@ -0,0 +1,23 @@
+import pytest
+
+from benchmark import Benchmark, StubGrammar, StubPronunciation, synthetic_audio
+from transcriber import StubBackend
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_stub_benchmark_runs_without_stage_errors(config, streaming):
+    config.streaming_mode = streaming
+    config.buffer_overflow = "block"
+    bench = Benchmark(config, synthetic_audio(10, config.sample_rate), speed=0)
+    bench.engine.model = StubBackend(sample_rate=config.sample_rate).load()
+    bench.engine.grammar = StubGrammar(latency=0.0)
+    bench.engine.pronunciation = StubPronunciation(latency=0.0)
+    results = bench.run()
+    assert results["segments"] > 0
+    assert results["stage_errors"] == {"asr": 0, "grammar": 0, "pronunciation": 0}
+    assert results["buffer"]["dropped_samples"] == 0
+    spoken = [s for s in bench.segments if s.text]
+    assert spoken
+    if not streaming:
+        # Scores par mot fournis par le substitut de prononciation (mots horodatés de l'ASR)
+        assert all(s.word_scores for s in spoken)
@@ -0,0 +1,18 @@
+from audio_buffer import RingBuffer
+from engine import TranscriptionEngine
+from transcriber import StubBackend
+
+
+def test_restart_waits_for_previous_loop(config):
+    """Redémarrage juste après stop() : jamais deux boucles sur le même tampon"""
+    engine = TranscriptionEngine(config, RingBuffer(config.sample_rate), lambda segment: None)
+    engine.model = StubBackend(sample_rate=config.sample_rate).load()
+    engine.start()
+    previous = engine.thread
+    engine.stop()
+    engine.start()
+    assert not previous.is_alive()
+    assert engine.thread is not previous and engine.is_alive()
+    engine.stop()
+    engine.join(5)
+    assert not engine.is_alive()
@@ -0,0 +1,107 @@
+import json
+import os
+import sqlite3
+import time
+
+from history import HistoryIndex, TranscriptHistory, import_transcripts
+
+
+def record(text, wall, grammar=(), pronunciation=()):
+    # grammar : messages, ou couples (règle, message)
+    grammar = [g if isinstance(g, tuple) else (None, g) for g in grammar]
+    return {"text": text, "corrected": text, "wall_time": wall, "start": 0.0, "end": 1.0,
+            "grammar": [{"offset": 0, "length": 1, "message": m, "rule": r} for r, m in grammar],
+            "pronunciation": list(pronunciation)}
+
+
+def write_session(path, records, name="session.txt"):
+    history = TranscriptHistory(path, flush_interval=0.01)
+    history.start_session(name, "2026-10-01T09:00:00")
+    for r in records:
+        history.write(r)
+    history.close()
+    return history
+
+
+def test_write_search_and_stats(tmp_path):
+    path = str(tmp_path / "history.db")
+    history = write_session(path, [
+        record("I have went to the market", "2026-10-01T09:00:01", ["Wrong verb form"], ["market,"]),
+        record("She go to school every day", "2026-10-01T09:00:05", ["Wrong verb form"], ["School"]),
+        record("The weather is nice", "2026-10-02T10:00:00", [], ["weather"]),
+        record("", "2026-10-02T10:00:01"),
+    ])
+    assert history.written == 3
+    index = HistoryIndex(path)
+    try:
+        rows = index.search("market")
+        assert len(rows) == 1 and rows[0][1] == "session.txt"
+        assert "[market]" in rows[0][2]
+        # Préfixe et plus récent d'abord
+        assert [r[3] for r in index.search("s*")] == ["She go to school every day"]
+        assert index.search('"') == []
+        assert index.totals() == {"sessions": 1, "segments": 3, "words": 16,
+                                  "grammar_errors": 2, "pronunciation_errors": 3}
+        # Sans identifiant de règle (anciens journaux), le message sert de clé
+        assert index.top_grammar() == [("Wrong verb form", "Wrong verb form", 2, "2026-10-01T09:00:05")]
+        # Mots normalisés comme pour le cache de prononciation
+        assert sorted(w for w, _, _ in index.top_pronunciation()) == ["market", "school", "weather"]
+        assert [day for day, *_ in index.daily()] == ["2026-10-02", "2026-10-01"]
+        assert len(index.examples("Wrong verb form")) == 2
+    finally:
+        index.close()
+
+
+def test_grammar_stats_grouped_by_rule(tmp_path):
+    path = str(tmp_path / "history.db")
+    write_session(path, [
+        record("it is is fine", "2026-10-01T09:00:01", [("ENGLISH_WORD_REPEAT_RULE", "Repeated word: is")]),
+        record("the the end", "2026-10-01T09:00:02", [("ENGLISH_WORD_REPEAT_RULE", "Repeated word: the")]),
+        record("a apple", "2026-10-01T09:00:03", [("EN_A_VS_AN", "Use an")]),
+    ])
+    index = HistoryIndex(path)
+    try:
+        # Messages différents, même règle : une seule ligne, avec le dernier message
+        assert index.top_grammar() == [
+            ("ENGLISH_WORD_REPEAT_RULE", "Repeated word: the", 2, "2026-10-01T09:00:02"),
+            ("EN_A_VS_AN", "Use an", 1, "2026-10-01T09:00:03")]
+        assert [text for _, text, _ in index.examples("ENGLISH_WORD_REPEAT_RULE")] == ["the the end", "it is is fine"]
+    finally:
+        index.close()
+
+
+def test_rolled_back_batch_does_not_lose_session(tmp_path):
+    path = str(tmp_path / "history.db")
+    history = TranscriptHistory(path, flush_interval=0.01)
+    history.start_session("retry.txt")
+    # Lot refusé par SQLite (texte non sérialisable) : la session est annulée avec lui
+    history.write({"text": {"invalid": True}})
+    time.sleep(0.2)
+    history.write(record("after the error", "2026-10-03T08:00:00"))
+    history.close()
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT sessions.name, segments.text FROM segments"
+                        " JOIN sessions ON sessions.id = segments.session_id").fetchall()
+    conn.close()
+    assert rows == [("retry.txt", "after the error")]
+
+
+def test_import_dedups_by_absolute_path(tmp_path):
+    path = str(tmp_path / "history.db")
+    for folder in ("a", "b"):
+        os.makedirs(tmp_path / folder)
+        with open(tmp_path / folder / "transcript_20261001_090000.jsonl", "w", encoding="utf-8") as f:
+            f.write(json.dumps(record(f"lesson {folder}", "2026-10-01T09:00:00")) + "\n")
+    text_log = tmp_path / "transcript_20261001_230000.txt"
+    text_log.write_text("[23:59:58] before midnight\n[00:00:03] after midnight\n", encoding="utf-8")
+    files = [str(tmp_path / "a" / "transcript_20261001_090000.jsonl"),
+             str(tmp_path / "b" / "transcript_20261001_090000.jsonl"), str(text_log)]
+    # Même nom de fichier dans deux dossiers : les deux sont importés
+    assert import_transcripts(path, files) == 4
+    assert import_transcripts(path, [os.path.relpath(files[0])]) == 0
+    index = HistoryIndex(path)
+    try:
+        assert index.totals()["sessions"] == 3
+        assert [day for day, *_ in index.daily()] == ["2026-10-02", "2026-10-01"]
+    finally:
+        index.close()
@@ -0,0 +1,109 @@
+import concurrent.futures
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from inference_worker import InferenceWorkerPool
+from transcriber import StubBackend
+
+posix_only = pytest.mark.skipif(not hasattr(signal, "SIGSTOP"), reason="signaux POSIX")
+
+
+@pytest.fixture
+def pool():
+    pool = InferenceWorkerPool({"name": "stub"}, workers=1, timeout=10.0)
+    pool.wait_ready(30)
+    yield pool
+    pool.close()
+
+
+def audio(value):
+    return np.full(16000, value, dtype=np.float32)
+
+
+def wait_restarted(pool, restarts):
+    deadline = time.monotonic() + 30
+    while pool.restarts < restarts and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool.restarts == restarts
+
+
+def test_same_result_as_backend(pool):
+    expected = StubBackend().load().transcribe(audio(0.1), language="en")
+    assert pool.transcribe(audio(0.1), language="en") == expected
+    assert [r["text"] for r in pool.transcribe_many([audio(0.1), audio(0.2)])] == [
+        expected["text"], StubBackend().load().transcribe(audio(0.2))["text"]]
+
+
+@posix_only
+def test_idle_worker_killed_is_replaced(pool):
+    for restarts in range(1, 4):
+        os.kill(pool._processes[0].pid, signal.SIGKILL)
+        wait_restarted(pool, restarts)
+        # Nouveau canal : le remplaçant reçoit les tâches suivantes
+        assert pool.transcribe(audio(0.1))["text"]
+
+
+@posix_only
+def test_busy_worker_killed_fails_only_its_task(pool):
+    pid = pool._processes[0].pid
+    os.kill(pid, signal.SIGSTOP)
+    future = pool.submit(audio(0.1))
+    os.kill(pid, signal.SIGKILL)
+    with pytest.raises(RuntimeError):
+        future.result(timeout=30)
+    assert pool.transcribe(audio(0.2))["text"]
+    assert not pool._pending
+
+
+@posix_only
+def test_timeout_abandons_task(pool):
+    pid = pool._processes[0].pid
+    pool.timeout = 0.3
+    os.kill(pid, signal.SIGSTOP)
+    try:
+        with pytest.raises(concurrent.futures.TimeoutError):
+            pool.transcribe(audio(0.1))
+    finally:
+        os.kill(pid, signal.SIGCONT)
+    pool.timeout = 10.0
+    # Le résultat tardif est ignoré ; le processus reste utilisable
+    assert pool.transcribe(audio(0.2)) == StubBackend().load().transcribe(audio(0.2))
+    assert not pool._pending
+
+
+def test_load_failure_is_raised():
+    pool = InferenceWorkerPool({"name": "inconnu"}, workers=2)
+    with pytest.raises(RuntimeError, match="Chargement du moteur impossible"):
+        pool.wait_ready(30)
+    assert pool.closed and pool.restarts == 0
+
+
+def test_wait_ready_timeout():
+    pool = InferenceWorkerPool({"name": "stub"}, workers=0)
+    with pytest.raises(TimeoutError):
+        pool.wait_ready(0.05)
+    assert pool.closed
+
+
+def test_no_shared_memory_leak_warning(tmp_path):
+    script = tmp_path / "pool.py"
+    script.write_text(
+        "import sys\n"
+        f"sys.path.insert(0, {os.path.dirname(os.path.dirname(os.path.abspath(__file__)))!r})\n"
+        "import numpy as np\n"
+        "from inference_worker import InferenceWorkerPool\n"
+        "if __name__ == '__main__':\n"
+        "    pool = InferenceWorkerPool({'name': 'stub'}, workers=2)\n"
+        "    pool.wait_ready(30)\n"
+        "    pool.transcribe_many([np.zeros(16000)] * 4)\n"
+        "    pool.close()\n", encoding="utf-8")
+    result = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert "leaked" not in result.stderr
+    assert "KeyError" not in result.stderr
@@ -0,0 +1,50 @@
+from pipeline import OrderedSink, Pipeline, Segment, Stage
+
+
+def segment(i):
+    s = Segment(text=str(i))
+    s.id = i
+    return s
+
+
+def test_ordered_sink_releases_in_id_order():
+    delivered = []
+    sink = OrderedSink(lambda s: delivered.append(s.id))
+    for i in (2, 0, 3, 1, 5):
+        sink.put(segment(i))
+    assert delivered == [0, 1, 2, 3]
+    sink.put(segment(4))
+    assert delivered == [0, 1, 2, 3, 4, 5]
+
+
+def test_ordered_sink_survives_callback_error():
+    delivered = []
+
+    def callback(s):
+        if s.id == 0:
+            raise RuntimeError("affichage")
+        delivered.append(s.id)
+
+    sink = OrderedSink(callback)
+    sink.put(segment(1))
+    sink.put(segment(0))
+    assert delivered == [1]
+    assert sink.next_id == 2
+
+
+def test_stage_errors_are_counted_and_segment_delivered():
+    def fail(s):
+        if s.text == "1":
+            raise ValueError("étape")
+
+    delivered = []
+    pipeline = Pipeline([Stage("test", fail)], lambda s: delivered.append(s.text))
+    pipeline.start()
+    for i in range(3):
+        pipeline.submit(Segment(text=str(i)))
+    pipeline.stop()
+    stats = pipeline.stats()["test"]
+    assert stats["errors"] == 1
+    assert stats["processed"] == 2
+    # Le segment en erreur continue quand même jusqu'à la fin du pipeline
+    assert delivered == ["0", "1", "2"]
@@ -0,0 +1,98 @@
+import os
+
+from analysis import PronunciationAnalyzer
+from subtitle_view import build_runs
+
+
+def analyzer(phonemes=None):
+    """Phonémisation remplacée par un dictionnaire (espeak absent des tests)"""
+    analyzer = PronunciationAnalyzer()
+    phonemes = phonemes or {}
+    analyzer.calls = []
+
+    def phonemize(words):
+        analyzer.calls.append(list(words))
+        return [phonemes.get(w, "") for w in words]
+
+    analyzer._phonemize = phonemize
+    return analyzer
+
+
+def test_score_keeps_probability_of_known_word():
+    pron = analyzer()
+    # 0,5 s pour 5 lettres : débit normal, le score est la probabilité
+    scores, low = pron.score([(" hello", 0.0, 0.5, 0.9)])
+    assert scores == [("hello", 0.9)] and low == []
+    assert pron.calls == []
+
+
+def test_fast_word_is_penalized_then_checked():
+    pron = analyzer({"hello": "həloʊ"})
+    # Deux fois plus rapide que 0,03 s par lettre : score divisé par deux
+    scores, low = pron.score([(" Hello,", 0.0, 0.075, 0.9)])
+    assert scores == [("Hello,", 0.45)] and low == [0]
+    assert pron.calls == [["hello"]]
+    # Sans transcription phonétique, le score tombe à 0
+    scores, low = analyzer().score([(" xyzzy", 0.0, 0.075, 0.9)])
+    assert scores == [("xyzzy", 0.0)] and low == [0]
+
+
+def test_threshold_boundary():
+    words = [(" sure", 0.0, 0.5, 0.6), (" maybe", 0.5, 1.0, 0.59), (" ...", 1.0, 1.1, 0.1)]
+    pron = analyzer({"maybe": "meɪbi"})
+    scores, low = pron.score(words, threshold=0.6)
+    # Score égal au seuil : pas d'erreur ; ponctuation seule jamais vérifiée
+    assert low == [1]
+    assert scores == [("sure", 0.6), ("maybe", 0.59), ("...", 0.1)]
+    assert pron.calls == [["maybe"]]
+
+
+def test_runs_with_percentages_and_tags():
+    runs = build_runs("one two three", time_str="10:00:00",
+                      word_scores=[("one", 0.9), ("two", 0.4), ("three", 1.0)], threshold=0.6)
+    assert runs == [("\n[10:00:00]", ("timestamp",)),
+                    (" one (90%) ", ()),
+                    ("two", ("bad_pron",)),
+                    (" (40%) three (100%) ", ())]
+
+
+def test_runs_without_colors_or_percentages():
+    scores = [("one", 0.9), ("two", 0.4)]
+    runs = build_runs("one two", show_colors=False, time_str="10:00:00", word_scores=scores)
+    assert runs[1:] == [(" one (90%) two (40%) ", ())]
+    runs = build_runs("one two", show_percentages=False, time_str="10:00:00", word_scores=scores)
+    assert runs[1:] == [(" one ", ()), ("two", ("bad_pron",)), (" ", ())]
+
+
+def test_runs_fall_back_to_pronunciation_errors():
+    # Sans scores par mot (mode continu) : 0 % pour les mots signalés, 100 % sinon
+    runs = build_runs("say hello", ["hello"], time_str="10:00:00", word_scores=None)
+    assert runs[1:] == [(" say (100%) ", ()), ("hello", ("bad_pron",)), (" (0%) ", ())]
+
+
+def test_lexicon_written_once_per_word(tmp_path):
+    path = str(tmp_path / "data" / "lexicon.tsv")
+    pron = PronunciationAnalyzer(cache_size=1, lexicon_path=path)
+    pron._phonemize = lambda words: [w.upper() for w in words]
+    pron.phonemes(["one"])
+    pron.phonemes(["two"])
+    # "one" est sorti du cache : phonémisé de nouveau, mais pas réécrit
+    pron.phonemes(["one"])
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "one\tONE\ntwo\tTWO\n"
+
+
+def test_lexicon_compacted_on_load(tmp_path):
+    path = tmp_path / "lexicon.tsv"
+    path.write_text("one\tONE\ntwo\tTWO\none\tONE\n", encoding="utf-8")
+    pron = PronunciationAnalyzer(lexicon_path=str(path))
+    assert dict(pron.cache) == {"one": "ONE", "two": "TWO"}
+    assert path.read_text(encoding="utf-8") == "one\tONE\ntwo\tTWO\n"
+
+
+def test_default_lexicon_in_app_data_dir(monkeypatch, tmp_path):
+    from config import AppConfig, app_data_dir
+    monkeypatch.chdir(tmp_path)
+    path = AppConfig().pronunciation_lexicon
+    assert path == os.path.join(app_data_dir(), "lexicon.tsv")
+    assert not path.startswith(str(tmp_path))
@@ -0,0 +1,103 @@
+import time
+
+from audio_buffer import RingBuffer
+from pipeline import Segment
+from quality import LEVELS, QualityController
+
+
+class FakeEngine:
+    """Reçoit les réglages du contrôleur ; seul le tampon audio est lu"""
+
+    def __init__(self, config):
+        self.audio_buffer = RingBuffer(config.sample_rate)
+        self.model = None
+        self.asr_options = {}
+        self.max_segment = config.vad_max_segment
+        self.run_grammar = True
+        self.run_pronunciation = True
+
+
+def make_controller(config, cooldown=0.0):
+    config.quality_cooldown = cooldown
+    config.quality_degrade_after = 2
+    config.quality_recover_after = 3
+    # alpha=1 : pas de lissage, chaque mesure compte telle quelle
+    return QualityController(config, FakeEngine(config), alpha=1.0)
+
+
+def measure(controller, rtf, lag=0.0):
+    segment = Segment(text="x", start=0.0, end=1.0)
+    segment.timings["asr"] = rtf
+    segment.created = time.monotonic() - lag
+    controller.observe(segment)
+
+
+def test_degrades_after_consecutive_overloads(config):
+    controller = make_controller(config)
+    measure(controller, 2.0)
+    assert controller.level == 0
+    measure(controller, 2.0)
+    assert controller.level == 1
+    engine = controller.engine
+    assert engine.run_pronunciation is False and engine.run_grammar is True
+    assert engine.max_segment == min(config.vad_max_segment, LEVELS[1]["max_segment"])
+    # Plafonds appliqués seulement sous les valeurs par défaut du moteur stub (beam_size=1)
+    assert engine.asr_options == {"best_of": 2, "temperature": (0.0, 0.4, 0.8)}
+
+
+def test_overload_count_resets_between_thresholds(config):
+    """Hystérésis : une mesure entre les deux seuils remet les compteurs à zéro"""
+    controller = make_controller(config)
+    measure(controller, 2.0)
+    measure(controller, 0.7)
+    measure(controller, 2.0)
+    assert controller.level == 0
+    measure(controller, 2.0)
+    assert controller.level == 1
+    for _ in range(2):
+        measure(controller, 0.1)
+    measure(controller, 0.7)
+    for _ in range(2):
+        measure(controller, 0.1)
+    assert controller.level == 1
+    measure(controller, 0.1)
+    assert controller.level == 0
+
+
+def test_lag_over_budget_degrades(config):
+    controller = make_controller(config)
+    for _ in range(2):
+        measure(controller, 0.1, lag=config.latency_budget + 1)
+    assert controller.level == 1
+
+
+def test_cooldown_spaces_changes(config):
+    controller = make_controller(config, cooldown=10.0)
+    for _ in range(4):
+        measure(controller, 2.0)
+    # Aucun changement pendant le délai qui suit la création
+    assert controller.level == 0
+    controller._changed_at -= 10.0
+    measure(controller, 2.0)
+    assert controller.level == 1
+    for _ in range(4):
+        measure(controller, 2.0)
+    assert controller.level == 1
+    controller._changed_at -= 10.0
+    measure(controller, 2.0)
+    assert controller.level == 2
+
+
+def test_degrade_then_recover_in_reverse_order(config):
+    controller = make_controller(config)
+    for _ in range(2 * len(LEVELS)):
+        measure(controller, 2.0)
+    assert controller.level == len(LEVELS) - 1
+    assert controller.engine.run_grammar is False
+    for _ in range(3 * len(LEVELS)):
+        measure(controller, 0.1)
+    assert controller.level == 0
+    assert controller.engine.asr_options == {}
+    assert controller.engine.run_grammar and controller.engine.run_pronunciation
+    kinds = [e["event"] for e in controller.events]
+    assert kinds == ["degrade"] * (len(LEVELS) - 1) + ["recover"] * (len(LEVELS) - 1)
@@ -0,0 +1,167 @@
+import asyncio
+import copy
+import json
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from audio_buffer import RingBuffer
+from engine import TranscriptionEngine
+from remote import RemoteEngine, connect
+from server import AUDIO, END, HELLO, MESSAGE, TranscriptionServer, encode_frame, read_frame_sync
+from transcriber import StubBackend
+
+RATE = 16000
+STARTS = [0.5, 3.0, 5.5]
+
+
+def utterances():
+    """Trois énoncés d'une seconde séparés de silences"""
+    audio = np.zeros(8 * RATE, dtype=np.float32)
+    t = np.arange(RATE) / RATE
+    for start in STARTS:
+        audio[int(start * RATE):int(start * RATE) + RATE] = 0.3 * np.sin(2 * np.pi * 200 * t)
+    return audio
+
+
+class SlowFirstGrammar:
+    """Premier segment analysé en dernier : les suivants finissent avant lui"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def analyze(self, text):
+        self.calls += 1
+        if self.calls == 1:
+            time.sleep(0.3)
+        return [], text.upper()
+
+
+class FailingBackend(StubBackend):
+    def transcribe(self, audio, **options):
+        raise RuntimeError("modèle en panne")
+
+
+@pytest.fixture
+def serve(config):
+    """Démarre un serveur sur un port libre dans son propre thread ; renvoie son adresse"""
+    running = []
+
+    def start(backend=None, grammar=None):
+        engine = TranscriptionEngine(config, None, None)
+        engine.model = (backend or StubBackend(sample_rate=RATE)).load()
+        engine.grammar = grammar
+        server = TranscriptionServer(config, engine, port=0)
+        loop = asyncio.new_event_loop()
+
+        async def run():
+            try:
+                await server.serve()
+            except asyncio.CancelledError:
+                pass
+
+        task = loop.create_task(run())
+        thread = threading.Thread(target=loop.run_until_complete, args=(task,), daemon=True)
+        thread.start()
+        running.append((server, loop, task, thread))
+        deadline = time.monotonic() + 5
+        while not server.port and time.monotonic() < deadline:
+            time.sleep(0.01)
+        config.server_url = f"127.0.0.1:{server.port}"
+        return server
+
+    yield start
+    for server, loop, task, thread in running:
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join(5)
+        loop.close()
+        server.scheduler.stop()
+
+
+def messages(stream):
+    """Messages du serveur jusqu'à "end" ou la fermeture de la connexion"""
+    received = []
+    while True:
+        frame = read_frame_sync(stream)
+        if frame is None:
+            return received
+        assert frame[0] == MESSAGE
+        received.append(json.loads(frame[1]))
+        if received[-1]["type"] == "end":
+            return received
+
+
+def test_remote_engine_receives_segments_in_order(config, serve):
+    serve(grammar=SlowFirstGrammar())
+    buffer = RingBuffer(10 * RATE)
+    delivered = []
+    engine = RemoteEngine(config, buffer, delivered.append)
+    buffer.write(utterances())
+    engine.start()
+    deadline = time.monotonic() + 5
+    while len(buffer) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    engine.stop()
+    # "end" reçu : le thread de réception se termine de lui-même
+    engine.join(5)
+    assert not engine.is_alive()
+    assert [s.id for s in delivered] == [0, 1, 2]
+    assert [round(s.start, 1) for s in delivered] == [round(t - config.vad_padding, 1) for t in STARTS]
+    assert all(s.text and s.corrected == s.text.upper() for s in delivered)
+
+
+def test_end_handshake_after_last_segment(config, serve):
+    serve()
+    sock, stream, ready = connect(config, name="test")
+    assert ready["type"] == "ready" and ready["sample_rate"] == RATE
+    sock.sendall(encode_frame(AUDIO, utterances().astype("<f4").tobytes()))
+    sock.sendall(encode_frame(END))
+    received = messages(stream)
+    sock.close()
+    kinds = [m["type"] for m in received]
+    assert kinds[-1] == "end"
+    segments = [m for m in received if m["type"] == "segment"]
+    assert [m["segment"] for m in segments] == [0, 1, 2]
+    # Texte brut de chaque segment envoyé avant son résultat annoté
+    for m in segments:
+        assert kinds.index("asr") < received.index(m)
+
+
+def test_end_without_audio(config, serve):
+    serve()
+    sock, stream, _ = connect(config, name="test")
+    sock.sendall(encode_frame(END))
+    assert [m["type"] for m in messages(stream)] == ["end"]
+    sock.close()
+
+
+def test_asr_failure_still_delivers_and_ends(config, serve):
+    serve(backend=FailingBackend(sample_rate=RATE))
+    sock, stream, _ = connect(config, name="test")
+    sock.sendall(encode_frame(AUDIO, utterances().astype("<f4").tobytes()))
+    sock.sendall(encode_frame(END))
+    received = messages(stream)
+    sock.close()
+    segments = [m for m in received if m["type"] == "segment"]
+    assert len(segments) == 3 and all(m["text"] == "" for m in segments)
+    assert received[-1]["type"] == "end"
+
+
+def test_missing_hello_closes_connection(config, serve):
+    serve()
+    sock = socket.create_connection(("127.0.0.1", int(config.server_url.rsplit(":", 1)[1])), timeout=5)
+    sock.sendall(encode_frame(AUDIO, b"\0" * 16))
+    stream = sock.makefile("rb")
+    assert read_frame_sync(stream) is None
+    sock.close()
+
+
+def test_sample_rate_mismatch_refused(config, serve):
+    serve()
+    client = copy.copy(config)
+    client.sample_rate = 44100
+    with pytest.raises(ValueError):
+        connect(client, name="test")
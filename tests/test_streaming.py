@@ -0,0 +1,151 @@
+import time
+
+import numpy as np
+
+from audio_buffer import RingBuffer
+from engine import TranscriptionEngine
+from streaming import HypothesisBuffer, StreamingTranscriber, words_text
+from transcriber import StubBackend
+
+RATE = 16000
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.float32)
+
+
+def words(*items):
+    return [(start, start + 0.3, f" {word}") for start, word in items]
+
+
+def test_word_committed_when_two_hypotheses_agree():
+    buffer = HypothesisBuffer()
+    buffer.insert(words((0.0, "hello"), (0.4, "word")))
+    assert buffer.flush() == []
+    assert words_text(buffer.partial()) == "hello word"
+    buffer.insert(words((0.0, "Hello"), (0.4, "world"), (0.8, "again")))
+    # Seul le préfixe commun est validé (casse ignorée)
+    assert [w[2] for w in buffer.flush()] == [" Hello"]
+    assert buffer.last_committed_time == 0.3
+    assert words_text(buffer.partial()) == "world again"
+
+
+def test_words_before_last_commit_are_ignored():
+    buffer = HypothesisBuffer()
+    for _ in range(2):
+        buffer.insert(words((0.0, "one"), (0.4, "two")))
+        buffer.flush()
+    assert words_text(buffer.committed) == "one two"
+    # La fenêtre suivante répète "two" : recouvrement retiré avant comparaison
+    buffer.insert(words((0.0, "one"), (0.65, "two"), (1.0, "three")))
+    assert words_text(buffer.current) == "three"
+
+
+def test_pop_committed_and_reset():
+    buffer = HypothesisBuffer()
+    for _ in range(2):
+        buffer.insert(words((0.0, "a"), (1.0, "b")))
+        buffer.flush()
+    buffer.pop_committed(0.5)
+    assert words_text(buffer.committed) == "b"
+    buffer.reset()
+    assert buffer.committed == buffer.previous == buffer.current == []
+
+
+def test_discard_drops_window_and_hypothesis():
+    streamer = StreamingTranscriber(StubBackend().load(), 16000)
+    streamer.begin(1.0, np.full(8000, 0.3, dtype=np.float32))
+    streamer.process_iter()
+    assert streamer.hypothesis.partial()
+    streamer.discard()
+    assert len(streamer.audio) == 0
+    assert streamer.hypothesis.partial() == []
+    assert streamer.offset == 1.5
+    # L'énoncé suivant ne reprend rien de la rafale abandonnée
+    streamer.begin(3.0, np.full(16000, 0.2, dtype=np.float32))
+    text, start, end = streamer.finish()
+    assert text and start == 3.0 and end <= 4.0 + 1e-6
+
+
+class RecordingBackend(StubBackend):
+    def __init__(self):
+        super().__init__(sample_rate=RATE)
+        self.calls = []
+
+    def transcribe(self, audio, **options):
+        self.calls.append(options)
+        time.sleep(0.01)
+        return super().transcribe(audio, **options)
+
+
+def test_decode_uses_quality_options_and_is_timed():
+    model = RecordingBackend().load()
+    streamer = StreamingTranscriber(model, RATE)
+    streamer.options = {"beam_size": 1, "temperature": 0.0}
+    streamer.begin(0.0, tone(1.0))
+    streamer.process_iter()
+    streamer.finish()
+    assert len(model.calls) == 2
+    assert all(call["beam_size"] == 1 and call["temperature"] == 0.0 for call in model.calls)
+    # Temps cumulé de l'énoncé, remis à zéro au suivant
+    assert streamer.decode_time >= 0.02
+    streamer.begin(2.0, tone(1.0))
+    assert streamer.decode_time == 0.0
+
+
+def test_streaming_discards_rejected_burst(config):
+    """Une rafale rejetée par le VAD ne doit pas rester au début de l'énoncé suivant"""
+    config.streaming_mode = True
+    config.vad_min_segment = 0.5
+    config.vad_hangover = 0.3
+    config.vad_padding = 0.2
+    buffer = RingBuffer(10 * RATE)
+    delivered = []
+    engine = TranscriptionEngine(config, buffer, delivered.append)
+    engine.model = StubBackend(sample_rate=RATE).load()
+    audio = np.concatenate([silence(1.0), tone(0.2), silence(1.5), tone(1.5), silence(1.5)])
+    step = int(config.stream_step * RATE)
+    engine.start()
+    for pos in range(0, len(audio), step):
+        buffer.write(audio[pos:pos + step])
+        # Un bloc par lecture, comme une capture en temps réel
+        deadline = time.monotonic() + 5
+        while len(buffer) and time.monotonic() < deadline:
+            time.sleep(0.005)
+    engine.stop()
+    engine.join(5)
+    spoken = [s for s in delivered if s.text]
+    assert len(spoken) == 1
+    # La parole commence à 2,7 s (marge de 0,2 s comprise), pas à la rafale de 1,0 s
+    assert abs(spoken[0].start - 2.5) < 0.05
+
+
+def test_streaming_backlog_keeps_utterances_apart(config):
+    """Audio en retard lu d'un coup : un segment par énoncé, sans l'audio du suivant"""
+    config.streaming_mode = True
+    buffer = RingBuffer(30 * RATE)
+    delivered = []
+    engine = TranscriptionEngine(config, buffer, delivered.append)
+    engine.model = StubBackend(sample_rate=RATE).load()
+    starts = [1.0, 3.5, 6.0, 8.5]
+    audio = silence(11.0)
+    for start in starts:
+        audio[int(start * RATE):int((start + 1.5) * RATE)] = tone(1.5)
+    buffer.write(audio)
+    engine.start()
+    deadline = time.monotonic() + 5
+    while len(buffer) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    engine.stop()
+    engine.join(5)
+    spoken = [s for s in delivered if s.text]
+    assert [round(s.start, 1) for s in spoken] == [round(t - config.vad_padding, 1) for t in starts]
+    # Temps de décodage transmis au contrôleur de qualité
+    assert all(s.timings["asr"] > 0 for s in spoken)
+    # Fin d'énoncé : parole + marge, jamais le début de l'énoncé suivant
+    assert all(s.end <= t + 1.5 + config.vad_padding + 0.05 for s, t in zip(spoken, starts))
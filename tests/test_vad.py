@@ -0,0 +1,58 @@
+import numpy as np
+
+from vad import EnergyVAD, VadSegmenter
+
+RATE = 16000
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.float32)
+
+
+def segmenter(**options):
+    settings = dict(min_segment=0.5, max_segment=15.0, padding=0.2, hangover=0.3)
+    settings.update(options)
+    return VadSegmenter(EnergyVAD(RATE, 30, threshold=0.01), **settings)
+
+
+def test_short_burst_is_rejected():
+    vad = segmenter()
+    assert vad.feed(silence(1.0)) == []
+    assert vad.feed(tone(0.2)) == []
+    assert vad.in_speech
+    assert vad.feed(silence(1.0)) == []
+    # Fin de la rafale sans segment : le VAD n'est plus en parole
+    assert not vad.in_speech
+
+
+def test_endpoint_emits_padded_segment():
+    vad = segmenter()
+    segments = vad.feed(np.concatenate([silence(1.0), tone(1.0), silence(1.0)]))
+    assert len(segments) == 1
+    start, audio = segments[0]
+    assert abs(start - 0.8) < 0.05
+    # Parole + marge avant et après
+    assert abs(len(audio) / RATE - 1.4) < 0.07
+    assert not vad.in_speech
+
+
+def test_max_segment_forces_cut():
+    vad = segmenter(max_segment=1.0)
+    segments = vad.feed(np.concatenate([tone(2.5), silence(1.0)]))
+    assert len(segments) == 3
+    assert all(len(audio) / RATE <= 1.0 + 1e-6 for _, audio in segments[:2])
+    assert [round(start, 2) for start, _ in segments[:2]] == [0.0, 0.99]
+
+
+def test_flush_ends_current_segment():
+    vad = segmenter()
+    vad.feed(np.concatenate([silence(0.5), tone(0.8)]))
+    start, audio = vad.current()
+    assert abs(start - 0.3) < 0.05
+    assert len(vad.flush()) == 1
+    assert vad.current() is None
@@ -1,43 +1,350 @@
+import contextlib
+import queue
 import threading
 import time
+import zlib
+
+import numpy as np
+
+from vad import VadSegmenter
+
+
+class ASRBackend:
+    """Moteur de reconnaissance : load() puis transcribe(audio, **options)
+
+    transcribe renvoie un dictionnaire au format de Whisper : text, segments
+    (start, end, text, avg_logprob, words[word, start, end, probability]).
+    """
+
+    name = "base"
+    # transcribe_batch décode réellement le lot ensemble (sinon un appel par segment)
+    batched = False
+    # Décodage sans option : point de départ du contrôle de qualité (quality.py)
+    decode_defaults = {"beam_size": 1, "best_of": 5, "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)}
+
+    def __init__(self, model_size="base", compute_type="int8", threads=0, sample_rate=16000):
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.threads = threads
+        self.sample_rate = sample_rate
+        self.model = None
+
+    @property
+    def ready(self):
+        return self.model is not None
+
+    def load(self, timer=None):
+        raise NotImplementedError
+
+    def transcribe(self, audio, **options):
+        raise NotImplementedError
+
+    def transcribe_batch(self, audios, **options):
+        """Liste de résultats, un par segment (par défaut un appel par segment)"""
+        return [self.transcribe(audio, **options) for audio in audios]
+
+    def _phase(self, name, timer):
+        return timer.phase(self.name, name) if timer else contextlib.nullcontext()
+
+
+class WhisperBackend(ASRBackend):
+    """openai-whisper (PyTorch, fp32 sur CPU)"""
+
+    name = "whisper"
+
+    def load(self, timer=None):
+        with self._phase("import whisper/torch", timer):
+            import torch
+            import whisper
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        with self._phase(f"chargement modèle {self.model_size}", timer):
+            self.model = whisper.load_model(self.model_size, device="cpu")
+        return self
+
+    def transcribe(self, audio, **options):
+        # fp16 n'existe pas sur CPU : évite l'avertissement et la conversion
+        options.setdefault("fp16", False)
+        return self.model.transcribe(audio, **options)
+
+    batched = True
+    # Valeurs par défaut de whisper.transcribe
+    PREPEND_PUNCTUATIONS = "\"'“¿([{-"
+    APPEND_PUNCTUATIONS = "\"'.。,，!！?？:：”)]}、"
+
+    def transcribe_batch(self, audios, **options):
+        """Segments de moins de 30 s décodés ensemble : un passage de l'encodeur, décodeur en lot
+
+        Mêmes règles que whisper.transcribe pour chaque segment : un segment
+        jugé sans parole donne un texte vide ; un résultat trop répétitif ou
+        peu probable repasse seul par transcribe() (repli en température).
+        Les horodatages et probabilités de mots sont obtenus par alignement,
+        segment par segment. Les segments plus longs passent par transcribe().
+        """
+        import torch
+        import whisper
+        import whisper.timing
+        if len(audios) < 2 or any(len(a) > whisper.audio.N_SAMPLES for a in audios):
+            return super().transcribe_batch(audios, **options)
+        options.setdefault("fp16", False)
+        mels = []
+        for audio in audios:
+            samples = whisper.pad_or_trim(torch.from_numpy(np.asarray(audio, dtype=np.float32)))
+            mels.append(whisper.log_mel_spectrogram(samples, self.model.dims.n_mels))
+        mels = torch.stack(mels).to(self.model.device)
+        temperature = options.get("temperature", 0.0)
+        if isinstance(temperature, (list, tuple)):
+            temperature = temperature[0]
+        beam_size = options.get("beam_size")
+        decoding = whisper.DecodingOptions(
+            task=options.get("task", "transcribe"), language=options.get("language"), temperature=temperature,
+            beam_size=beam_size if beam_size and beam_size > 1 and temperature == 0 else None,
+            best_of=options.get("best_of") if temperature > 0 else None,
+            fp16=False, without_timestamps=True)
+        compression_threshold = options.get("compression_ratio_threshold", 2.4)
+        logprob_threshold = options.get("logprob_threshold", -1.0)
+        no_speech_threshold = options.get("no_speech_threshold", 0.6)
+        tokenizer = None
+        results = []
+        for i, (audio, r) in enumerate(zip(audios, whisper.decode(self.model, mels, decoding))):
+            duration = len(audio) / self.sample_rate
+            low_logprob = logprob_threshold is not None and r.avg_logprob < logprob_threshold
+            if no_speech_threshold is not None and r.no_speech_prob > no_speech_threshold and low_logprob:
+                results.append({"text": "", "language": r.language, "segments": []})
+                continue
+            if low_logprob or (compression_threshold is not None and r.compression_ratio > compression_threshold):
+                results.append(self.transcribe(audio, **options))
+                continue
+            segment = {"id": 0, "seek": 0, "start": 0.0, "end": duration, "text": r.text, "tokens": r.tokens,
+                       "temperature": temperature, "avg_logprob": r.avg_logprob,
+                       "compression_ratio": r.compression_ratio, "no_speech_prob": r.no_speech_prob}
+            if options.get("word_timestamps"):
+                tokenizer = tokenizer or self._tokenizer(r.language, options.get("task", "transcribe"))
+                try:
+                    whisper.timing.add_word_timestamps(
+                        segments=[segment], model=self.model, tokenizer=tokenizer, mel=mels[i],
+                        num_frames=len(audio) // whisper.audio.HOP_LENGTH,
+                        prepend_punctuations=options.get("prepend_punctuations", self.PREPEND_PUNCTUATIONS),
+                        append_punctuations=options.get("append_punctuations", self.APPEND_PUNCTUATIONS))
+                except TypeError:
+                    # Version de whisper à la signature différente : décodage seul de ce segment
+                    results.append(self.transcribe(audio, **options))
+                    continue
+            segment.setdefault("words", [])
+            results.append({"text": r.text, "language": r.language, "segments": [segment]})
+        return results
+
+    def _tokenizer(self, language, task):
+        from whisper.tokenizer import get_tokenizer
+        try:
+            return get_tokenizer(self.model.is_multilingual, num_languages=self.model.num_languages,
+                                 language=language, task=task)
+        except (TypeError, AttributeError):
+            return get_tokenizer(self.model.is_multilingual, language=language, task=task)
+
+
+class FasterWhisperBackend(ASRBackend):
+    """faster-whisper (CTranslate2), poids quantifiés int8 sur CPU
+
+    Pas de décodage en lot de segments indépendants : BatchedInferencePipeline
+    découpe un seul long enregistrement, transcribe_batch fait donc un appel
+    par segment.
+    """
+
+    name = "faster-whisper"
+    decode_defaults = dict(ASRBackend.decode_defaults, beam_size=5)
+    # Options de whisper.transcribe reprises telles quelles par faster-whisper
+    OPTIONS = ("language", "task", "beam_size", "best_of", "temperature", "initial_prompt",
+               "condition_on_previous_text", "word_timestamps", "no_speech_threshold",
+               "compression_ratio_threshold", "vad_filter")
+
+    def load(self, timer=None):
+        with self._phase("import ctranslate2", timer):
+            from faster_whisper import WhisperModel
+        with self._phase(f"chargement modèle {self.model_size} ({self.compute_type})", timer):
+            self.model = WhisperModel(self.model_size, device="cpu", compute_type=self.compute_type,
+                                      cpu_threads=self.threads)
+        return self
+
+    def transcribe(self, audio, **options):
+        kwargs = {k: v for k, v in options.items() if k in self.OPTIONS and v is not None}
+        kwargs.setdefault("beam_size", self.decode_defaults["beam_size"])
+        segments, info = self.model.transcribe(np.asarray(audio, dtype=np.float32), **kwargs)
+        # Les segments sont produits à la demande : le décodage a lieu ici
+        result = []
+        for s in segments:
+            result.append({
+                "id": s.id, "start": s.start, "end": s.end, "text": s.text,
+                "avg_logprob": s.avg_logprob, "no_speech_prob": s.no_speech_prob,
+                "words": [{"word": w.word, "start": w.start, "end": w.end, "probability": w.probability}
+                          for w in (s.words or [])],
+            })
+        return {"text": "".join(s["text"] for s in result), "segments": result, "language": info.language}
+
+
+class StubBackend(ASRBackend):
+    """Moteur factice déterministe (tests, banc d'essai) : même audio -> même texte
+
+    rtf simule le coût de calcul en proportion de la durée du segment.
+    """
+
+    name = "stub"
+    WORDS = ("the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog",
+             "hello", "world", "speech", "test", "sound", "voice", "time", "day")
+
+    def __init__(self, model_size="base", compute_type="int8", threads=0, sample_rate=16000, rtf=0.0):
+        super().__init__(model_size, compute_type, threads, sample_rate)
+        self.rtf = rtf
+
+    def load(self, timer=None):
+        self.model = self
+        return self
+
+    def transcribe(self, audio, **options):
+        audio = np.asarray(audio, dtype=np.float32)
+        duration = len(audio) / self.sample_rate
+        if self.rtf:
+            time.sleep(duration * self.rtf)
+        n_words = max(1, int(duration * 2.5))
+        seed = zlib.crc32(audio.tobytes())
+        words = [self.WORDS[(seed + i * 7) % len(self.WORDS)] for i in range(n_words)]
+        step = duration / n_words
+        text = " ".join(words)
+        return {"text": " " + text, "language": options.get("language") or "en", "segments": [{
+            "id": 0, "start": 0.0, "end": duration, "avg_logprob": -0.2, "text": " " + text,
+            "words": [{"word": f" {w}", "start": i * step, "end": (i + 1) * step, "probability": 0.9}
+                      for i, w in enumerate(words)]}]}
+
+
+BACKENDS = {
+    "whisper": WhisperBackend,
+    "faster-whisper": FasterWhisperBackend,
+    "stub": StubBackend,
+}
+
+
+def make_backend(name="faster-whisper", model_size="base", compute_type="int8", threads=0, sample_rate=16000):
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Moteur ASR inconnu : {name} ({', '.join(BACKENDS)})")
+    return cls(model_size, compute_type, threads, sample_rate)
+
+
+def backend_spec(config):
+    """Paramètres du moteur (transmissibles aux processus d'inférence)"""
+    return {"name": config.asr_backend, "model_size": config.whisper_model,
+            "compute_type": config.asr_compute_type, "threads": config.asr_threads,
+            "sample_rate": config.sample_rate}
+
+
+def load_backend(spec, timer=None):
+    """Crée et charge le moteur ; faster-whisper absent -> repli sur openai-whisper"""
+    backend = make_backend(**spec)
+    try:
+        return backend.load(timer)
+    except ImportError as e:
+        if spec["name"] != "faster-whisper":
+            raise
+        print(f"faster-whisper indisponible ({e}), repli sur openai-whisper")
+        return load_backend(dict(spec, name="whisper"), timer)
+
 
 class Transcriber:
-    def __init__(self, config):
+    """Transcription d'un flux audio : start(callback) / feed(audio) / stop() / result()
+
+    feed() accepte des blocs de n'importe quelle taille ; le VAD les découpe en
+    énoncés, transcrits dans un thread dédié. Chaque texte est passé à callback,
+    ou mis à disposition de result() en l'absence de callback.
+    """
+
+    def __init__(self, config, backend=None):
         self.config = config
+        self.backend = backend
         self.callback = None
         self.is_running = False
         self.is_paused = True
         self.thread = None
-        
-    def start(self, callback):
-        """Démarre le transcripteur avec une fonction de callback"""
+        self.options = {"language": "en"}
+        self._audio = queue.Queue()
+        self._results = queue.Queue()
+
+    def load(self, timer=None):
+        """Charge le moteur choisi dans AppConfig (peut être appelé hors du thread Tk)"""
+        if self.backend is None:
+            self.backend = load_backend(backend_spec(self.config), timer)
+        elif not self.backend.ready:
+            self.backend.load(timer)
+        return self.backend
+
+    def start(self, callback=None):
+        """Démarre le transcripteur avec une fonction de callback (facultative)"""
         self.callback = callback
         self.is_running = True
-        self.thread = threading.Thread(target=self._run)
+        self.thread = threading.Thread(target=self._run, name="transcriber")
         self.thread.daemon = True
         self.thread.start()
-        
+
+    def feed(self, audio):
+        """Ajoute un bloc d'échantillons float32 mono ; ignoré en pause"""
+        if not self.is_running or self.is_paused:
+            return False
+        self._audio.put(np.asarray(audio, dtype=np.float32))
+        return True
+
+    def result(self, timeout=None):
+        """Prochain résultat {"text", "start", "end", "segments"} ou None après timeout"""
+        try:
+            return self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
     def _run(self):
-        """Boucle principale du transcripteur (simulation)"""
-        counter = 0
-        while self.is_running:
-            if not self.is_paused and self.callback:
-                # Simulation de transcription avec du texte de test
-                counter += 1
-                test_text = f"Ceci est un test de transcription numero {counter}"
-                self.callback(test_text)
-            time.sleep(self.config.transcription_delay)
-            
+        """Boucle principale : découpage en énoncés puis transcription"""
+        segmenter = VadSegmenter.from_config(self.config)
+        while True:
+            chunk = self._audio.get()
+            if chunk is None:
+                break
+            for start, audio in segmenter.feed(chunk):
+                self._transcribe(start, audio)
+        # Terminer l'énoncé en cours à l'arrêt
+        for start, audio in segmenter.flush():
+            self._transcribe(start, audio)
+
+    def _transcribe(self, start, audio):
+        if self.backend is None or not self.backend.ready:
+            print("Moteur ASR pas encore chargé, segment ignoré")
+            return
+        try:
+            result = self.backend.transcribe(audio, **self.options)
+        except Exception as e:
+            print(f"Erreur transcription: {e}")
+            return
+        text = result.get("text", "").strip()
+        if not text:
+            return
+        if self.callback:
+            try:
+                self.callback(text)
+            except Exception as e:
+                # Une erreur de l'appelant ne doit pas arrêter la transcription
+                print(f"Erreur callback transcription: {e}")
+        else:
+            self._results.put({"text": text, "start": start, "end": start + len(audio) / self.config.sample_rate,
+                               "segments": result.get("segments", [])})
+
     def pause(self):
         """Met en pause la transcription"""
         self.is_paused = True
-        
+
     def resume(self):
         """Reprend la transcription"""
         self.is_paused = False
-        
+
     def stop(self):
-        """Arrête complètement le transcripteur"""
+        """Arrête complètement le transcripteur (l'audio déjà reçu est transcrit)"""
         self.is_running = False
+        self._audio.put(None)
         if self.thread:
-            self.thread.join()
\ No newline at end of file
+            self.thread.join()
@@ -0,0 +1,140 @@
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+def format_text(record):
+    """Ligne lisible : [HH:MM:SS] texte"""
+    wall = datetime.datetime.fromisoformat(record["wall_time"])
+    return f"[{wall.strftime('%H:%M:%S')}] {record['text']}\n"
+
+
+def format_jsonl(record):
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+class TranscriptLogWriter:
+    """Écriture du journal de transcription dans un thread dédié
+
+    write() ne fait que mettre l'enregistrement en file : le thread Tk ne touche
+    jamais le disque. Les lignes sont écrites par lots, le flush et le fsync sont
+    espacés selon la configuration et le fichier tourne par taille ou par durée.
+    """
+
+    def __init__(self, path, fmt="text", flush_interval=1.0, fsync_interval=None,
+                 rotate_bytes=0, rotate_seconds=0, backups=5, max_queue=10000):
+        if fmt not in ("text", "jsonl"):
+            raise ValueError(f"Format de journal inconnu : {fmt}")
+        self.path = path
+        self.format = format_jsonl if fmt == "jsonl" else format_text
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backups = backups
+        self.queue = queue.Queue(max_queue)
+        self.dropped = 0
+        self.written = 0
+        self._file = None
+        self._open()
+        self._thread = threading.Thread(target=self._run, name="transcript-log", daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_at = time.monotonic()
+        self._size = self._file.tell()
+
+    def write(self, record):
+        """Non bloquant : l'enregistrement est perdu si la file est pleine"""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Vide la file, synchronise et ferme le fichier"""
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        last_flush = last_sync = time.monotonic()
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            # Tout ce qui est déjà en file part dans le même lot
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopping = True
+                batch = [r for r in batch if r is not _STOP]
+            try:
+                if batch:
+                    data = "".join(self.format(r) for r in batch)
+                    self._file.write(data)
+                    self._size += len(data.encode("utf-8"))
+                    self.written += len(batch)
+                now = time.monotonic()
+                if stopping or now - last_flush >= self.flush_interval:
+                    self._file.flush()
+                    last_flush = now
+                    if stopping or (self.fsync_interval and now - last_sync >= self.fsync_interval):
+                        os.fsync(self._file.fileno())
+                        last_sync = now
+                if not stopping and self._should_rotate(now):
+                    self._rotate()
+            except (OSError, ValueError) as e:
+                print(f"Erreur écriture journal: {e}")
+        self._file.close()
+
+    def _should_rotate(self, now):
+        if self.rotate_bytes and self._size >= self.rotate_bytes:
+            return True
+        return bool(self.rotate_seconds and now - self._opened_at >= self.rotate_seconds and self._size)
+
+    def _rotate(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        # transcript.txt -> transcript.txt.1 -> transcript.txt.2 ...
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+
+def segment_record(segment):
+    """Enregistrement structuré d'un segment du pipeline"""
+    latency = {name: round(duration, 4) for name, duration in segment.timings.items()}
+    latency["total"] = round(time.monotonic() - segment.created, 4)
+    return {
+        "segment": segment.id,
+        "start": segment.start,
+        "end": segment.end,
+        "wall_time": segment.wall_time.isoformat(timespec="milliseconds"),
+        "text": segment.text,
+        "corrected": segment.corrected,
+        "confidence": segment.confidence,
+        "grammar": [{"offset": o, "length": l, "message": m, "rule": r} for o, l, m, r in segment.grammar_errors],
+        "pronunciation": list(segment.pronunciation_errors),
+        "word_scores": [{"word": w, "score": score} for w, score in segment.word_scores or ()],
+        "skipped": list(segment.skipped),
+        "latency": latency,
+    }
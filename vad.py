@@ -0,0 +1,174 @@
+import collections
+import numpy as np
+
+
+class EnergyVAD:
+    """Détection d'activité vocale par énergie et taux de passage par zéro (vectorisée)"""
+
+    def __init__(self, sample_rate=16000, frame_ms=30, threshold=0.01, zcr_max=0.35, noise_ratio=3.0):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.threshold = threshold
+        self.zcr_max = zcr_max
+        self.noise_ratio = noise_ratio
+        self.noise_floor = threshold / noise_ratio
+
+    def is_speech(self, frames):
+        """frames : tableau (n_trames, frame_length) ; renvoie un tableau booléen par trame"""
+        if len(frames) == 0:
+            return np.zeros(0, dtype=bool)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frames.shape[1]
+        threshold = max(self.threshold, self.noise_floor * self.noise_ratio)
+        # Un passage par zéro élevé avec peu d'énergie ressemble à du bruit ;
+        # au-delà de deux fois le seuil on garde les fricatives
+        speech = (rms > threshold) & ((zcr < self.zcr_max) | (rms > 2 * threshold))
+        silence = rms[~speech]
+        if len(silence):
+            # Plancher de bruit adaptatif (moyenne glissante sur les trames silencieuses)
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * float(np.mean(silence))
+        return speech
+
+
+class WebRtcVAD:
+    """Détecteur basé sur webrtcvad (dépendance optionnelle)"""
+
+    def __init__(self, sample_rate=16000, frame_ms=30, aggressiveness=2):
+        import webrtcvad
+        if frame_ms not in (10, 20, 30):
+            raise ValueError("webrtcvad n'accepte que des trames de 10, 20 ou 30 ms")
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def is_speech(self, frames):
+        pcm = (np.clip(frames, -1.0, 1.0) * 32767).astype(np.int16)
+        return np.array([self.vad.is_speech(f.tobytes(), self.sample_rate) for f in pcm], dtype=bool)
+
+
+def make_vad(config):
+    """Construit le détecteur choisi dans la configuration"""
+    if config.vad_backend == "webrtc":
+        try:
+            return WebRtcVAD(config.sample_rate, config.vad_frame_ms)
+        except ImportError:
+            print("webrtcvad non installé, utilisation du détecteur par énergie")
+    return EnergyVAD(config.sample_rate, config.vad_frame_ms, threshold=config.vad_threshold)
+
+
+class VadSegmenter:
+    """Découpe un flux audio en segments de parole à partir des décisions du VAD"""
+
+    def __init__(self, vad, min_segment=0.5, max_segment=15.0, padding=0.2, hangover=0.5):
+        self.vad = vad
+        self.frame_length = vad.frame_length
+        frame_seconds = self.frame_length / vad.sample_rate
+        self.min_frames = max(1, int(round(min_segment / frame_seconds)))
+        self.max_segment = max_segment
+        self.max_frames = max(self.min_frames, int(round(max_segment / frame_seconds)))
+        self.padding_frames = int(round(padding / frame_seconds))
+        self.hangover_frames = max(1, int(round(hangover / frame_seconds)))
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._preroll = collections.deque(maxlen=self.padding_frames)
+        self._segment = []
+        self._speech_frames = 0
+        self._silence_run = 0
+        self._frame_index = 0       # Index de la prochaine trame reçue
+        self._segment_start = 0     # Index de la première trame du segment en cours
+        self.frame_seconds = frame_seconds
+        self.in_speech = False
+
+    def set_max_segment(self, max_segment):
+        """Change la coupure forcée (prend effet sur le segment en cours)"""
+        self.max_segment = max_segment
+        self.max_frames = max(self.min_frames, int(round(max_segment / self.frame_seconds)))
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(make_vad(config),
+                   min_segment=config.vad_min_segment,
+                   max_segment=config.vad_max_segment,
+                   padding=config.vad_padding,
+                   hangover=config.vad_hangover)
+
+    def feed(self, samples):
+        """Ajoute des échantillons ; renvoie les segments terminés [(début en secondes, audio)]
+
+        Les trames sont conservées par référence : samples ne doit pas être une vue
+        réutilisée par l'appelant (par exemple une vue du tampon circulaire).
+        """
+        if len(self._remainder):
+            samples = np.concatenate([self._remainder, samples])
+        n_frames = len(samples) // self.frame_length
+        used = n_frames * self.frame_length
+        self._remainder = samples[used:].copy()
+        if n_frames == 0:
+            return []
+        frames = samples[:used].reshape(n_frames, self.frame_length)
+        decisions = self.vad.is_speech(frames)
+
+        segments = []
+        for frame, speech in zip(frames, decisions):
+            index = self._frame_index
+            self._frame_index += 1
+            if not self.in_speech:
+                if speech:
+                    self.in_speech = True
+                    self._segment_start = index - len(self._preroll)
+                    self._segment = list(self._preroll)
+                    self._preroll.clear()
+                    self._segment.append(frame)
+                    self._speech_frames = 1
+                    self._silence_run = 0
+                elif self.padding_frames:
+                    self._preroll.append(frame)
+                continue
+
+            self._segment.append(frame)
+            if speech:
+                self._speech_frames += 1
+                self._silence_run = 0
+            else:
+                self._silence_run += 1
+
+            if self._silence_run >= self.hangover_frames:
+                # Fin d'énoncé : on ne garde que padding_frames de silence final
+                trailing = self._silence_run - self.padding_frames
+                if trailing > 0:
+                    del self._segment[-trailing:]
+                self._emit(segments)
+                self.in_speech = False
+            elif len(self._segment) >= self.max_frames:
+                # Segment trop long : coupure forcée, la parole continue
+                self._emit(segments)
+                self._segment_start = index + 1
+        return segments
+
+    @property
+    def segment_start(self):
+        """Début du segment en cours (secondes), None hors parole"""
+        return self._segment_start * self.frame_seconds if self.in_speech else None
+
+    def current(self):
+        """Segment en cours : (début en secondes, audio jusqu'au dernier échantillon reçu)"""
+        if not self.in_speech:
+            return None
+        return self._segment_start * self.frame_seconds, np.concatenate(self._segment + [self._remainder])
+
+    def flush(self):
+        """Termine le segment en cours (arrêt de la capture)"""
+        segments = []
+        if self.in_speech:
+            self._emit(segments)
+        self.in_speech = False
+        self._preroll.clear()
+        self._remainder = np.zeros(0, dtype=np.float32)
+        return segments
+
+    def _emit(self, segments):
+        if self._speech_frames >= self.min_frames:
+            segments.append((self._segment_start * self.frame_seconds, np.concatenate(self._segment)))
+        self._segment = []
+        self._speech_frames = 0
+        self._silence_run = 0